@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -51,8 +52,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.instrumentation.InstrumentationMiddleware',
 ]
 
+# Sous ASGI, 'api.async_urls' sert list/retrieve des projets, issues et commentaires en async natif
 ROOT_URLCONF = 'SoftDesk.urls'
 
 TEMPLATES = [
@@ -102,6 +105,29 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Hachage des mots de passe (api.hashers)
+# Le premier hasher hache les nouveaux mots de passe ; les suivants vérifient les hashes existants,
+# re-hachés de façon transparente avec le premier à la connexion suivante.
+# Le hasher MD5 n'est ajouté qu'en mode FAST (voir SOFTDESK_PASSWORD_HASHING), pour les comptes de test.
+PASSWORD_HASHERS = [
+    'api.hashers.TunedScryptPasswordHasher',
+    'api.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# SCRYPT / ARGON2 : paramètres des hashers, appliqués à chaque compte lors de sa connexion suivante
+# POOL_SIZE : threads dédiés au hachage de /api/token/ sous ASGI (0 : hachage dans le thread de la vue)
+# FAST : hachage MD5 pour les tests (hashes vérifiables dans ce mode seulement), jamais en production
+SOFTDESK_PASSWORD_HASHING = {
+    'SCRYPT': {'WORK_FACTOR': 2 ** 14, 'BLOCK_SIZE': 8, 'PARALLELISM': 1},
+    'ARGON2': {'TIME_COST': 2, 'MEMORY_COST': 19456, 'PARALLELISM': 1},
+    'POOL_SIZE': 0,
+    'FAST': os.environ.get('SOFTDESK_FAST_PASSWORD_HASHING') == '1',
+}
+if SOFTDESK_PASSWORD_HASHING['FAST']:
+    PASSWORD_HASHERS.append('django.contrib.auth.hashers.MD5PasswordHasher')
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -130,12 +156,109 @@ AUTH_USER_MODEL = 'api.User'
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 10,
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('api.authentication.StatelessJWTAuthentication',),
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_OBTAIN_SERIALIZER': 'api.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.serializers.KeyRingTokenRefreshSerializer',
+    'AUTH_TOKEN_CLASSES': ('api.tokens.AccessToken',),
+}
+
+# Signature asymétrique des jetons (api.tokens), vérifiable par des services tiers via /.well-known/jwks.json
+# ALGORITHM : None (HS256 avec SECRET_KEY), 'RS256' ou 'EdDSA' (nécessitent le paquet cryptography)
+# PRIVATE_KEY_PATH : clé privée courante (PEM) ; JWKS_PATH : clés publiques acceptées (rotation)
+# Voir la commande rotate_jwt_key
+SOFTDESK_JWT = {
+    'ALGORITHM': None,
+    'PRIVATE_KEY_PATH': None,
+    'JWKS_PATH': None,
+    'RELOAD_INTERVAL': 5,
+}
+
+# Authentification sans chargement de l'utilisateur (api.authentication.StatelessJWTAuthentication)
+# REVOCATION_TTL : durée (en secondes) pendant laquelle un compte désactivé peut encore utiliser son jeton
+SOFTDESK_AUTHENTICATION = {
+    'REVOCATION_TTL': 30,
+    'REVOCATION_MAX_SIZE': 10000,
+}
+
+# Flux Server-Sent Events des changements d'issues et de commentaires (api.events, servi sous ASGI)
+# Le broker est propre au processus : les abonnés ne reçoivent que les changements faits par leur worker
+# HEARTBEAT : secondes entre deux commentaires de maintien de connexion (et re-vérification des droits)
+# QUEUE_SIZE : événements en attente au-delà desquels un abonné trop lent est déconnecté
+# REPLAY_SIZE : événements conservés par projet pour les reconnexions (Last-Event-ID)
+SOFTDESK_EVENTS = {
+    'HEARTBEAT': 15,
+    'QUEUE_SIZE': 100,
+    'REPLAY_SIZE': 100,
 }
 
 SESSION_COOKIE_NAME = 'softdesk_session'
+
+# Cache inter-requêtes des rôles (utilisateur, projet) utilisé par api.permissions
+# BACKEND : 'local' (LRU par processus) ou 'django' (cache CACHES[ALIAS], partagé entre workers)
+# 'local' n'est cohérent qu'avec un seul processus : les invalidations ne touchent que le worker qui a fait
+# l'écriture, les autres gardent le rôle en cache au plus TIMEOUT secondes ; avec plusieurs workers, préférer
+# 'django' sur un cache partagé
+# TIMEOUT : durée de vie (en secondes) d'un rôle en cache ; None : 5 s en 'local', 300 s en 'django'
+SOFTDESK_MEMBERSHIP_CACHE = {
+    'BACKEND': 'local',
+    'MAX_SIZE': 10000,
+    'ALIAS': 'default',
+    'TIMEOUT': None,
+}
+
+# Cache des rendus du détail des projets (api.render_cache), indexé par (projet, Project.version)
+# BACKEND : None (désactivé), 'locmem' (par processus), 'file' (DIRECTORY, partagé par les workers
+# d'une machine) ou 'django' (cache CACHES[ALIAS], Redis ou Memcached partagé entre machines)
+# MAX_BYTES : taille maximale des rendus conservés (locmem et file)
+SOFTDESK_RENDER_CACHE = {
+    'BACKEND': None,
+    'MAX_BYTES': 32 * 1024 * 1024,
+    'DIRECTORY': None,
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Mesure par requête (requêtes SQL, temps base de données / serializer / permission / authentification)
+# SAMPLE_RATE : fraction des requêtes mesurées (0.0 : désactivé, 1.0 : toutes)
+SOFTDESK_INSTRUMENTATION = {
+    'SAMPLE_RATE': 0.0,
+    'SERVER_TIMING': True,
+    'LOG': True,
+}
+
+# Endpoint /metrics (format texte Prometheus)
+# DIRECTORY : répertoire partagé par les workers (gunicorn) pour agréger leurs métriques ;
+# None : métriques du seul processus courant
+# TOKEN : jeton attendu dans l'en-tête Authorization: Bearer du scraper
+# ALLOWED_IPS : adresses autorisées sans jeton ; derrière un reverse proxy local toutes les requêtes
+# arrivent de 127.0.0.1 : ne l'ajouter que si /metrics n'est pas exposé par le proxy
+# Sans TOKEN ni ALLOWED_IPS, /metrics répond 403
+SOFTDESK_METRICS = {
+    'ENABLED': False,
+    'DIRECTORY': None,
+    'FLUSH_INTERVAL': 5,
+    'TOKEN': None,
+    'ALLOWED_IPS': [],
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
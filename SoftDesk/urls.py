@@ -18,12 +18,16 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework_nested import routers
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from api.views import UserViewSet, ProjectViewSet, IssueViewSet, CommentViewSet
+from api.hashers import offload_hashing
+from api.metrics import metrics_view
+from api.tokens import jwks_view
+from api.views import UserViewSet, ProjectViewSet, IssueViewSet, CommentViewSet, SearchViewSet
 
 
 router = routers.SimpleRouter()
 router.register('user', UserViewSet, basename='user')
 router.register('project', ProjectViewSet, basename='project')
+router.register('search', SearchViewSet, basename='search')
 
 projects_router = routers.NestedSimpleRouter(router, r'project', lookup='project')
 projects_router.register(r'issue', IssueViewSet, basename='project-issues')
@@ -33,10 +37,12 @@ issues_router.register(r'comment', CommentViewSet, basename='issue-comments')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
 
     path('api-auth/', include('rest_framework.urls')),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', offload_hashing(TokenObtainPairView.as_view()), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='tokent_refresh'),
+    path('.well-known/jwks.json', jwks_view, name='jwks'),
 
     path('api/', include(router.urls)),
     path('api/', include(projects_router.urls)),
@@ -0,0 +1,50 @@
+"""
+URLconf avec les lectures async et le flux SSE (api.async_views) devant les routes DRF de SoftDesk.urls.
+À utiliser sous ASGI (uvicorn, daphne) avec ROOT_URLCONF = 'api.async_urls' ; sous WSGI, chaque vue
+async exécuterait sa propre boucle d'événements et serait plus lente que la vue synchrone.
+"""
+from django.urls import include, re_path
+
+from api.async_views import AsyncProjectViewSet, AsyncIssueViewSet, AsyncCommentViewSet, ProjectEventStream
+from SoftDesk.urls import router, projects_router, issues_router, urlpatterns as sync_urlpatterns
+
+
+# Actions des viewsets synchrones (issue/batch/...) : placées avant les routes de détail async, qui les
+# captureraient sinon comme une clé primaire, dans le même ordre que les routeurs DRF
+action_urlpatterns = [
+    pattern
+    for pattern in router.urls + projects_router.urls + issues_router.urls
+    if not pattern.name.endswith(('-list', '-detail'))
+]
+
+# Mêmes expressions et mêmes noms que les routeurs de SoftDesk.urls
+async_urlpatterns = action_urlpatterns + [
+    re_path(r'^project/$', AsyncProjectViewSet.as_view(detail=False), name='project-list'),
+    re_path(r'^project/(?P<pk>[^/.]+)/$', AsyncProjectViewSet.as_view(detail=True), name='project-detail'),
+    re_path(
+        r'^project/(?P<project_pk>[^/.]+)/issue/$',
+        AsyncIssueViewSet.as_view(detail=False),
+        name='project-issues-list',
+    ),
+    re_path(
+        r'^project/(?P<project_pk>[^/.]+)/issue/(?P<pk>[^/.]+)/$',
+        AsyncIssueViewSet.as_view(detail=True),
+        name='project-issues-detail',
+    ),
+    re_path(
+        r'^project/(?P<project_pk>[^/.]+)/issue/(?P<issue_pk>[^/.]+)/comment/$',
+        AsyncCommentViewSet.as_view(detail=False),
+        name='issue-comments-list',
+    ),
+    re_path(
+        r'^project/(?P<project_pk>[^/.]+)/issue/(?P<issue_pk>[^/.]+)/comment/(?P<pk>[^/.]+)/$',
+        AsyncCommentViewSet.as_view(detail=True),
+        name='issue-comments-detail',
+    ),
+    # Flux SSE : uniquement sous ASGI, une vue WSGI resterait bloquée pendant toute la connexion
+    re_path(r'^project/(?P<pk>[^/.]+)/events/$', ProjectEventStream.as_view(), name='project-events'),
+]
+
+urlpatterns = [
+    re_path(r'^api/', include(async_urlpatterns)),
+] + sync_urlpatterns
@@ -0,0 +1,313 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from api.authentication import StatelessJWTAuthentication
+from api.events import get_broker, get_options as get_events_options
+from api.instrumentation import timed
+from api.pagination import SwitchablePagination
+from api.permissions import aget_project_membership
+from api.models import Project
+from api.views import ProjectViewSet, IssueViewSet, CommentViewSet
+
+
+def render_sync_view(view, request, kwargs):
+    response = view(request, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+class AsyncReadViewSet:
+    """
+    list et retrieve en async natif : authentification, permissions et ORM async, sans passer par le
+    thread unique des vues synchrones sous ASGI. Les autres méthodes HTTP sont déléguées au viewset DRF
+    `viewset`, dont sont aussi repris le queryset, les serializers et la pagination.
+    Les réponses sont toujours en JSON (pas d'API navigable).
+    """
+    viewset = None
+    list_actions = {'get': 'list', 'post': 'create'}
+    detail_actions = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+    renderer = JSONRenderer()
+
+    def __init__(self, request, kwargs, action):
+        self.request = request
+        self.kwargs = kwargs
+        self.action = action
+        self.authentication = StatelessJWTAuthentication()
+        # Request DRF pour query_params et le contexte des serializers, sans authentificateur :
+        # l'utilisateur est fourni par aauthenticate
+        self.drf_request = Request(request, authenticators=())
+        self.sync_viewset = self.viewset(
+            request=self.drf_request, kwargs=kwargs, action=action, format_kwarg=None
+        )
+
+    @classmethod
+    def as_view(cls, detail):
+        sync_view = cls.viewset.as_view(cls.detail_actions if detail else cls.list_actions)
+        action = 'retrieve' if detail else 'list'
+
+        async def view(request, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_to_async(render_sync_view)(sync_view, request, kwargs)
+            self = cls(request, kwargs, action)
+            try:
+                await self.authenticate()
+                return await getattr(self, action)()
+            except Exception as exc:
+                return self.handle_exception(exc)
+
+        view.cls = cls
+        return csrf_exempt(view)
+
+    async def authenticate(self):
+        with timed('authentication'):
+            result = await self.authentication.aauthenticate(self.request)
+        if result is None:
+            raise exceptions.NotAuthenticated()
+        self.drf_request.user, self.drf_request.auth = result
+
+    async def check_permissions(self):
+        pass
+
+    async def check_object_permissions(self, obj):
+        pass
+
+    async def get_validators(self):
+        """
+        ETag et Last-Modified de ConditionalGetMixin (version du projet), ou None hors de ses actions.
+        """
+        viewset = self.sync_viewset
+        if self.action not in viewset.conditional_actions:
+            return None
+        membership = await aget_project_membership(self.request, self.kwargs[viewset.project_url_kwarg])
+        project = membership.loaded_project
+        if project is not None:
+            version, updated_time = project.version, project.updated_time
+        else:
+            try:
+                version, updated_time = await Project.objects.values_list('version', 'updated_time').aget(
+                    pk=membership.project_pk
+                )
+            except Project.DoesNotExist:
+                raise Http404(f"No {Project._meta.object_name} matches the given query.")
+        return viewset.get_validators(membership.project_pk, version, updated_time, self.renderer.format)
+
+    def not_modified(self, validators):
+        if validators is None:
+            return None
+        etag, last_modified = validators
+        response = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            self.set_validators(response, validators)
+        return response
+
+    def set_validators(self, response, validators):
+        if validators is not None:
+            etag, last_modified = validators
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+
+    async def list(self):
+        await self.check_permissions()
+        validators = await self.get_validators()
+        response = self.not_modified(validators)
+        if response is not None:
+            return response
+        queryset = self.sync_viewset.filter_queryset(self.sync_viewset.get_queryset())
+        page = await self.paginate(queryset)
+        objects = page if page is not None else [obj async for obj in queryset]
+        data = self.sync_viewset.get_serializer(objects, many=True).data
+        if page is not None:
+            data = self.sync_viewset.paginator.get_paginated_response(data).data
+        response = self.respond(data)
+        self.set_validators(response, validators)
+        return response
+
+    async def retrieve(self):
+        await self.check_permissions()
+        validators = await self.get_validators()
+        response = self.not_modified(validators)
+        if response is not None:
+            return response
+        # Mêmes erreurs que get_object_or_404 de DRF
+        model = self.viewset.queryset.model
+        try:
+            obj = await self.sync_viewset.get_queryset().aget(pk=self.kwargs['pk'])
+        except model.DoesNotExist:
+            raise Http404(f"No {model._meta.object_name} matches the given query.")
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        await self.check_object_permissions(obj)
+        response = self.respond(self.sync_viewset.get_serializer(obj).data)
+        self.set_validators(response, validators)
+        return response
+
+    async def paginate(self, queryset):
+        """
+        Pagination limit/offset avec acount() et itération async ; le mode curseur (?pagination=cursor)
+        reste celui de DRF, exécuté dans un thread.
+        """
+        paginator = self.sync_viewset.paginator
+        if paginator is None:
+            return None
+        if isinstance(paginator, SwitchablePagination):
+            if paginator.get_mode(self.drf_request, self.sync_viewset) == SwitchablePagination.CURSOR:
+                return await sync_to_async(paginator.paginate_queryset)(
+                    queryset, self.drf_request, self.sync_viewset
+                )
+            paginator.paginator = paginator.limit_offset_class()
+            paginator = paginator.paginator
+
+        paginator.request = self.drf_request
+        paginator.limit = paginator.get_limit(self.drf_request)
+        if paginator.limit is None:
+            return None
+        paginator.offset = paginator.get_offset(self.drf_request)
+        paginator.count = await queryset.acount()
+        if paginator.count == 0 or paginator.offset > paginator.count:
+            return []
+        return [obj async for obj in queryset[paginator.offset:paginator.offset + paginator.limit]]
+
+    def respond(self, data, status=200):
+        response = HttpResponse(self.renderer.render(data), status=status, content_type='application/json')
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    def handle_exception(self, exc):
+        # Même traitement que APIView.handle_exception : 401 avec WWW-Authenticate
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authentication.authenticate_header(self.request)
+        response = exception_handler(exc, {'view': self.sync_viewset, 'request': self.drf_request})
+        if response is None:
+            raise exc
+        rendered = self.respond(response.data, status=response.status_code)
+        for header in ('WWW-Authenticate', 'Retry-After'):
+            if header in response:
+                rendered[header] = response[header]
+        return rendered
+
+
+class AsyncProjectViewSet(AsyncReadViewSet):
+    viewset = ProjectViewSet
+
+    async def check_permissions(self):
+        # ProjectPermission : seuls les contributeurs lisent le détail d'un projet ; vérifié avant le
+        # chargement du projet, comme une éventuelle réponse 304
+        if self.action != 'retrieve':
+            return
+        with timed('permission'):
+            membership = await aget_project_membership(self.request, self.kwargs['pk'])
+        if not membership.is_contributor:
+            raise exceptions.PermissionDenied()
+
+
+class AsyncProjectChildViewSet(AsyncReadViewSet):
+    async def check_permissions(self):
+        # IssueAndCommentPermission : seuls les contributeurs lisent les issues et commentaires du projet
+        with timed('permission'):
+            membership = await aget_project_membership(self.request, self.kwargs.get('project_pk'))
+        if not membership.is_contributor:
+            raise exceptions.PermissionDenied()
+
+
+class AsyncIssueViewSet(AsyncProjectChildViewSet):
+    viewset = IssueViewSet
+
+
+class AsyncCommentViewSet(AsyncProjectChildViewSet):
+    viewset = CommentViewSet
+
+
+class ProjectEventStream(AsyncReadViewSet):
+    """
+    Flux Server-Sent Events des créations, modifications et suppressions d'issues et de commentaires
+    d'un projet (api.events). Réservé aux contributeurs, comme la lecture du projet (ProjectPermission) ;
+    les droits sont re-vérifiés à chaque heartbeat. Un client qui se reconnecte avec Last-Event-ID reçoit
+    les événements manqués, ou un événement 'reset' s'ils ne sont plus en mémoire.
+    """
+    viewset = ProjectViewSet
+    retry = 3000
+
+    @classmethod
+    def as_view(cls):
+        async def view(request, **kwargs):
+            self = cls(request, kwargs, 'retrieve')
+            try:
+                await self.authenticate()
+                if request.method != 'GET':
+                    raise exceptions.MethodNotAllowed(request.method)
+                await self.check_permissions()
+                return self.subscribe()
+            except Exception as exc:
+                return self.handle_exception(exc)
+
+        view.cls = cls
+        return csrf_exempt(view)
+
+    async def check_permissions(self):
+        # Mémorisation par requête ignorée : la re-vérification d'un flux ouvert passe par le cache des rôles
+        self.request._project_memberships = {}
+        with timed('permission'):
+            membership = await aget_project_membership(self.request, self.kwargs['pk'])
+        if not membership.is_contributor:
+            raise exceptions.PermissionDenied()
+
+    async def is_allowed(self):
+        try:
+            await self.check_permissions()
+        except (Http404, exceptions.PermissionDenied):
+            return False
+        return True
+
+    def subscribe(self):
+        broker = get_broker()
+        project_id = int(self.kwargs['pk'])
+        # Abonnement avant la relecture de l'historique : aucun événement ne peut être perdu entre les deux
+        subscription = broker.subscribe(project_id)
+        last_event_id = self.request.headers.get('Last-Event-ID')
+        backlog = broker.replay(project_id, last_event_id) if last_event_id else []
+
+        response = StreamingHttpResponse(self.stream(subscription, backlog), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Désactive la mise en tampon de nginx
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, subscription, backlog):
+        heartbeat = get_events_options().get('HEARTBEAT', 15)
+        last_event_id = 0
+        try:
+            yield f'retry: {self.retry}\n\n'
+            if backlog is None:
+                yield 'event: reset\ndata: {}\n\n'
+                backlog = []
+            for event in backlog:
+                last_event_id = event.id
+                yield event.encode()
+
+            while True:
+                event = await subscription.get(heartbeat)
+                if event is subscription.CLOSED:
+                    return
+                if event is None:
+                    if not await self.is_allowed():
+                        return
+                    yield ': heartbeat\n\n'
+                    continue
+                if event.id <= last_event_id:
+                    # Déjà envoyé avec l'historique
+                    continue
+                last_event_id = event.id
+                yield event.encode()
+                if event.type == 'project.deleted':
+                    return
+        finally:
+            subscription.broker.unsubscribe(subscription)
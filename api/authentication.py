@@ -0,0 +1,127 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from api.cache import LRUCache
+
+
+def get_options():
+    return getattr(settings, 'SOFTDESK_AUTHENTICATION', {})
+
+
+_MISSING = object()
+_revocation_cache = None
+
+
+def get_revocation_cache():
+    """
+    Cache (user_id -> is_active) des vérifications de révocation, avec expiration (REVOCATION_TTL).
+    Un utilisateur supprimé est mémorisé avec la valeur None.
+    """
+    global _revocation_cache
+    if _revocation_cache is None:
+        options = get_options()
+        _revocation_cache = LRUCache(
+            options.get('REVOCATION_MAX_SIZE', 10000), timeout=options.get('REVOCATION_TTL', 30)
+        )
+    return _revocation_cache
+
+
+def invalidate_revocation(user_id):
+    get_revocation_cache().delete(user_id)
+
+
+class ClaimsUser:
+    """
+    Utilisateur construit à partir des claims du jeton (id, username, is_active), sans requête SQL.
+    L'instance User complète n'est chargée que si un attribut absent des claims est demandé.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, claims):
+        self.id = self.pk = user_id
+        self.is_active = claims.get('is_active', True)
+        if 'username' in claims:
+            # Les jetons émis avant l'ajout du claim chargent le username depuis la base
+            self.username = claims['username']
+
+    @cached_property
+    def user(self):
+        return get_user_model().objects.get(pk=self.pk)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __eq__(self, other):
+        if isinstance(other, (ClaimsUser, get_user_model())):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.username
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Authentification JWT sans chargement de l'utilisateur à chaque requête.
+    La révocation (compte désactivé ou supprimé) est vérifiée par une requête sur la seule colonne
+    is_active, dont le résultat est mis en cache REVOCATION_TTL secondes.
+    """
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        is_active = get_revocation_cache().get(user_id, _MISSING)
+        if is_active is _MISSING:
+            is_active = self.load_is_active(user_id)
+        return self.build_user(user_id, validated_token, is_active)
+
+    async def aauthenticate(self, request):
+        """
+        Version async de authenticate pour api.async_views : seule une révocation absente du cache
+        est vérifiée dans un thread.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        user_id = self.get_user_id(validated_token)
+        is_active = get_revocation_cache().get(user_id, _MISSING)
+        if is_active is _MISSING:
+            is_active = await sync_to_async(self.load_is_active)(user_id)
+        return self.build_user(user_id, validated_token, is_active), validated_token
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Le jeton ne contient pas d'identifiant utilisateur")
+
+    def build_user(self, user_id, validated_token, is_active):
+        if not validated_token.get('is_active', True) or not is_active:
+            raise AuthenticationFailed("Utilisateur inconnu ou désactivé", code='user_inactive')
+        return ClaimsUser(user_id, validated_token)
+
+    def load_is_active(self, user_id):
+        is_active = (
+            self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values_list('is_active', flat=True)
+            .first()
+        )
+        # Comme pour les rôles, une valeur lue dans une transaction non validée n'est pas mise en cache
+        if not transaction.get_connection().in_atomic_block:
+            get_revocation_cache().set(user_id, is_active)
+        return is_active
@@ -0,0 +1,47 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """
+    Crée une base jetable (comme `manage.py test`) : les benchmarks ne touchent jamais aux données réelles.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def percentile(values, rank):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(rank / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(durations):
+    """
+    Résume une liste de durées (en secondes) en millisecondes.
+    """
+    return {
+        'count': len(durations),
+        'mean_ms': statistics.fmean(durations) * 1000,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p95_ms': percentile(durations, 95) * 1000,
+        'p99_ms': percentile(durations, 99) * 1000,
+        'max_ms': max(durations) * 1000,
+    }
+
+
+def measure(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
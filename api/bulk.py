@@ -0,0 +1,166 @@
+import uuid
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from api.cache import get_membership_cache
+from api.hashers import hash_password
+from api.models import User, Project, Contributor, Issue, Comment
+from api.statistics import COMMENTS, apply_deltas, count_issue, counted_values
+
+
+class BulkLoader:
+    """
+    Insère des lignes par lots avec bulk_create, dans l'ordre des dépendances :
+    users -> projects -> contributors -> issues -> comments.
+    Chaque ligne est un dictionnaire (format NDJSON de l'import) ; les clés étrangères
+    référencent les identifiants fournis dans les lignes.
+    Les signaux post_save ne sont pas envoyés : les caches sont vidés par l'appelant (finish()).
+    """
+    ORDER = ('user', 'project', 'contributor', 'issue', 'comment')
+
+    def __init__(self, batch_size=5000, on_flush=None):
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.buffers = {kind: [] for kind in self.ORDER}
+        self.counts = dict.fromkeys(self.ORDER, 0)
+        self._password_hashes = {}
+
+    def add(self, kind, row):
+        if kind not in self.buffers:
+            raise ValueError(f"Type de ligne inconnu : {kind}")
+        self.buffers[kind].append(getattr(self, f'build_{kind}')(row))
+        if len(self.buffers[kind]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Les lots sont toujours insérés dans l'ordre des dépendances : une ligne peut
+        # référencer un parent encore en attente dans un autre tampon
+        with transaction.atomic():
+            self.bump_versions()
+            deltas = self.count_statistics()
+            commented_issues = {comment.issue_id for comment in self.buffers['comment']}
+            for kind in self.ORDER:
+                objects = self.buffers[kind]
+                if not objects:
+                    continue
+                model = objects[0].__class__
+                model.objects.bulk_create(
+                    objects, batch_size=self.batch_size, ignore_conflicts=kind == 'contributor'
+                )
+                if kind == 'project':
+                    # Project.save() n'est pas appelé : l'auteur est ajouté comme contributeur ici
+                    Contributor.objects.bulk_create(
+                        [Contributor(user_id=project.author_id, project_id=project.pk)
+                         for project in objects],
+                        ignore_conflicts=True,
+                    )
+                self.counts[kind] += len(objects)
+                self.buffers[kind] = []
+            apply_deltas(deltas)
+            # comment_count et last_activity_time des issues commentées (sans signal post_save)
+            if commented_issues:
+                Issue.objects.filter(pk__in=commented_issues).refresh_comment_activity()
+        if self.on_flush:
+            self.on_flush(self.counts)
+
+    def bump_versions(self):
+        """
+        Incrémente la version des projets existants auxquels le lot ajoute des contributeurs, des issues
+        ou des commentaires (bulk_create n'envoie pas de signal post_save). Appelé avant l'insertion :
+        les projets du lot, pas encore créés, gardent leur version initiale.
+        """
+        project_ids = {obj.project_id for obj in self.buffers['contributor'] + self.buffers['issue']}
+        if project_ids:
+            Project.objects.filter(pk__in=project_ids).bump_version()
+        issue_ids = {comment.issue_id for comment in self.buffers['comment']}
+        if issue_ids:
+            Project.objects.filter(issues__in=issue_ids).bump_version()
+
+    def count_statistics(self):
+        """
+        Incréments des compteurs de api.statistics pour les issues et commentaires du lot, appliqués après
+        l'insertion (les compteurs référencent les projets du lot).
+        """
+        deltas = Counter()
+        issue_projects = {}
+        for issue in self.buffers['issue']:
+            count_issue(deltas, issue.project_id, counted_values(issue))
+            issue_projects[issue.id] = issue.project_id
+        issue_ids = {comment.issue_id for comment in self.buffers['comment']} - issue_projects.keys()
+        if issue_ids:
+            issue_projects.update(Issue.objects.filter(id__in=issue_ids).values_list('id', 'project_id'))
+        for comment in self.buffers['comment']:
+            # Une issue inconnue fera échouer l'insertion
+            if comment.issue_id in issue_projects:
+                deltas[issue_projects[comment.issue_id], COMMENTS] += 1
+        return deltas
+
+    def finish(self):
+        self.flush()
+        # Les identifiants ayant été fournis explicitement, on recale les séquences (PostgreSQL, Oracle)
+        statements = connection.ops.sequence_reset_sql(no_style(), [User, Project, Contributor, Issue])
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+        get_membership_cache().clear()
+        return self.counts
+
+    def hash_password(self, password):
+        # Le hachage domine le temps d'import des utilisateurs : un seul calcul par mot de passe distinct
+        if password not in self._password_hashes:
+            self._password_hashes[password] = hash_password(password)
+        return self._password_hashes[password]
+
+    def build_user(self, row):
+        if 'password_hash' in row:
+            password = row['password_hash']
+        elif 'password' in row:
+            password = self.hash_password(row['password'])
+        else:
+            password = make_password(None)
+        return User(
+            id=row['id'],
+            username=row['username'],
+            password=password,
+            email=row.get('email', ''),
+            age=row['age'],
+            can_be_contacted=row.get('can_be_contacted', False),
+            can_data_be_shared=row.get('can_data_be_shared', False),
+        )
+
+    def build_project(self, row):
+        return Project(
+            id=row['id'],
+            author_id=row['author'],
+            title=row['title'],
+            description=row.get('description', ''),
+            type=row['type'],
+        )
+
+    def build_contributor(self, row):
+        return Contributor(user_id=row['user'], project_id=row['project'])
+
+    def build_issue(self, row):
+        return Issue(
+            id=row['id'],
+            author_id=row['author'],
+            project_id=row['project'],
+            title=row['title'],
+            description=row.get('description', ''),
+            priority=row['priority'],
+            type=row['type'],
+            status=row.get('status', Issue.TODO),
+        )
+
+    def build_comment(self, row):
+        # L'UUID est attribué avant l'insertion : aucune relecture n'est nécessaire
+        return Comment(
+            uuid=row.get('uuid') or uuid.uuid4(),
+            author_id=row['author'],
+            issue_id=row['issue'],
+            description=row['description'],
+        )
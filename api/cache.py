@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class LRUCache:
+    """
+    Cache mémoire borné, thread-safe, avec éviction LRU et compteurs de hits/misses.
+    Avec timeout (en secondes), les entrées expirent après ce délai.
+    Les compteurs ne sont jamais remis à zéro (clear compris) : ils sont exportés comme compteurs Prometheus.
+    """
+    def __init__(self, max_size=1024, timeout=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.timeout if self.timeout is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self), 'max_size': self.max_size}
+
+
+class MembershipCache:
+    """
+    Cache inter-requêtes (user_id, project_id) -> rôle sur le projet.
+    - 'local' : LRU propre au processus, sans dépendance externe ; les signaux n'invalident que le cache
+      du processus qui a fait l'écriture : cohérent avec un seul processus, sinon un rôle périmé peut être
+      servi par les autres workers jusqu'à son expiration, d'où une durée de vie courte par défaut
+      (LOCAL_TIMEOUT)
+    - 'django' : cache Django configuré dans CACHES (partagé entre workers avec Redis ou Memcached) ;
+      les invalidations passent par des numéros de génération, sans jamais vider le cache partagé
+    L'absence de rôle est mémorisée elle aussi (NO_ROLE) pour que les refus ne coûtent pas de requête.
+    """
+    MISSING = object()
+    NO_ROLE = ''
+    LOCAL_TIMEOUT = 5
+    SHARED_TIMEOUT = 300
+    GENERATION_KEY = 'membership:generation'
+
+    def __init__(self, backend='local', max_size=10000, alias='default', timeout=None):
+        self.backend = backend
+        if timeout is None:
+            timeout = self.LOCAL_TIMEOUT if backend == 'local' else self.SHARED_TIMEOUT
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        if backend == 'local':
+            self._local = LRUCache(max_size, timeout=timeout)
+        elif backend == 'django':
+            self._cache = caches[alias]
+        else:
+            raise ValueError(f"Backend de cache inconnu : {backend}")
+
+    @classmethod
+    def from_settings(cls):
+        options = getattr(settings, 'SOFTDESK_MEMBERSHIP_CACHE', {})
+        return cls(
+            backend=options.get('BACKEND', 'local'),
+            max_size=options.get('MAX_SIZE', 10000),
+            alias=options.get('ALIAS', 'default'),
+            timeout=options.get('TIMEOUT'),
+        )
+
+    def _generation_key(self, project_id):
+        return f'membership:{project_id}:generation'
+
+    def _key(self, user_id, project_id):
+        # Les numéros de génération (global et du projet) invalident d'un coup toutes les entrées concernées
+        project_key = self._generation_key(project_id)
+        generations = self._cache.get_many([self.GENERATION_KEY, project_key])
+        return (
+            f'membership:{generations.get(self.GENERATION_KEY, 0)}:{project_id}:'
+            f'{generations.get(project_key, 0)}:{user_id}'
+        )
+
+    def _next_generation(self, key):
+        self._cache.add(key, 0, None)
+        self._cache.incr(key)
+
+    def get(self, user_id, project_id):
+        if self.backend == 'local':
+            role = self._local.get((user_id, project_id), self.MISSING)
+        else:
+            role = self._cache.get(self._key(user_id, project_id), self.MISSING)
+
+        if role is self.MISSING:
+            self.misses += 1
+            return self.MISSING
+        self.hits += 1
+        return role or None
+
+    def set(self, user_id, project_id, role):
+        role = role or self.NO_ROLE
+        if self.backend == 'local':
+            self._local.set((user_id, project_id), role)
+        else:
+            self._cache.set(self._key(user_id, project_id), role, self.timeout)
+
+    def invalidate(self, user_id, project_id):
+        if self.backend == 'local':
+            self._local.delete((user_id, project_id))
+        else:
+            self._cache.delete(self._key(user_id, project_id))
+
+    def invalidate_project(self, project_id):
+        if self.backend == 'local':
+            self._local.delete_where(lambda key: key[1] == project_id)
+        else:
+            self._next_generation(self._generation_key(project_id))
+
+    def clear(self):
+        # hits et misses sont conservés : /metrics les expose comme des compteurs, qui ne reculent jamais
+        if self.backend == 'local':
+            self._local.clear()
+        else:
+            # Le cache Django peut être partagé avec d'autres données : seules les entrées des rôles expirent
+            self._next_generation(self.GENERATION_KEY)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+
+_membership_cache = None
+
+
+def get_membership_cache():
+    global _membership_cache
+    if _membership_cache is None:
+        _membership_cache = MembershipCache.from_settings()
+    return _membership_cache
+
+
+def _invalidate_now_and_on_commit(invalidate, *args):
+    # Invalide immédiatement, puis une seconde fois après le commit pour écarter
+    # les rôles lus par d'autres requêtes avant que la transaction ne soit validée
+    invalidate(*args)
+    transaction.on_commit(lambda: invalidate(*args))
+
+
+def invalidate_membership(user_id, project_id):
+    _invalidate_now_and_on_commit(get_membership_cache().invalidate, user_id, project_id)
+
+
+def invalidate_project_memberships(project_id):
+    _invalidate_now_and_on_commit(get_membership_cache().invalidate_project, project_id)
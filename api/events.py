@@ -0,0 +1,222 @@
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+
+
+def get_options():
+    return getattr(settings, 'SOFTDESK_EVENTS', {})
+
+
+class Event:
+    __slots__ = ('epoch', 'id', 'type', 'data')
+
+    def __init__(self, epoch, id, type, data):
+        self.epoch = epoch
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def encode(self):
+        """
+        Format text/event-stream.
+        """
+        data = json.dumps(self.data, separators=(',', ':'), ensure_ascii=False)
+        return f'id: {self.epoch}-{self.id}\nevent: {self.type}\ndata: {data}\n\n'
+
+
+class Subscription:
+    """
+    File d'événements d'un abonné, consommée dans sa boucle d'événements.
+    Un abonné trop lent (file pleine) est déconnecté : il se reconnecte avec Last-Event-ID.
+    """
+    CLOSED = object()
+
+    def __init__(self, broker, project_id, loop, max_size):
+        self.broker = broker
+        self.project_id = project_id
+        self.loop = loop
+        self.queue = asyncio.Queue(max_size)
+
+    def put(self, event):
+        # Appelé dans la boucle de l'abonné (call_soon_threadsafe)
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.close()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(self.CLOSED)
+
+    async def get(self, timeout=None):
+        """
+        Prochain événement, None après `timeout` secondes sans événement, CLOSED si l'abonnement est fermé.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    """
+    Pub/sub en mémoire du processus : publish peut être appelé depuis n'importe quel thread (signaux,
+    vues synchrones), chaque abonné reçoit l'événement dans sa propre boucle d'événements.
+    Les REPLAY_SIZE derniers événements de chaque projet sont conservés pour les reconnexions.
+    Les identifiants sont préfixés par une époque propre au processus : un Last-Event-ID émis avant
+    un redémarrage n'est pas confondu avec les nouveaux événements.
+    """
+    def __init__(self, queue_size=100, replay_size=100):
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self.epoch = uuid.uuid4().hex[:8]
+        self._ids = itertools.count(1)
+        self._subscriptions = {}
+        self._history = {}
+        # Identifiant du dernier événement du projet qui n'est plus (ou n'a jamais été) dans l'historique
+        self._horizon = {}
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, project_id):
+        return bool(self._subscriptions.get(project_id))
+
+    def subscribe(self, project_id, loop=None):
+        subscription = Subscription(self, project_id, loop or asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(project_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.project_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.project_id, None)
+
+    def publish(self, project_id, type, data):
+        with self._lock:
+            event = Event(self.epoch, next(self._ids), type, data)
+            history = self._history.setdefault(project_id, deque())
+            history.append(event)
+            if len(history) > self.replay_size:
+                self._horizon[project_id] = history.popleft().id
+            subscriptions = list(self._subscriptions.get(project_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Boucle fermée : l'abonné a disparu sans se désabonner
+                self.unsubscribe(subscription)
+        return event
+
+    def skip(self, project_id):
+        """
+        Changement non publié faute d'abonné : l'historique du projet ne permet plus de relecture complète.
+        """
+        with self._lock:
+            self._history.pop(project_id, None)
+            self._horizon[project_id] = next(self._ids)
+
+    def replay(self, project_id, last_event_id):
+        """
+        Événements publiés après `last_event_id` (valeur de l'en-tête Last-Event-ID), ou None s'ils ne
+        sont plus tous en mémoire.
+        """
+        epoch, _, number = last_event_id.partition('-')
+        try:
+            number = int(number)
+        except ValueError:
+            return None
+        with self._lock:
+            if epoch != self.epoch or number < self._horizon.get(project_id, 0):
+                return None
+            return [event for event in self._history.get(project_id, ()) if event.id > number]
+
+    def forget(self, project_id):
+        with self._lock:
+            self._history.pop(project_id, None)
+            self._horizon.pop(project_id, None)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        options = get_options()
+        _broker = EventBroker(options.get('QUEUE_SIZE', 100), options.get('REPLAY_SIZE', 100))
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+    if setting == 'SOFTDESK_EVENTS':
+        _broker = None
+
+
+def publish_on_commit(project_id, type, build_data):
+    """
+    Publie l'événement après le commit de la transaction courante, et ne construit (sérialise)
+    ses données que si le projet a des abonnés.
+    """
+    broker = get_broker()
+    if not broker.has_subscribers(project_id):
+        broker.skip(project_id)
+        return
+    data = build_data()
+    transaction.on_commit(lambda: broker.publish(project_id, type, data))
+
+
+def publish_issue(issue, action):
+    from api.serializers import IssueSerializer
+    publish_on_commit(issue.project_id, f'issue.{action}', lambda: {'issue': IssueSerializer(issue).data})
+
+
+def publish_issue_deleted(issue):
+    publish_on_commit(issue.project_id, 'issue.deleted', lambda: {'issue': {'id': issue.pk}})
+
+
+def publish_issues_updated(project_id, issue_ids, changes):
+    # Modification par lot (queryset.update, sans signal) : seuls les champs modifiés sont envoyés
+    for issue_id in issue_ids:
+        publish_on_commit(
+            project_id, 'issue.updated', lambda issue_id=issue_id: {'issue': {'id': issue_id, **changes}}
+        )
+
+
+def publish_comment(comment, action):
+    from api.serializers import CommentSerializer
+    publish_on_commit(
+        comment.issue.project_id, f'comment.{action}', lambda: {'comment': CommentSerializer(comment).data}
+    )
+
+
+def publish_comment_deleted(comment):
+    publish_on_commit(
+        comment.issue.project_id,
+        'comment.deleted',
+        lambda: {'comment': {'uuid': str(comment.uuid), 'issue': comment.issue_id}},
+    )
+
+
+def publish_project_deleted(project_id):
+    # Publié même sans abonné local : l'historique du projet est libéré
+    broker = get_broker()
+
+    def publish():
+        broker.publish(project_id, 'project.deleted', {'project': {'id': project_id}})
+        broker.forget(project_id)
+
+    transaction.on_commit(publish)
@@ -0,0 +1,71 @@
+import csv
+import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api.models import Issue, Comment
+
+
+CSV_COLUMNS = [
+    'kind', 'id', 'issue', 'author', 'title', 'description', 'priority', 'type', 'status', 'created_time'
+]
+
+
+def iter_project_rows(project, chunk_size=2000):
+    """
+    Parcourt les issues puis les commentaires d'un projet par paquets de `chunk_size` lignes :
+    seuls des dictionnaires sont construits et aucun paquet n'est conservé en mémoire.
+    """
+    issues = (
+        Issue.objects.filter(project=project)
+        .order_by('created_time', 'id')
+        .values('id', 'author_id', 'title', 'description', 'priority', 'type', 'status', 'created_time')
+    )
+    for row in issues.iterator(chunk_size=chunk_size):
+        yield {'kind': 'issue', **_rename_author(row)}
+
+    comments = (
+        Comment.objects.filter(issue__project=project)
+        .order_by('created_time', 'uuid')
+        .values('uuid', 'author_id', 'issue_id', 'description', 'created_time')
+    )
+    for row in comments.iterator(chunk_size=chunk_size):
+        row = _rename_author(row)
+        row['issue'] = row.pop('issue_id')
+        yield {'kind': 'comment', **row}
+
+
+def _rename_author(row):
+    # Mêmes noms de champs que les serializers de l'API
+    row['author'] = row.pop('author_id')
+    return row
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+class _Echo:
+    """
+    Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de la stocker.
+    """
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        if row['kind'] == 'comment':
+            row = {**row, 'id': row['uuid']}
+        yield writer.writerow([_csv_value(row.get(column)) for column in CSV_COLUMNS])
+
+
+def _csv_value(value):
+    # Même format de date que les réponses JSON de l'API
+    if isinstance(value, datetime.datetime):
+        return DjangoJSONEncoder().default(value)
+    return value
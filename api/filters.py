@@ -0,0 +1,137 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from api.models import Issue
+
+
+class IssueFilter(BaseFilterBackend):
+    """
+    Filtres de la liste des issues d'un projet :
+    - ?status=, ?priority=, ?type= : une ou plusieurs valeurs séparées par des virgules
+    - ?author= : identifiant de l'auteur
+    - ?created_after= / ?created_before= : date ou date-heure ISO 8601 (bornes incluse / exclue)
+    Chaque filtre d'égalité est servi par un index (project, champ, created_time, id).
+    """
+    choice_fields = {
+        'status': Issue.STATUS_CHOICES,
+        'priority': Issue.PRIORITY_CHOICES,
+        'type': Issue.TYPE_CHOICES,
+    }
+    range_params = {
+        'created_after': 'created_time__gte',
+        'created_before': 'created_time__lt',
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        if view.action != 'list':
+            return queryset
+        params = request.query_params
+        filters = {}
+        errors = {}
+
+        for field, choices in self.choice_fields.items():
+            if field not in params:
+                continue
+            values = params[field].split(',')
+            allowed = {choice for choice, _ in choices}
+            invalid = [value for value in values if value not in allowed]
+            if invalid:
+                errors[field] = [f"Valeur invalide : {value}." for value in invalid]
+            elif len(values) == 1:
+                filters[field] = values[0]
+            else:
+                filters[f'{field}__in'] = values
+
+        if 'author' in params:
+            try:
+                filters['author_id'] = int(params['author'])
+            except ValueError:
+                errors['author'] = ["Un identifiant d'utilisateur est attendu."]
+
+        for param, lookup in self.range_params.items():
+            if param not in params:
+                continue
+            value = self.parse_datetime(params[param])
+            if value is None:
+                errors[param] = ["Une date ou une date-heure ISO 8601 est attendue."]
+            else:
+                filters[lookup] = value
+
+        if errors:
+            raise ValidationError(errors)
+        return queryset.filter(**filters)
+
+    @staticmethod
+    def parse_datetime(value):
+        try:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                date = parse_date(value)
+                if date is None:
+                    return None
+                parsed = datetime.combine(date, time.min)
+        except ValueError:
+            return None
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def get_schema_operation_parameters(self, view):
+        parameters = [
+            {
+                'name': field,
+                'required': False,
+                'in': 'query',
+                'description': f"Valeurs de {field} séparées par des virgules",
+                'schema': {'type': 'string'},
+            } for field in self.choice_fields
+        ]
+        parameters.append({
+            'name': 'author', 'required': False, 'in': 'query', 'schema': {'type': 'integer'},
+        })
+        parameters += [
+            {
+                'name': param,
+                'required': False,
+                'in': 'query',
+                'schema': {'type': 'string', 'format': 'date-time'},
+            } for param in self.range_params
+        ]
+        return parameters
+
+
+class WhitelistOrderingFilter(OrderingFilter):
+    """
+    Tri par ?ordering= limité aux valeurs de `view.orderings`, chacune servie par un index : aucune
+    requête ne trie toute la table. Une valeur inconnue est refusée (400).
+    Sous-classe d'OrderingFilter : la pagination par curseur de DRF reprend le même tri.
+    """
+    def get_ordering(self, request, queryset, view):
+        value = request.query_params.get(self.ordering_param)
+        if value is None:
+            return view.ordering
+        try:
+            return view.orderings[value]
+        except KeyError:
+            allowed = ', '.join(view.orderings)
+            raise ValidationError({
+                self.ordering_param: [f"Tri non autorisé : {value}. Valeurs possibles : {allowed}."]
+            })
+
+    def filter_queryset(self, request, queryset, view):
+        if view.action != 'list':
+            return queryset
+        return queryset.order_by(*self.get_ordering(request, queryset, view))
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.ordering_param,
+            'required': False,
+            'in': 'query',
+            'description': ', '.join(view.orderings),
+            'schema': {'type': 'string', 'enum': list(view.orderings)},
+        }]
@@ -0,0 +1,133 @@
+"""
+Génération de données synthétiques pour les tests de charge.
+Ce module ne dépend pas de l'ORM : generate_chunk() peut s'exécuter dans un processus
+de multiprocessing.Pool sans configuration Django.
+"""
+import random
+import uuid
+
+from faker import Faker
+
+
+def skewed_counts(total, n, skew, rng):
+    """
+    Répartit `total` éléments entre `n` groupes selon une loi de Zipf d'exposant `skew`
+    (0 : répartition uniforme). L'ordre des groupes est mélangé par `rng`.
+    """
+    if n == 0:
+        return []
+    weights = [1 / (rank + 1) ** skew for rank in range(n)]
+    rng.shuffle(weights)
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    # Le reste de l'arrondi va aux groupes dont la part fractionnaire est la plus grande
+    remainder = total - sum(counts)
+    largest = sorted(range(n), key=lambda i: weights[i] * scale - counts[i], reverse=True)
+    for i in largest[:remainder]:
+        counts[i] += 1
+    return counts
+
+
+def zipf_cum_weights(n, skew):
+    cum_weights = []
+    total = 0.0
+    for rank in range(n):
+        total += 1 / (rank + 1) ** skew
+        cum_weights.append(total)
+    return cum_weights
+
+
+def sample_distinct(population, k, cum_weights, rng):
+    """
+    Tire `k` éléments distincts de `population`, pondérés par `cum_weights`.
+    """
+    k = min(k, len(population))
+    chosen = {}
+    attempts = 0
+    while len(chosen) < k and attempts < k * 20:
+        value = rng.choices(population, cum_weights=cum_weights)[0]
+        chosen[value] = None
+        attempts += 1
+    # Distribution très concentrée : on complète uniformément
+    while len(chosen) < k:
+        chosen[rng.choice(population)] = None
+    return list(chosen)
+
+
+_fake = None
+
+
+def _get_fake():
+    global _fake
+    if _fake is None:
+        _fake = Faker('fr_FR')
+    return _fake
+
+
+def generate_users(seed, first_id, count):
+    fake = _get_fake()
+    fake.seed_instance(f'{seed}:users')
+    rng = random.Random(f'{seed}:users')
+    return [
+        {
+            'kind': 'user',
+            'id': user_id,
+            'username': f'{fake.user_name()}_{user_id}',
+            'password': 'password',
+            'age': rng.randint(18, 70),
+            'can_be_contacted': rng.random() < 0.5,
+            'can_data_be_shared': rng.random() < 0.5,
+        } for user_id in range(first_id, first_id + count)
+    ]
+
+
+def generate_chunk(spec):
+    """
+    Produit les lignes d'un morceau de projet (projet et contributeurs pour le premier morceau,
+    puis une tranche d'issues avec leurs commentaires). Le résultat ne dépend que de `spec`,
+    quel que soit le processus qui l'exécute.
+    """
+    fake = _get_fake()
+    fake.seed_instance(spec['seed'])
+    rng = random.Random(spec['seed'])
+    choices = spec['choices']
+    contributors = spec['contributors']
+    rows = []
+
+    if spec['include_project']:
+        rows.append({
+            'kind': 'project',
+            'id': spec['project_id'],
+            'author': contributors[0],
+            'title': fake.catch_phrase()[:255],
+            'description': fake.paragraph(nb_sentences=3),
+            'type': rng.choice(choices['project_type']),
+        })
+        rows.extend(
+            {'kind': 'contributor', 'user': user_id, 'project': spec['project_id']}
+            for user_id in contributors[1:]
+        )
+
+    for offset, comment_count in enumerate(spec['comment_counts']):
+        issue_id = spec['first_issue_id'] + offset
+        rows.append({
+            'kind': 'issue',
+            'id': issue_id,
+            'author': rng.choice(contributors),
+            'project': spec['project_id'],
+            'title': fake.sentence(nb_words=6)[:255],
+            'description': fake.paragraph(nb_sentences=2),
+            'priority': rng.choice(choices['priority']),
+            'type': rng.choice(choices['issue_type']),
+            'status': rng.choice(choices['status']),
+        })
+        rows.extend(
+            {
+                'kind': 'comment',
+                'uuid': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                'author': rng.choice(contributors),
+                'issue': issue_id,
+                'description': fake.text(max_nb_chars=200),
+            } for _ in range(comment_count)
+        )
+    return rows
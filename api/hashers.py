@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher, make_password
+from django.db import close_old_connections
+from django.views.decorators.csrf import csrf_exempt
+
+
+FAST_PASSWORD_HASHER = 'django.contrib.auth.hashers.MD5PasswordHasher'
+
+
+def get_options():
+    return getattr(settings, 'SOFTDESK_PASSWORD_HASHING', {})
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    scrypt avec les paramètres de SOFTDESK_PASSWORD_HASHING['SCRYPT'].
+    L'identifiant reste 'scrypt' : les hashes restent lisibles par le hasher de Django, et un changement
+    de paramètres est appliqué par must_update au login suivant (re-hachage transparent).
+    """
+    @property
+    def work_factor(self):
+        return get_options().get('SCRYPT', {}).get('WORK_FACTOR', 2 ** 14)
+
+    @property
+    def block_size(self):
+        return get_options().get('SCRYPT', {}).get('BLOCK_SIZE', 8)
+
+    @property
+    def parallelism(self):
+        return get_options().get('SCRYPT', {}).get('PARALLELISM', 1)
+
+    @property
+    def maxmem(self):
+        # OpenSSL refuse par défaut plus de 32 Mo : la limite suit la mémoire réellement nécessaire
+        return 2 * 128 * self.block_size * self.work_factor * self.parallelism
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id avec les paramètres de SOFTDESK_PASSWORD_HASHING['ARGON2'] (nécessite argon2-cffi).
+    """
+    @property
+    def time_cost(self):
+        return get_options().get('ARGON2', {}).get('TIME_COST', 2)
+
+    @property
+    def memory_cost(self):
+        return get_options().get('ARGON2', {}).get('MEMORY_COST', 19456)
+
+    @property
+    def parallelism(self):
+        return get_options().get('ARGON2', {}).get('PARALLELISM', 1)
+
+
+def is_fast_hashing():
+    return bool(get_options().get('FAST'))
+
+
+def hash_password(password):
+    """
+    make_password qui utilise MD5 en mode FAST (tests). MD5 n'étant enregistré qu'en mode FAST, ces hashes
+    ne sont vérifiables que dans ce mode, où ils sont remplacés par celui du hasher par défaut à la
+    première connexion de l'utilisateur.
+    """
+    if is_fast_hashing():
+        return make_password(password, hasher='md5')
+    return make_password(password)
+
+
+_hashing_pool = None
+
+
+def get_hashing_pool():
+    global _hashing_pool
+    if _hashing_pool is None:
+        _hashing_pool = ThreadPoolExecutor(
+            max_workers=get_options().get('POOL_SIZE') or 1, thread_name_prefix='password-hashing'
+        )
+    return _hashing_pool
+
+
+def offload_hashing(view):
+    """
+    Exécute une vue synchrone qui hache des mots de passe (login) dans un pool de POOL_SIZE threads.
+    Sous ASGI, les vues synchrones partagent un seul thread : un hachage lent y bloquerait toutes les autres.
+    Le pool borne aussi le nombre de hachages simultanés, donc la charge CPU d'une vague de connexions.
+    Sans POOL_SIZE, la vue est retournée telle quelle.
+    """
+    if not get_options().get('POOL_SIZE'):
+        return view
+
+    def run(request, *args, **kwargs):
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    @csrf_exempt
+    @wraps(view)
+    async def offloaded_view(request, *args, **kwargs):
+        return await sync_to_async(run, thread_sensitive=False, executor=get_hashing_pool())(
+            request, *args, **kwargs
+        )
+
+    return offloaded_view
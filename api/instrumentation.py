@@ -0,0 +1,171 @@
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from api.metrics import record_request
+
+
+logger = logging.getLogger('api.instrumentation')
+
+_current_metrics = ContextVar('softdesk_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Mesures d'une requête HTTP : requêtes SQL (via record_query, indépendant de DEBUG)
+    et temps passé dans chaque phase (serializer, permission, authentication).
+    """
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.phases = {}
+        self._depth = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def enter(self, phase):
+        depth = self._depth.get(phase, 0)
+        self._depth[phase] = depth + 1
+        # Seul le bloc le plus externe est chronométré : les appels imbriqués ne comptent pas deux fois
+        return time.perf_counter() if depth == 0 else None
+
+    def exit(self, phase, start):
+        self._depth[phase] -= 1
+        if start is not None:
+            self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+class timed:
+    """
+    Chronomètre une phase de la requête en cours ; ne fait rien si la requête n'est pas échantillonnée.
+    """
+    __slots__ = ('phase', 'metrics', 'start')
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.metrics = _current_metrics.get()
+        if self.metrics is not None:
+            self.start = self.metrics.enter(self.phase)
+
+    def __exit__(self, *exc_info):
+        if self.metrics is not None:
+            self.metrics.exit(self.phase, self.start)
+
+
+def get_current_metrics():
+    return _current_metrics.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Wrapper installé sur chaque connexion (signal connection_created) : compte la requête SQL dans les
+    mesures de la requête HTTP courante. Le ContextVar suit la requête jusque dans les threads de
+    sync_to_async (vues async, hachage délégué), ce que ne permet pas un wrapper posé par connexion.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class InstrumentationMiddleware:
+    """
+    Pour une fraction SAMPLE_RATE des requêtes, mesure le nombre de requêtes SQL, le temps base de données,
+    serializer, permission et authentification, puis les expose dans l'en-tête Server-Timing et dans
+    une ligne de log JSON (logger 'api.instrumentation').
+    Si SOFTDESK_METRICS['ENABLED'], toutes les requêtes sont mesurées et alimentent api.metrics.
+    Sinon, les requêtes non échantillonnées ne paient qu'un tirage aléatoire.
+    Compatible sync et async : sous ASGI, une vue async n'est pas ramenée dans le thread des vues synchrones.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        options = getattr(settings, 'SOFTDESK_INSTRUMENTATION', {})
+        self.sample_rate = options.get('SAMPLE_RATE', 0.0)
+        self.server_timing = options.get('SERVER_TIMING', True)
+        self.log = options.get('LOG', True)
+        # Les métriques (/metrics) ont besoin de toutes les requêtes, pas seulement de l'échantillon
+        self.metrics = getattr(settings, 'SOFTDESK_METRICS', {}).get('ENABLED', False)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        sampled = bool(self.sample_rate) and random.random() < self.sample_rate
+        if not sampled and not self.metrics:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.process(request, response, metrics, sampled, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        sampled = bool(self.sample_rate) and random.random() < self.sample_rate
+        if not sampled and not self.metrics:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.process(request, response, metrics, sampled, time.perf_counter() - start)
+
+    def process(self, request, response, metrics, sampled, total):
+        if self.metrics:
+            record_request(request, response, metrics, total)
+        if sampled and self.server_timing:
+            response['Server-Timing'] = self.format_server_timing(metrics, total)
+        if sampled and self.log:
+            logger.info(json.dumps(self.get_log_record(request, response, metrics, total)))
+        return response
+
+    def format_server_timing(self, metrics, total):
+        entries = [f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"']
+        entries += [f'{phase};dur={duration * 1000:.2f}' for phase, duration in metrics.phases.items()]
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+    def get_log_record(self, request, response, metrics, total):
+        match = request.resolver_match
+        return {
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 2),
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            **{f'{phase}_ms': round(duration * 1000, 2) for phase, duration in metrics.phases.items()},
+        }
@@ -0,0 +1,180 @@
+import json
+import platform
+import time
+from io import StringIO
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from api.benchmarks import benchmark_database, summarize
+from api.models import Project, Issue
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure latences (percentiles), débit et nombre de requêtes SQL de chaque endpoint de l'API "
+        "sur un jeu de données généré dans une base jetable. Les résultats sont écrits en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--projects', type=int, default=20)
+        parser.add_argument('--contributors-per-project', type=int, default=10)
+        parser.add_argument('--issues-per-project', type=int, default=100)
+        parser.add_argument('--comments-per-issue', type=int, default=10)
+        parser.add_argument('--skew', type=float, default=1.0)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--token-repeat', type=int, default=10, help="Répétitions de /api/token/ (hachage lent)"
+        )
+        parser.add_argument('--output', help="Fichier JSON de résultats (sortie standard par défaut)")
+        parser.add_argument('--compare', help="Fichier JSON d'une exécution précédente à comparer")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        setup_test_environment()
+        try:
+            with benchmark_database():
+                call_command(
+                    'generate_data',
+                    users=options['users'],
+                    projects=options['projects'],
+                    contributors_per_project=options['contributors_per_project'],
+                    issues_per_project=options['issues_per_project'],
+                    comments_per_issue=options['comments_per_issue'],
+                    skew=options['skew'],
+                    seed=options['seed'],
+                    verbosity=0,
+                    stdout=StringIO(),
+                )
+                results = self.run_scenarios(options)
+        finally:
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'dataset': {
+                    key: options[key] for key in (
+                        'users', 'projects', 'contributors_per_project', 'issues_per_project',
+                        'comments_per_issue', 'skew', 'seed',
+                    )
+                },
+                'repeat': options['repeat'],
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def run_scenarios(self, options):
+        # Le projet le plus actif, son auteur et l'issue la plus commentée
+        project = Project.objects.annotate(issue_count=Count('issues')).order_by('-issue_count').first()
+        # comment_count : compteur dénormalisé de Issue
+        issue = Issue.objects.filter(project=project).order_by('-comment_count').first()
+        user = project.author
+        repeat = options['repeat']
+
+        self.results = {}
+        anonymous = Client()
+        client = Client()
+
+        self.bench('token_obtain', anonymous, 'post', '/api/token/', options['token_repeat'],
+                   data={'username': user.username, 'password': 'password'})
+        tokens = anonymous.post('/api/token/', {'username': user.username, 'password': 'password'}).json()
+        client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {tokens['access']}"
+        self.bench('token_refresh', anonymous, 'post', '/api/token/refresh/', repeat,
+                   data={'refresh': tokens['refresh']})
+
+        project_url = f'/api/project/{project.pk}/'
+        issues_url = f'{project_url}issue/'
+        comments_url = f'{issues_url}{issue.pk}/comment/'
+
+        self.bench('user_list', client, 'get', '/api/user/', repeat)
+        self.bench('user_retrieve', client, 'get', f'/api/user/{user.pk}/', repeat)
+        self.bench('user_create', anonymous, 'post', '/api/user/', repeat, data=lambda i: {
+            'username': f'bench_user_{i}', 'password': 'password', 'age': 30,
+        })
+        self.bench('user_update', client, 'patch', f'/api/user/{user.pk}/', repeat, data={'age': 31})
+
+        self.bench('project_list', client, 'get', '/api/project/', repeat)
+        self.bench('project_retrieve', client, 'get', project_url, repeat)
+        self.bench('project_create', client, 'post', '/api/project/', repeat, data=lambda i: {
+            'title': f'Bench project {i}', 'type': Project.BACKEND,
+        })
+        self.bench('project_update', client, 'patch', project_url, repeat, data={'description': 'Bench'})
+
+        self.bench('issue_list', client, 'get', issues_url, repeat)
+        self.bench('issue_list_cursor', client, 'get', f'{issues_url}?pagination=cursor', repeat)
+        self.bench('issue_retrieve', client, 'get', f'{issues_url}{issue.pk}/', repeat)
+        created = self.bench('issue_create', client, 'post', issues_url, repeat, data=lambda i: {
+            'author': user.pk, 'title': f'Bench issue {i}', 'priority': Issue.LOW, 'type': Issue.BUG,
+        })
+        self.bench('issue_update', client, 'patch', f"{issues_url}{created['id']}/", repeat,
+                   data={'status': Issue.IN_PROGRESS})
+
+        self.bench('comment_list', client, 'get', comments_url, repeat)
+        created = self.bench('comment_create', client, 'post', comments_url, repeat, data=lambda i: {
+            'description': f'Bench comment {i}',
+        })
+        comment_url = f"{comments_url}{created['uuid']}/"
+        self.bench('comment_retrieve', client, 'get', comment_url, repeat)
+        self.bench('comment_update', client, 'patch', comment_url, repeat, data={'description': 'Edited'})
+        return self.results
+
+    def bench(self, name, client, method, path, repeat, data=None):
+        """
+        Exécute `repeat` fois la même requête et enregistre durées et nombre de requêtes SQL.
+        Retourne le corps JSON de la dernière réponse.
+        """
+        durations = []
+        query_counts = []
+        response = None
+        for i in range(repeat):
+            payload = data(i) if callable(data) else data
+            kwargs = {'data': json.dumps(payload), 'content_type': 'application/json'} if payload else {}
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(client, method)(path, **kwargs)
+                durations.append(time.perf_counter() - start)
+            query_counts.append(len(queries))
+            if response.status_code >= 400:
+                raise CommandError(f"{name} : {method.upper()} {path} a répondu {response.status_code}")
+
+        self.results[name] = {
+            **summarize(durations),
+            'throughput_rps': len(durations) / sum(durations),
+            'queries_mean': sum(query_counts) / len(query_counts),
+            'queries_max': max(query_counts),
+        }
+        if self.verbosity:
+            self.stderr.write(f"{name:<20} p50 {self.results[name]['p50_ms']:8.2f} ms")
+        return response.json()
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)['results']
+        self.stderr.write(f"{'endpoint':<20} {'p50 avant':>10} {'p50 après':>10} {'écart':>8} {'SQL':>9}")
+        for name, current in results.items():
+            if name not in previous:
+                continue
+            before, after = previous[name]['p50_ms'], current['p50_ms']
+            change = (after - before) / before * 100 if before else 0.0
+            queries = f"{previous[name]['queries_max']}->{current['queries_max']}"
+            self.stderr.write(f'{name:<20} {before:10.2f} {after:10.2f} {change:+7.1f}% {queries:>9}')
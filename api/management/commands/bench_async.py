@@ -0,0 +1,157 @@
+import asyncio
+import json
+import threading
+import time
+from io import StringIO
+
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.benchmarks import benchmark_database, summarize
+from api.models import Project, Issue
+
+
+URLCONFS = {
+    'sync': 'SoftDesk.urls',
+    'async': 'api.async_urls',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sous uvicorn les lectures des viewsets synchrones et de api.async_views avec des clients "
+        "concurrents (débit et percentiles de latence). Nécessite uvicorn et httpx."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--projects', type=int, default=10)
+        parser.add_argument('--issues-per-project', type=int, default=100)
+        parser.add_argument('--comments-per-issue', type=int, default=10)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 200])
+        parser.add_argument('--requests', type=int, default=500, help="Requêtes par endpoint et par niveau")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--output', help="Fichier JSON de résultats (sortie standard par défaut)")
+
+    def handle(self, *args, **options):
+        try:
+            import httpx  # noqa: F401
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError("uvicorn et httpx sont nécessaires : pip install uvicorn httpx")
+
+        results = {}
+        setup_test_environment()
+        try:
+            # La base de test SQLite en mémoire est partagée entre les threads du serveur
+            with benchmark_database():
+                call_command(
+                    'generate_data',
+                    users=options['users'],
+                    projects=options['projects'],
+                    issues_per_project=options['issues_per_project'],
+                    comments_per_issue=options['comments_per_issue'],
+                    verbosity=0,
+                    stdout=StringIO(),
+                )
+                paths, credentials = self.get_targets()
+                for mode, urlconf in URLCONFS.items():
+                    with override_settings(ROOT_URLCONF=urlconf):
+                        results[mode] = self.run_server(options, paths, credentials)
+        finally:
+            teardown_test_environment()
+
+        output = json.dumps({'concurrency': options['concurrency'], 'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+        columns = ('clients', 'sync req/s', 'async req/s', 'p99 sync', 'p99 async')
+        self.stderr.write(f"{'endpoint':<16} " + ' '.join(f'{column:>11}' for column in columns))
+        for name, levels in results['sync'].items():
+            for level, sync in levels.items():
+                other = results['async'][name][level]
+                self.stderr.write(
+                    f"{name:<16} {level:>11} {sync['throughput_rps']:11.1f} {other['throughput_rps']:11.1f} "
+                    f"{sync['p99_ms']:11.1f} {other['p99_ms']:11.1f}"
+                )
+
+    def get_targets(self):
+        project = Project.objects.annotate(issue_count=Count('issues')).order_by('-issue_count').first()
+        # comment_count : compteur dénormalisé de Issue
+        issue = Issue.objects.filter(project=project).order_by('-comment_count').first()
+        project_url = f'/api/project/{project.pk}/'
+        paths = {
+            'project_list': '/api/project/',
+            'project_retrieve': project_url,
+            'issue_list': f'{project_url}issue/',
+            'issue_retrieve': f'{project_url}issue/{issue.pk}/',
+            'comment_list': f'{project_url}issue/{issue.pk}/comment/',
+        }
+        return paths, {'username': project.author.username, 'password': 'password'}
+
+    def run_server(self, options, paths, credentials):
+        import uvicorn
+
+        config = uvicorn.Config(
+            get_asgi_application(),
+            host='127.0.0.1',
+            port=options['port'],
+            log_level='warning',
+            lifespan='off',
+        )
+        server = uvicorn.Server(config)
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            if not thread.is_alive():
+                raise CommandError("Le serveur uvicorn n'a pas démarré")
+            time.sleep(0.05)
+        try:
+            return asyncio.run(self.load(options, paths, credentials))
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    async def load(self, options, paths, credentials):
+        import httpx
+
+        base_url = f"http://127.0.0.1:{options['port']}"
+        limits = httpx.Limits(max_connections=max(options['concurrency']))
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            tokens = (await client.post('/api/token/', data=credentials)).json()
+            client.headers['Authorization'] = f"Bearer {tokens['access']}"
+
+            results = {}
+            for name, path in paths.items():
+                results[name] = {}
+                for concurrency in options['concurrency']:
+                    result = await self.measure(client, path, concurrency, options['requests'])
+                    results[name][concurrency] = result
+                    if self.verbosity:
+                        rate = result['throughput_rps']
+                        self.stderr.write(f"{name:<16} {concurrency:>4} clients {rate:8.1f} req/s")
+        return results
+
+    async def measure(self, client, path, concurrency, total):
+        durations = []
+        remaining = iter(range(total))
+
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.get(path)
+                durations.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {path} a répondu {response.status_code}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        return {**summarize(durations), 'throughput_rps': len(durations) / elapsed}
@@ -0,0 +1,90 @@
+import json
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.benchmarks import benchmark_database, measure
+from api.models import User, Project, Issue, Comment
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la latence de la liste des commentaires d'une issue, "
+        "sans puis avec l'index composite (issue, created_time), sur une base jetable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--issues', type=int, default=1000)
+        parser.add_argument(
+            '--hot-ratio', type=float, default=0.1,
+            help="Part des commentaires concentrés sur une seule issue (la plus consultée)",
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            hot_issue, hot_count = self.populate(options)
+            index = next(
+                index for index in Comment._meta.indexes if index.name == 'comment_issue_created_idx'
+            )
+
+            with connection.schema_editor() as schema_editor:
+                schema_editor.remove_index(Comment, index)
+            before = self.run_queries(hot_issue, hot_count, options)
+
+            with connection.schema_editor() as schema_editor:
+                schema_editor.add_index(Comment, index)
+            after = self.run_queries(hot_issue, hot_count, options)
+
+        self.stdout.write(json.dumps({
+            'comments': options['comments'],
+            'hot_issue_comments': hot_count,
+            'before': before,
+            'after': after,
+        }, indent=2))
+
+    def populate(self, options):
+        user = User.objects.create_user(username='bench', password='bench', age=30)
+        project = Project.objects.create(author=user, title='Benchmark', type=Project.BACKEND)
+        issues = Issue.objects.bulk_create([
+            Issue(author=user, project=project, title=f'Issue {i}', priority=Issue.LOW, type=Issue.BUG)
+            for i in range(options['issues'])
+        ])
+
+        total = options['comments']
+        hot_count = int(total * options['hot_ratio'])
+        batch = []
+        for i in range(total):
+            # Les premiers commentaires vont sur l'issue "chaude", le reste est réparti uniformément
+            issue = issues[0] if i < hot_count else issues[i % len(issues)]
+            batch.append(Comment(uuid=uuid.uuid4(), author=user, issue=issue, description='Benchmark'))
+            if len(batch) >= options['batch_size']:
+                Comment.objects.bulk_create(batch)
+                batch = []
+                self.stdout.write(f'\r{i + 1}/{total} commentaires', ending='')
+        Comment.objects.bulk_create(batch)
+        self.stdout.write('')
+
+        if connection.vendor in ('sqlite', 'postgresql'):
+            # Met à jour les statistiques du planificateur après l'insertion massive
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        return issues[0], Comment.objects.filter(issue=issues[0]).count()
+
+    def run_queries(self, issue, count, options):
+        # Reproduit la pagination de CommentViewSet : COUNT(*) puis une page triée
+        queryset = Comment.objects.filter(issue=issue).order_by('created_time')
+        page_size = options['page_size']
+        deep_offset = max(0, count - page_size)
+
+        return {
+            'count': measure(lambda: queryset.count(), options['repeat']),
+            'first_page': measure(lambda: list(queryset[:page_size]), options['repeat']),
+            'deep_page': measure(
+                lambda: list(queryset[deep_offset:deep_offset + page_size]), options['repeat']
+            ),
+        }
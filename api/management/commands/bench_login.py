@@ -0,0 +1,102 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.benchmarks import benchmark_database, summarize
+from api.models import User
+
+
+HASHERS = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'api.hashers.TunedScryptPasswordHasher',
+    'argon2': 'api.hashers.TunedArgon2PasswordHasher',
+    'md5': 'django.contrib.auth.hashers.MD5PasswordHasher',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit de /api/token/ (connexions par seconde sur un cœur) pour chaque hasher, "
+        "ainsi que le débit du seul hachage réparti sur --workers threads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hashers', nargs='+', choices=list(HASHERS), default=['pbkdf2', 'scrypt', 'argon2']
+        )
+        parser.add_argument('--logins', type=int, default=20)
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--output', help="Fichier JSON de résultats (sortie standard par défaut)")
+
+    def handle(self, *args, **options):
+        results = {}
+        setup_test_environment()
+        try:
+            with benchmark_database():
+                for name in options['hashers']:
+                    with override_settings(PASSWORD_HASHERS=[HASHERS[name]]):
+                        try:
+                            make_password('password')
+                        except ValueError as error:
+                            # Argon2 sans argon2-cffi, par exemple
+                            self.stderr.write(f"{name} ignoré : {error}")
+                            continue
+                        results[name] = self.bench(name, options)
+        finally:
+            teardown_test_environment()
+
+        if not results:
+            raise CommandError("Aucun hasher utilisable")
+        output = json.dumps({'workers': options['workers'], 'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+        for name, result in results.items():
+            self.stderr.write(
+                f"{name:>8} : {result['logins_per_second']:8.1f} connexions/s/cœur, "
+                f"{result['hashes_per_second_per_core']:8.1f} hachages/s/cœur "
+                f"({options['workers']} threads)"
+            )
+
+    def bench(self, name, options):
+        username = f'bench_{name}'
+        User.objects.create_user(username=username, password='password', age=30)
+        client = Client()
+        credentials = {'username': username, 'password': 'password'}
+        self.login(client, credentials)
+
+        durations = []
+        for _ in range(options['logins']):
+            start = time.perf_counter()
+            self.login(client, credentials)
+            durations.append(time.perf_counter() - start)
+        summary = summarize(durations)
+
+        # Hachage seul, en parallèle : les hashers de hashlib relâchent le GIL
+        encoded = make_password('password')
+        workers = options['workers']
+        count = options['logins'] * workers
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda _: check_password('password', encoded), range(count)))
+        elapsed = time.perf_counter() - start
+
+        return {
+            'login': summary,
+            'logins_per_second': len(durations) / sum(durations),
+            'hashes_per_second_per_core': count / elapsed / workers,
+        }
+
+    def login(self, client, credentials):
+        response = client.post('/api/token/', credentials)
+        if response.status_code != 200:
+            raise CommandError(f"Connexion refusée ({response.status_code})")
@@ -0,0 +1,112 @@
+import multiprocessing
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from api.bulk import BulkLoader
+from api.generators import (
+    generate_chunk, generate_users, sample_distinct, skewed_counts, zipf_cum_weights,
+)
+from api.models import User, Project, Issue
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données synthétique déterministe (à graine fixe) pour les tests de charge. "
+        "Les lignes sont insérées par lots ; --workers génère les textes Faker en parallèle."
+    )
+    issues_per_chunk = 200
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--projects', type=int, default=10)
+        parser.add_argument('--contributors-per-project', type=int, default=5)
+        parser.add_argument('--issues-per-project', type=int, default=20, help="Moyenne par projet")
+        parser.add_argument('--comments-per-issue', type=int, default=5, help="Moyenne par issue")
+        parser.add_argument(
+            '--skew', type=float, default=0.0,
+            help="Exposant de Zipf des répartitions (0 : uniforme, 1 : quelques projets/issues très actifs)",
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError("--users doit être au moins 1.")
+        # L'auteur de chaque issue et commentaire est tiré parmi les contributeurs du projet
+        if options['contributors_per_project'] < 1:
+            raise CommandError("--contributors-per-project doit être au moins 1.")
+        self.verbosity = options['verbosity']
+
+        first_user_id = (User.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        first_project_id = (Project.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        first_issue_id = (Issue.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+        loader = BulkLoader(batch_size=options['batch_size'], on_flush=self.report_progress)
+        for row in generate_users(options['seed'], first_user_id, options['users']):
+            loader.add(row.pop('kind'), row)
+
+        specs = self.iter_chunk_specs(options, first_user_id, first_project_id, first_issue_id)
+        if options['workers'] > 1:
+            with multiprocessing.Pool(options['workers']) as pool:
+                self.load_chunks(loader, pool.imap(generate_chunk, specs))
+        else:
+            self.load_chunks(loader, map(generate_chunk, specs))
+
+        counts = loader.finish()
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            'Données générées : ' + ', '.join(f'{count} {kind}' for kind, count in counts.items())
+        ))
+
+    def load_chunks(self, loader, chunks):
+        for rows in chunks:
+            for row in rows:
+                loader.add(row.pop('kind'), row)
+
+    def iter_chunk_specs(self, options, first_user_id, first_project_id, first_issue_id):
+        """
+        Les tirages structurants (auteurs, contributeurs, volumes) sont faits ici, à partir de la graine ;
+        seuls les textes Faker sont délégués aux workers.
+        """
+        seed, skew = options['seed'], options['skew']
+        rng = random.Random(f'{seed}:projects')
+        user_ids = list(range(first_user_id, first_user_id + options['users']))
+        user_weights = zipf_cum_weights(len(user_ids), skew)
+        issue_counts = skewed_counts(
+            options['projects'] * options['issues_per_project'], options['projects'], skew, rng
+        )
+        choices = {
+            'project_type': [value for value, _ in Project.type_choices],
+            'priority': [value for value, _ in Issue.PRIORITY_CHOICES],
+            'issue_type': [value for value, _ in Issue.TYPE_CHOICES],
+            'status': [value for value, _ in Issue.STATUS_CHOICES],
+        }
+
+        issue_id = first_issue_id
+        for index, issue_count in enumerate(issue_counts):
+            project_id = first_project_id + index
+            contributors = sample_distinct(user_ids, options['contributors_per_project'], user_weights, rng)
+            comment_counts = skewed_counts(
+                issue_count * options['comments_per_issue'], issue_count, skew, rng
+            )
+
+            for start in range(0, max(issue_count, 1), self.issues_per_chunk):
+                yield {
+                    'seed': f'{seed}:project:{index}:{start}',
+                    'project_id': project_id,
+                    'include_project': start == 0,
+                    'contributors': contributors,
+                    'first_issue_id': issue_id + start,
+                    'comment_counts': comment_counts[start:start + self.issues_per_chunk],
+                    'choices': choices,
+                }
+            issue_id += issue_count
+
+    def report_progress(self, counts):
+        if self.verbosity:
+            progress = ', '.join(f'{count} {kind}' for kind, count in counts.items())
+            self.stdout.write(f'\r{progress}', ending='')
+            self.stdout.flush()
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from api.bulk import BulkLoader
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des utilisateurs, projets, contributeurs, issues et commentaires "
+        "depuis des fichiers NDJSON. "
+        "Chaque ligne porte un champ \"kind\" (user, project, contributor, issue ou comment) ; "
+        "les parents doivent apparaître avant leurs enfants."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        loader = BulkLoader(batch_size=options['batch_size'], on_flush=self.report_progress)
+
+        try:
+            for path in options['files']:
+                self.import_file(loader, path)
+            counts = loader.finish()
+        except IntegrityError as error:
+            raise CommandError(f"Lot rejeté par la base de données : {error}")
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            'Import terminé : ' + ', '.join(f'{count} {kind}' for kind, count in counts.items())
+        ))
+
+    def import_file(self, loader, path):
+        with open(path, encoding='utf-8') as file:
+            for number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    loader.add(row.pop('kind'), row)
+                except (ValueError, KeyError) as error:
+                    raise CommandError(f"{path}:{number} : ligne invalide ({error})")
+
+    def report_progress(self, counts):
+        if self.verbosity:
+            progress = ', '.join(f'{count} {kind}' for kind, count in counts.items())
+            self.stdout.write(f'\r{progress}', ending='')
+            self.stdout.flush()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.search import is_supported, rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit l'index plein texte des issues et commentaires (SQLite FTS5) depuis leurs tables, "
+        "par exemple après une restauration ou une modification directe de la base."
+    )
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError("L'index plein texte n'existe que sur SQLite.")
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Index de recherche reconstruit."))
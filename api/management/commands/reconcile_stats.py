@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.statistics import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les compteurs des projets (api.statistics) depuis les issues et commentaires, "
+        "et corrige ceux qui ont dérivé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, action='append', help="Projet à recalculer (répétable)")
+
+    def handle(self, *args, **options):
+        corrections = reconcile(options['project'])
+        for project_id, name, old, new in corrections:
+            self.stdout.write(f"Projet {project_id} : {name} {old} -> {new}")
+        self.stdout.write(self.style.SUCCESS(f"{len(corrections)} compteur(s) corrigé(s)."))
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from api.tokens import get_algorithm, get_options, thumbprint
+
+
+def write_atomic(path, data, mode=0o600):
+    # Les workers ne lisent jamais un fichier à moitié écrit
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.jwt-')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(data)
+    os.chmod(tmp_path, mode)
+    os.replace(tmp_path, path)
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère une nouvelle paire de clés de signature JWT (RS256 ou EdDSA) : "
+        "la clé publique est ajoutée au JWKS avant que la clé privée ne remplace l'ancienne, "
+        "les jetons déjà émis restent donc vérifiables jusqu'à leur expiration."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', help="Par défaut SOFTDESK_JWT['ALGORITHM']")
+        parser.add_argument('--private-key', help="Par défaut SOFTDESK_JWT['PRIVATE_KEY_PATH']")
+        parser.add_argument('--jwks', help="Par défaut SOFTDESK_JWT['JWKS_PATH']")
+        parser.add_argument('--keep', type=int, default=3, help="Nombre de clés publiques conservées")
+
+    def handle(self, *args, **options):
+        settings = get_options()
+        name = options['algorithm'] or settings.get('ALGORITHM')
+        private_key_path = options['private_key'] or settings.get('PRIVATE_KEY_PATH')
+        jwks_path = options['jwks'] or settings.get('JWKS_PATH')
+        if name not in ('RS256', 'EdDSA'):
+            raise CommandError("Algorithme asymétrique attendu : RS256 ou EdDSA")
+        if not private_key_path or not jwks_path:
+            raise CommandError("Chemins de la clé privée et du JWKS requis")
+
+        try:
+            algorithm = get_algorithm(name)
+        except ImproperlyConfigured as error:
+            raise CommandError(str(error))
+
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+        if name == 'RS256':
+            private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        else:
+            private_key = ed25519.Ed25519PrivateKey.generate()
+
+        jwk = algorithm.to_jwk(private_key.public_key(), as_dict=True)
+        jwk.update(kid=thumbprint(jwk), alg=name, use='sig')
+
+        keys = []
+        if os.path.exists(jwks_path):
+            with open(jwks_path) as file:
+                keys = json.load(file).get('keys', [])
+        keys = (keys + [jwk])[-options['keep']:]
+
+        write_atomic(jwks_path, json.dumps({'keys': keys}, indent=2).encode(), mode=0o644)
+        write_atomic(private_key_path, private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+        self.stdout.write(self.style.SUCCESS(f"Nouvelle clé {name} active : kid {jwk['kid']}"))
@@ -0,0 +1,261 @@
+import glob
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from api.cache import get_membership_cache
+
+
+HISTOGRAMS = {
+    'softdesk_http_request_duration_seconds': (
+        "Durée des requêtes HTTP par route",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    ),
+    'softdesk_viewset_db_queries': (
+        "Nombre de requêtes SQL par requête HTTP, par viewset",
+        (1, 2, 3, 5, 10, 20, 50, 100),
+    ),
+    'softdesk_token_authentication_seconds': (
+        "Durée de l'authentification par jeton JWT",
+        (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+    ),
+}
+
+COUNTERS = {
+    'softdesk_http_requests_total': "Nombre de requêtes HTTP par route et code de statut",
+    'softdesk_membership_cache_hits_total': "Rôles trouvés dans le cache inter-requêtes",
+    'softdesk_membership_cache_misses_total': "Rôles absents du cache inter-requêtes",
+}
+
+
+def get_options():
+    return getattr(settings, 'SOFTDESK_METRICS', {})
+
+
+class MetricsRegistry:
+    """
+    Compteurs et histogrammes du processus courant.
+    Avec SOFTDESK_METRICS['DIRECTORY'], chaque processus (worker gunicorn) écrit périodiquement
+    un instantané dans ce répertoire ; /metrics additionne les instantanés de tous les processus vivants
+    et supprime ceux des processus terminés.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def _check_fork(self):
+        # Après un fork, le worker repart de zéro : les valeurs du parent restent dans son propre fichier
+        if os.getpid() != self.pid:
+            self._reset()
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._check_fork()
+            key = (name, tuple(sorted(labels.items())))
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            self._check_fork()
+            key = (name, tuple(sorted(labels.items())))
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                buckets = HISTOGRAMS[name][1]
+                histogram = self.histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(HISTOGRAMS[name][1]):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            self._check_fork()
+            cache = get_membership_cache().stats()
+            counters = dict(self.counters)
+            counters[('softdesk_membership_cache_hits_total', ())] = cache['hits']
+            counters[('softdesk_membership_cache_misses_total', ())] = cache['misses']
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()],
+                'histograms': [
+                    [name, dict(labels), histogram] for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def flush(self, force=False):
+        directory = get_options().get('DIRECTORY')
+        now = time.monotonic()
+        if not directory or (not force and now - self.last_flush < get_options().get('FLUSH_INTERVAL', 5)):
+            return
+        self.last_flush = now
+        snapshot = self.snapshot()
+        # Écriture atomique : un scrape concurrent ne lit jamais un fichier partiel
+        fd, path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(snapshot, file)
+        os.replace(path, os.path.join(directory, f'metrics-{self.pid}.json'))
+
+    def collect(self):
+        """
+        Retourne les instantanés de tous les processus (un seul sans répertoire partagé).
+        """
+        directory = get_options().get('DIRECTORY')
+        if not directory:
+            return [self.snapshot()]
+
+        self.flush(force=True)
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            if not _is_running(_snapshot_pid(path)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+def _snapshot_pid(path):
+    try:
+        return int(os.path.basename(path)[len('metrics-'):-len('.json')])
+    except ValueError:
+        return None
+
+
+def _is_running(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Processus d'un autre utilisateur : il existe
+        return True
+    return True
+
+
+registry = MetricsRegistry()
+
+
+def record_request(request, response, metrics, duration):
+    """
+    Appelé par InstrumentationMiddleware pour chaque requête lorsque les métriques sont activées.
+    """
+    match = request.resolver_match
+    view = match.view_name if match else '<unmatched>'
+    viewset = getattr(match.func, 'cls', None) if match else None
+
+    registry.observe(
+        'softdesk_http_request_duration_seconds', {'view': view, 'method': request.method}, duration
+    )
+    registry.inc('softdesk_http_requests_total', {
+        'view': view, 'method': request.method, 'status': str(response.status_code),
+    })
+    if viewset is not None:
+        registry.observe('softdesk_viewset_db_queries', {'viewset': viewset.__name__}, metrics.queries)
+    if 'authentication' in metrics.phases:
+        registry.observe('softdesk_token_authentication_seconds', {}, metrics.phases['authentication'])
+    registry.flush()
+
+
+def merge(snapshots):
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(sorted(labels.items())))
+            merged = histograms.setdefault(
+                key, {'buckets': [0] * len(histogram['buckets']), 'sum': 0.0, 'count': 0}
+            )
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], histogram['buckets'])]
+            merged['sum'] += histogram['sum']
+            merged['count'] += histogram['count']
+    return counters, histograms
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    ]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def render(counters, histograms):
+    """
+    Format d'exposition texte de Prometheus (version 0.0.4).
+    """
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (key_name, labels), value in sorted(counters.items()):
+            if key_name == name:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+
+    hits = counters.get(('softdesk_membership_cache_hits_total', ()), 0)
+    misses = counters.get(('softdesk_membership_cache_misses_total', ()), 0)
+    lines += [
+        '# HELP softdesk_membership_cache_hit_ratio Part des rôles servis par le cache inter-requêtes',
+        '# TYPE softdesk_membership_cache_hit_ratio gauge',
+        f'softdesk_membership_cache_hit_ratio {hits / (hits + misses) if hits + misses else 0.0}',
+    ]
+
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (key_name, labels), histogram in sorted(histograms.items()):
+            if key_name != name:
+                continue
+            for bound, count in zip(bounds, histogram['buckets']):
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {count}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {histogram["count"]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {histogram["sum"]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def is_allowed(request):
+    """
+    Accès à /metrics sur configuration explicite uniquement : jeton SOFTDESK_METRICS['TOKEN'] (en-tête
+    Authorization: Bearer) ou adresse de SOFTDESK_METRICS['ALLOWED_IPS'].
+    """
+    options = get_options()
+    token = options.get('TOKEN')
+    if token:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if hmac.compare_digest(header.encode(), f'Bearer {token}'.encode()):
+            return True
+    return request.META.get('REMOTE_ADDR') in options.get('ALLOWED_IPS', [])
+
+
+def metrics_view(request):
+    """
+    Endpoint /metrics, réservé aux scrapers autorisés (is_allowed).
+    """
+    if not is_allowed(request):
+        return HttpResponseForbidden()
+    counters, histograms = merge(registry.collect())
+    return HttpResponse(render(counters, histograms), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:24
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_contributors(apps, schema_editor):
+    # Conserve la plus ancienne ligne de chaque couple (user, project) avant d'ajouter la contrainte
+    Contributor = apps.get_model('api', 'Contributor')
+    duplicates = (
+        Contributor.objects.values('user', 'project')
+        .annotate(keep_id=Min('id'), count=Count('id'))
+        .filter(count__gt=1)
+        .values_list('user', 'project', 'keep_id')
+    )
+    for user_id, project_id, keep_id in duplicates:
+        Contributor.objects.filter(user_id=user_id, project_id=project_id).exclude(id=keep_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['issue', 'created_time'], name='comment_issue_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'created_time'], name='issue_project_created_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_contributors, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='contributor',
+            constraint=models.UniqueConstraint(fields=('user', 'project'), name='unique_contributor'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from api import search
+
+
+def create_search_index(apps, schema_editor):
+    # Index FTS5 propre à SQLite : les autres bases utilisent la recherche par sous-chaîne de api.search
+    if schema_editor.connection.vendor == 'sqlite':
+        search.create_index(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_change_tracking'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
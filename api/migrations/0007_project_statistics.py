@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+COUNTED_FIELDS = ('status', 'priority', 'type')
+
+
+def count_existing(apps, schema_editor):
+    # Compteurs initiaux calculés depuis les issues et commentaires existants (voir api.statistics)
+    Issue = apps.get_model('api', 'Issue')
+    Comment = apps.get_model('api', 'Comment')
+    ProjectStatistic = apps.get_model('api', 'ProjectStatistic')
+    values = {}
+    for field in (None,) + COUNTED_FIELDS:
+        fields = ('project_id',) if field is None else ('project_id', field)
+        for row in Issue.objects.values(*fields).annotate(count=Count('id')):
+            name = 'issues' if field is None else f"{field}:{row[field]}"
+            values[row['project_id'], name] = row['count']
+    for row in Comment.objects.values('issue__project_id').annotate(count=Count('uuid')):
+        values[row['issue__project_id'], 'comments'] = row['count']
+    ProjectStatistic.objects.bulk_create(
+        [ProjectStatistic(project_id=project_id, name=name, value=value)
+         for (project_id, name), value in values.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_issue_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('value', models.BigIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='api.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'name'), name='unique_project_statistic')],
+            },
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:30
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from api import search
+
+
+def count_comments(apps, schema_editor):
+    # Même calcul que IssueQuerySet.refresh_comment_activity
+    Issue = apps.get_model('api', 'Issue')
+    Comment = apps.get_model('api', 'Comment')
+    comments = Comment.objects.filter(issue=OuterRef('pk')).order_by().values('issue')
+    count = Subquery(comments.annotate(count=Count('pk')).values('count'))
+    last_comment_time = Subquery(comments.annotate(last=Max('created_time')).values('last'))
+    Issue.objects.update(
+        comment_count=Coalesce(count, 0),
+        last_activity_time=Greatest('created_time', Coalesce(last_comment_time, 'created_time')),
+    )
+
+
+def recreate_search_index(apps, schema_editor):
+    # SQLite reconstruit api_issue pour ajouter (ou retirer) une colonne avec valeur par défaut :
+    # les triggers de l'index plein texte (api.search) disparaissent avec l'ancienne table
+    if schema_editor.connection.vendor == 'sqlite':
+        search.drop_index(schema_editor)
+        search.create_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_project_statistics'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, recreate_search_index),
+        migrations.AddField(
+            model_name='issue',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='last_activity_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'comment_count', 'created_time', 'id'], name='issue_project_comments_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'last_activity_time', 'id'], name='issue_project_activity_idx'),
+        ),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,13 @@
-from django.db import models, transaction
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
 import uuid
 
+from api.cache import invalidate_membership
+
 
 class User(AbstractUser):
     age = models.PositiveIntegerField(
@@ -17,6 +22,15 @@ class User(AbstractUser):
         return self.username
 
 
+class ProjectQuerySet(models.QuerySet):
+    def bump_version(self):
+        """
+        Incrémente la version des projets (ETag des GET conditionnels) en un seul UPDATE.
+        À appeler à chaque modification d'un projet, de ses contributeurs, issues ou commentaires.
+        """
+        return self.update(version=F('version') + 1, updated_time=timezone.now())
+
+
 class Project(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='projects')
     title = models.CharField(max_length=255)
@@ -36,6 +50,19 @@ class Project(models.Model):
 
     type = models.CharField(max_length=30, choices=type_choices)
     created_time = models.DateTimeField(auto_now_add=True)
+    # Modifiés par ProjectQuerySet.bump_version (voir api.signals) : ETag et Last-Modified des GET
+    # conditionnels sur le projet, ses issues et ses commentaires
+    updated_time = models.DateTimeField(auto_now=True)
+    version = models.PositiveBigIntegerField(default=1)
+
+    objects = ProjectQuerySet.as_manager()
+
+    # Statuts renvoyés par add_contributors / remove_contributors
+    ADDED = 'ADDED'
+    REMOVED = 'REMOVED'
+    ALREADY_CONTRIBUTOR = 'ALREADY_CONTRIBUTOR'
+    NOT_CONTRIBUTOR = 'NOT_CONTRIBUTOR'
+    NOT_FOUND = 'NOT_FOUND'
 
     def __str__(self):
         return self.title
@@ -43,34 +70,105 @@ class Project(models.Model):
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
         Contributor.objects.get_or_create(
-            user=self.author,
+            user_id=self.author_id,
             project=self
         )
 
-    @transaction.atomic
     def add_contributor(self, user):
-        contributor = Contributor.objects.filter(
+        # Insertion directe : la contrainte unique_contributor rejette les doublons
+        try:
+            with transaction.atomic():
+                Contributor.objects.create(
+                    user=user,
+                    project=self
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def remove_contributor(self, user):
+        deleted, _ = Contributor.objects.filter(
             user=user,
             project=self
+        ).delete()
+        return deleted > 0
+
+    def _resolve_users(self, user_ids):
+        # Une seule requête : utilisateurs existants et leur statut de contributeur sur ce projet
+        return dict(
+            User.objects.filter(id__in=user_ids).annotate(
+                is_contributor=Exists(Contributor.objects.filter(project=self, user=OuterRef('pk')))
+            ).values_list('id', 'is_contributor')
         )
-        if not contributor.exists():
-            Contributor.objects.create(
-                user=user,
-                project=self
-            )
-            return True
-        return False
 
     @transaction.atomic
-    def remove_contributor(self, user):
-        contributor = Contributor.objects.filter(
-            user=user,
-            project=self
+    def add_contributors(self, user_ids):
+        """
+        Ajoute plusieurs contributeurs en une seule insertion.
+        Retourne le statut de chaque utilisateur : ADDED, ALREADY_CONTRIBUTOR ou NOT_FOUND.
+        """
+        users = self._resolve_users(user_ids)
+        to_add = [user_id for user_id, is_contributor in users.items() if not is_contributor]
+        Contributor.objects.bulk_create(
+            [Contributor(user_id=user_id, project=self) for user_id in to_add],
+            ignore_conflicts=True,
+        )
+        # bulk_create n'envoie pas de signal post_save
+        for user_id in to_add:
+            invalidate_membership(user_id, self.pk)
+        if to_add:
+            Project.objects.filter(pk=self.pk).bump_version()
+
+        results = {}
+        for user_id in user_ids:
+            if user_id not in users:
+                results[user_id] = self.NOT_FOUND
+            elif users[user_id]:
+                results[user_id] = self.ALREADY_CONTRIBUTOR
+            else:
+                results[user_id] = self.ADDED
+        return results
+
+    @transaction.atomic
+    def remove_contributors(self, user_ids):
+        """
+        Retire plusieurs contributeurs en une seule suppression.
+        Retourne le statut de chaque utilisateur : REMOVED, NOT_CONTRIBUTOR ou NOT_FOUND.
+        """
+        users = self._resolve_users(user_ids)
+        Contributor.objects.filter(project=self, user_id__in=users).delete()
+
+        results = {}
+        for user_id in user_ids:
+            if user_id not in users:
+                results[user_id] = self.NOT_FOUND
+            elif users[user_id]:
+                results[user_id] = self.REMOVED
+            else:
+                results[user_id] = self.NOT_CONTRIBUTOR
+        return results
+
+
+class IssueQuerySet(models.QuerySet):
+    def add_comment_activity(self, delta, time):
+        """
+        Ajoute `delta` commentaires aux issues et fixe leur dernière activité, en un seul UPDATE.
+        À appeler dans la transaction de la création ou de la suppression du commentaire.
+        """
+        return self.update(comment_count=F('comment_count') + delta, last_activity_time=time)
+
+    def refresh_comment_activity(self):
+        """
+        Recalcule comment_count et last_activity_time depuis api_comment (insertions par lot, suppressions
+        en cascade), en un seul UPDATE.
+        """
+        comments = Comment.objects.filter(issue=OuterRef('pk')).order_by().values('issue')
+        count = Subquery(comments.annotate(count=Count('pk')).values('count'))
+        last_comment_time = Subquery(comments.annotate(last=Max('created_time')).values('last'))
+        return self.update(
+            comment_count=Coalesce(count, 0),
+            last_activity_time=Greatest('created_time', Coalesce(last_comment_time, 'created_time')),
         )
-        if contributor.exists():
-            contributor.delete()
-            return True
-        return False
 
 
 class Issue(models.Model):
@@ -114,10 +212,52 @@ class Issue(models.Model):
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default=TODO)
 
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+    # Dénormalisés pour les listes : modifiés par IssueQuerySet.add_comment_activity à la création et
+    # à la suppression de chaque commentaire (voir api.signals et CommentViewSet)
+    comment_count = models.PositiveIntegerField(default=0)
+    last_activity_time = models.DateTimeField(default=timezone.now)
+
+    objects = IssueQuerySet.as_manager()
+
+    # Statuts renvoyés par la mise à jour par lot
+    UPDATED = 'UPDATED'
+    FORBIDDEN = 'FORBIDDEN'
+    NOT_FOUND = 'NOT_FOUND'
+
+    # Champs comptés par api.statistics
+    COUNTED_FIELDS = ('status', 'priority', 'type')
+
+    class Meta:
+        indexes = [
+            # Listes d'issues d'un projet triées par date de création (pk départage les égalités)
+            models.Index(fields=['project', 'created_time', 'id'], name='issue_project_created_idx'),
+            # Filtres et tris de la liste (api.filters) : égalité sur le champ puis ordre de création
+            models.Index(fields=['project', 'status', 'created_time', 'id'], name='issue_project_status_idx'),
+            models.Index(
+                fields=['project', 'priority', 'created_time', 'id'], name='issue_project_priority_idx'
+            ),
+            models.Index(fields=['project', 'type', 'created_time', 'id'], name='issue_project_type_idx'),
+            models.Index(fields=['project', 'author', 'created_time', 'id'], name='issue_project_author_idx'),
+            models.Index(
+                fields=['project', 'comment_count', 'created_time', 'id'], name='issue_project_comments_idx'
+            ),
+            models.Index(fields=['project', 'last_activity_time', 'id'], name='issue_project_activity_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Valeurs lues en base des champs comptés : une modification déplace l'issue d'un compteur à l'autre
+        instance = super().from_db(db, field_names, values)
+        instance._counted_values = {
+            field: value for field, value in zip(field_names, values)
+            if field in cls.COUNTED_FIELDS and value is not models.DEFERRED
+        }
+        return instance
+
 
 class Comment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
@@ -125,6 +265,13 @@ class Comment(models.Model):
     description = models.TextField(max_length=2048)
     uuid = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Listes de commentaires d'une issue triées par date de création (pk départage les égalités)
+            models.Index(fields=['issue', 'created_time', 'uuid'], name='comment_issue_created_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.issue.title}"
@@ -133,3 +280,27 @@ class Comment(models.Model):
 class Contributor(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='contributions')
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='contributors')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'project'], name='unique_contributor'),
+        ]
+
+
+class ProjectStatistic(models.Model):
+    """
+    Compteur dénormalisé d'un projet (voir api.statistics) : nombre d'issues, de commentaires et
+    d'issues par status, priority et type. Les compteurs sont modifiés par incréments F() dans la
+    transaction de chaque écriture.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='statistics')
+    name = models.CharField(max_length=50)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'name'], name='unique_project_statistic'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
@@ -0,0 +1,80 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, CursorPagination, LimitOffsetPagination
+
+
+class CreatedTimeCursorPagination(CursorPagination):
+    """
+    Pagination par curseur (keyset) sur (created_time, pk) : pas de COUNT(*) ni d'OFFSET,
+    chaque page est lue directement dans les index (project|issue, created_time, pk).
+    Les curseurs renvoyés dans `next` / `previous` sont opaques (encodés en base64).
+    """
+    ordering = ('created_time', 'pk')
+
+
+class SwitchablePagination(BasePagination):
+    """
+    Pagination limit/offset par défaut (comportement historique de l'API).
+    La pagination par curseur est utilisée :
+    - si le client passe ?pagination=cursor (ou suit un lien contenant ?cursor=...)
+    - ou si la vue déclare pagination_mode = 'cursor'
+    Le client peut forcer le mode historique avec ?pagination=limit_offset.
+    Le curseur de DRF ne retient que le premier champ du tri (et au plus 1000 lignes de même valeur) :
+    si la vue déclare cursor_orderings, les autres tris (?ordering=) sont refusés en mode curseur.
+    """
+    mode_query_param = 'pagination'
+    LIMIT_OFFSET = 'limit_offset'
+    CURSOR = 'cursor'
+
+    limit_offset_class = LimitOffsetPagination
+    cursor_class = CreatedTimeCursorPagination
+
+    def __init__(self):
+        self.paginator = None
+
+    def get_mode(self, request, view):
+        mode = request.query_params.get(self.mode_query_param)
+        if mode in (self.LIMIT_OFFSET, self.CURSOR):
+            return mode
+        if self.cursor_class.cursor_query_param in request.query_params:
+            return self.CURSOR
+        return getattr(view, 'pagination_mode', self.LIMIT_OFFSET)
+
+    def check_cursor_ordering(self, request, view):
+        ordering = request.query_params.get(OrderingFilter.ordering_param)
+        allowed = getattr(view, 'cursor_orderings', None)
+        if ordering is not None and allowed is not None and ordering not in allowed:
+            raise ValidationError({OrderingFilter.ordering_param: [
+                f"Tri incompatible avec la pagination par curseur : {ordering}. "
+                f"Valeurs possibles : {', '.join(allowed)}."
+            ]})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.get_mode(request, view) == self.CURSOR:
+            self.check_cursor_ordering(request, view)
+            self.paginator = self.cursor_class()
+        else:
+            self.paginator = self.limit_offset_class()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.limit_offset_class().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            self.limit_offset_class().get_schema_operation_parameters(view)
+            + self.cursor_class().get_schema_operation_parameters(view)
+        )
+
+    @property
+    def display_page_controls(self):
+        return self.paginator is not None and self.paginator.display_page_controls
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
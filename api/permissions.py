@@ -1,6 +1,134 @@
+from asgiref.sync import sync_to_async
 from rest_framework.permissions import BasePermission
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from api.models import Project
+from api.cache import get_membership_cache
+from api.models import Project, Contributor
+
+
+class ProjectMembership:
+    """
+    Rôle d'un utilisateur sur un projet : auteur, contributeur ou aucun (None).
+    Le projet n'est chargé depuis la base que s'il est réellement utilisé.
+    """
+    AUTHOR = 'AUTHOR'
+    CONTRIBUTOR = 'CONTRIBUTOR'
+
+    def __init__(self, project_pk, role, project=None):
+        self.project_pk = project_pk
+        self.role = role
+        self._project = project
+
+    @property
+    def project(self):
+        if self._project is None:
+            self._project = get_object_or_404(Project, pk=self.project_pk)
+        return self._project
+
+    @property
+    def loaded_project(self):
+        """
+        Le projet s'il a déjà été chargé (rôle absent du cache), sinon None.
+        """
+        return self._project
+
+    @property
+    def is_author(self):
+        return self.role == self.AUTHOR
+
+    @property
+    def is_contributor(self):
+        # L'auteur est toujours contributeur de son projet
+        return self.role is not None
+
+
+def get_project_membership(request, project_pk, user=None, project=None):
+    """
+    Retourne le ProjectMembership de `user` (par défaut l'utilisateur de la requête) sur le projet.
+    Le rôle est d'abord cherché dans le cache inter-requêtes (api.cache), sinon le projet et le rôle
+    sont chargés en une seule requête SQL. Le résultat est mémorisé sur la requête : les permissions,
+    les serializers et les vues le partagent.
+    Lève une 404 si le projet n'existe pas.
+    """
+    memberships, key, membership = _lookup_membership(request, project_pk, user, project)
+    if membership is None:
+        role, project = _load_role(key[1], key[0], project)
+        membership = memberships[key] = ProjectMembership(key[0], role, project=project)
+    return membership
+
+
+async def aget_project_membership(request, project_pk, user=None, project=None):
+    """
+    Version async de get_project_membership pour api.async_views : un rôle trouvé dans le cache ne
+    quitte pas la boucle d'événements, seul le chargement depuis la base passe par un thread.
+    """
+    memberships, key, membership = _lookup_membership(request, project_pk, user, project)
+    if membership is None:
+        role, project = await sync_to_async(_load_role)(key[1], key[0], project)
+        membership = memberships[key] = ProjectMembership(key[0], role, project=project)
+    return membership
+
+
+def _lookup_membership(request, project_pk, user, project):
+    user_pk = (user or request.user).pk
+    memberships = getattr(request, '_project_memberships', None)
+    if memberships is None:
+        memberships = request._project_memberships = {}
+
+    try:
+        project_pk = int(project_pk)
+    except (TypeError, ValueError):
+        raise Http404
+
+    key = (project_pk, user_pk)
+    if key in memberships:
+        return memberships, key, memberships[key]
+
+    cache = get_membership_cache()
+    role = cache.get(user_pk, project_pk)
+    if role is not cache.MISSING:
+        memberships[key] = ProjectMembership(project_pk, role, project=project)
+        return memberships, key, memberships[key]
+    return memberships, key, None
+
+
+def _load_role(user_pk, project_pk, project):
+    if project is None:
+        project = get_object_or_404(
+            Project.objects.annotate(
+                is_contributor=Exists(Contributor.objects.filter(project=OuterRef('pk'), user_id=user_pk))
+            ),
+            pk=project_pk,
+        )
+        is_contributor = project.is_contributor
+    else:
+        is_contributor = project.contributors.filter(user_id=user_pk).exists()
+
+    if project.author_id == user_pk:
+        role = ProjectMembership.AUTHOR
+    elif is_contributor:
+        role = ProjectMembership.CONTRIBUTOR
+    else:
+        role = None
+
+    # Une lecture faite dans une transaction non validée ne doit pas être partagée
+    if not transaction.get_connection().in_atomic_block:
+        get_membership_cache().set(user_pk, project_pk, role)
+    return role, project
+
+
+def remember_roles(user_pk, roles):
+    """
+    Enregistre dans le cache des rôles ceux lus par ailleurs ({project_pk: role}) : les requêtes suivantes
+    de l'utilisateur sur ces projets ne chargent plus son rôle.
+    """
+    if transaction.get_connection().in_atomic_block:
+        return
+    cache = get_membership_cache()
+    for project_pk, role in roles.items():
+        cache.set(user_pk, project_pk, role)
 
 
 class UserPermission(BasePermission):
@@ -27,7 +155,7 @@ class UserPermission(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.user.is_authenticated:
             # Autorise l'utilisateur à lire, modifier ou supprimer son propre profil
-            if obj == request.user:
+            if obj.pk == request.user.pk:
                 return True
 
         return False
@@ -45,13 +173,15 @@ class ProjectPermission(BasePermission):
         if request.method == 'OPTIONS':
             return True
 
+        membership = get_project_membership(request, obj.pk, project=obj)
+
         # Autorise les méthodes de lectures uniquement si l'user est un contributeur
         if request.method in ('GET', 'HEAD'):
-            if obj.contributors.filter(user=request.user).exists():
+            if membership.is_contributor:
                 return True
 
         # Autorise l'auteur à tout faire
-        return obj.author == request.user
+        return membership.is_author
 
 
 class IssueAndCommentPermission(BasePermission):
@@ -66,7 +196,7 @@ class IssueAndCommentPermission(BasePermission):
         if not project_pk:
             return False
 
-        project = get_object_or_404(Project, pk=project_pk)
+        membership = get_project_membership(request, project_pk)
 
         # Autorise tout le monde à la méthode OPTIONS
         if request.method == 'OPTIONS':
@@ -74,10 +204,7 @@ class IssueAndCommentPermission(BasePermission):
 
         # Autorise les contributeurs et l'auteur du projet à créer ou lister les issues/comments
         if request.method in ('GET', 'HEAD', 'POST'):
-            return (
-                project.contributors.filter(user=request.user).exists()
-                or project.author == request.user
-            )
+            return membership.is_contributor
 
         return True
 
@@ -87,17 +214,14 @@ class IssueAndCommentPermission(BasePermission):
         if not project_pk:
             return False
 
-        project = get_object_or_404(Project, pk=project_pk)
+        membership = get_project_membership(request, project_pk)
 
         # Authorise l'auteur ou les contributeurs du projet à lire le détail de l'issue/comment
         if request.method in ('GET', 'HEAD'):
-            return (
-                project.contributors.filter(user=request.user).exists() or
-                project.author == request.user
-            )
+            return membership.is_contributor
 
         # Autorise l'auteur à modifier ou supprimer
         if request.method in ('PUT', 'PATCH', 'DELETE'):
-            return obj.author == request.user
+            return obj.author_id == request.user.pk
 
         return True
@@ -0,0 +1,235 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+def get_options():
+    return getattr(settings, 'SOFTDESK_RENDER_CACHE', {})
+
+
+class LocMemBackend:
+    """
+    Rendus en mémoire du processus, bornés en octets (éviction LRU).
+    Une seule version est conservée par projet : la version suivante remplace la précédente.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, project_id, version):
+        with self._lock:
+            entry = self._data.get(project_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._data.move_to_end(project_id)
+            return entry[1]
+
+    def set(self, project_id, version, content):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(project_id, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self._data[project_id] = (version, content)
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+class FileBackend:
+    """
+    Un fichier par projet dans DIRECTORY (première ligne : version), partagé par les workers d'une
+    même machine et conservé entre les redémarrages. Au-delà de MAX_BYTES, les fichiers les moins
+    récemment écrits sont supprimés.
+    """
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, project_id):
+        return os.path.join(self.directory, f'project-{project_id}.json')
+
+    def get(self, project_id, version):
+        try:
+            with open(self._path(project_id), 'rb') as file:
+                header = file.readline()
+                if header != b'%d\n' % version:
+                    return None
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, project_id, version, content):
+        if len(content) > self.max_bytes:
+            return
+        # Écriture atomique : un lecteur ne voit jamais un fichier partiel
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(b'%d\n' % version)
+            file.write(content)
+        os.replace(path, self._path(project_id))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(entry[1] for entry in entries)
+        for _, file_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                os.remove(entry.path)
+
+
+class DjangoCacheBackend:
+    """
+    Cache Django CACHES[ALIAS] (Redis, Memcached...) partagé entre machines ; la borne en octets
+    est celle du serveur de cache (maxmemory), TIMEOUT limite la durée de vie des entrées.
+    """
+    def __init__(self, alias, timeout):
+        self._cache = caches[alias]
+        self.timeout = timeout
+
+    def _key(self, project_id, version):
+        return f'project-detail:{project_id}:{version}'
+
+    def get(self, project_id, version):
+        return self._cache.get(self._key(project_id, version))
+
+    def set(self, project_id, version, content):
+        self._cache.set(self._key(project_id, version), content, self.timeout)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.content = None
+
+
+class RenderCache:
+    """
+    Rendus JSON du détail des projets indexés par (project_id, version) : Project.version est
+    incrémentée à chaque écriture sur le projet, ses contributeurs, issues ou commentaires, une entrée
+    n'est donc jamais invalidée, seulement remplacée.
+    Un seul thread du processus calcule un rendu manquant (single-flight) : les requêtes simultanées
+    sur le même projet attendent son résultat au lieu de relancer les mêmes requêtes SQL.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get_or_render(self, project_id, version, render):
+        content = self.backend.get(project_id, version)
+        if content is not None:
+            self.hits += 1
+            return content
+        self.misses += 1
+
+        key = (project_id, version)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.content is not None:
+                return flight.content
+            # Échec du calcul initial : chaque requête retente pour son compte
+            return render()
+
+        try:
+            flight.content = render()
+            self.backend.set(project_id, version, flight.content)
+            return flight.content
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+        self.backend.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': self.backend.__class__.__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+
+BACKENDS = {
+    'locmem': lambda options: LocMemBackend(options.get('MAX_BYTES', 32 * 1024 * 1024)),
+    'file': lambda options: FileBackend(options['DIRECTORY'], options.get('MAX_BYTES', 256 * 1024 * 1024)),
+    'django': lambda options: DjangoCacheBackend(
+        options.get('ALIAS', 'default'), options.get('TIMEOUT', 300)
+    ),
+}
+
+_render_cache = None
+
+
+def get_render_cache():
+    """
+    Le RenderCache configuré par SOFTDESK_RENDER_CACHE, ou None si BACKEND vaut None.
+    """
+    global _render_cache
+    options = get_options()
+    backend = options.get('BACKEND')
+    if backend is None:
+        return None
+    if _render_cache is None:
+        try:
+            factory = BACKENDS[backend]
+        except KeyError:
+            raise ValueError(f"Backend de cache inconnu : {backend}")
+        _render_cache = RenderCache(factory(options))
+    return _render_cache
+
+
+@receiver(setting_changed)
+def reset_render_cache(setting, **kwargs):
+    global _render_cache
+    if setting == 'SOFTDESK_RENDER_CACHE':
+        _render_cache = None
@@ -0,0 +1,189 @@
+import re
+import uuid
+
+from django.db import connection
+from django.db.models import Q
+
+from api.models import Issue, Comment
+
+
+# Index FTS5 à contenu externe : les textes restent dans api_issue / api_comment, les triggers
+# ci-dessous tiennent l'index à jour dans la transaction de chaque écriture, y compris bulk_create,
+# queryset.update() et les suppressions en cascade, qui n'envoient pas de signal
+TOKENIZE = "unicode61 remove_diacritics 2"
+
+SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE api_issue_fts USING fts5(
+        title, description, content='api_issue', content_rowid='id', tokenize='{TOKENIZE}'
+    )
+    """,
+    """
+    CREATE TRIGGER api_issue_fts_insert AFTER INSERT ON api_issue BEGIN
+        INSERT INTO api_issue_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_issue_fts_delete AFTER DELETE ON api_issue BEGIN
+        INSERT INTO api_issue_fts(api_issue_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_issue_fts_update AFTER UPDATE OF title, description ON api_issue BEGIN
+        INSERT INTO api_issue_fts(api_issue_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO api_issue_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE VIRTUAL TABLE api_comment_fts USING fts5(
+        description, content='api_comment', tokenize='{TOKENIZE}'
+    )
+    """,
+    """
+    CREATE TRIGGER api_comment_fts_insert AFTER INSERT ON api_comment BEGIN
+        INSERT INTO api_comment_fts(rowid, description) VALUES (new.rowid, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_comment_fts_delete AFTER DELETE ON api_comment BEGIN
+        INSERT INTO api_comment_fts(api_comment_fts, rowid, description)
+        VALUES ('delete', old.rowid, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_comment_fts_update AFTER UPDATE OF description ON api_comment BEGIN
+        INSERT INTO api_comment_fts(api_comment_fts, rowid, description)
+        VALUES ('delete', old.rowid, old.description);
+        INSERT INTO api_comment_fts(rowid, description) VALUES (new.rowid, new.description);
+    END
+    """,
+]
+
+DROP_SCHEMA = [
+    "DROP TRIGGER IF EXISTS api_comment_fts_update",
+    "DROP TRIGGER IF EXISTS api_comment_fts_delete",
+    "DROP TRIGGER IF EXISTS api_comment_fts_insert",
+    "DROP TABLE IF EXISTS api_comment_fts",
+    "DROP TRIGGER IF EXISTS api_issue_fts_update",
+    "DROP TRIGGER IF EXISTS api_issue_fts_delete",
+    "DROP TRIGGER IF EXISTS api_issue_fts_insert",
+    "DROP TABLE IF EXISTS api_issue_fts",
+]
+
+FTS_TABLES = ('api_issue_fts', 'api_comment_fts')
+
+# Issues et commentaires des projets dont l'utilisateur est contributeur (l'auteur d'un projet l'est
+# toujours), classés par bm25 : un mot du titre d'une issue pèse plus qu'un mot de sa description
+SEARCH_SQL = """
+SELECT 'issue', CAST(issue.id AS TEXT), issue.project_id, issue.id, issue.title,
+       snippet(api_issue_fts, -1, '[', ']', '…', 12), bm25(api_issue_fts, 4.0, 1.0) AS rank
+FROM api_issue_fts
+JOIN api_issue issue ON issue.id = api_issue_fts.rowid
+JOIN api_contributor contributor ON contributor.project_id = issue.project_id AND contributor.user_id = %s
+WHERE api_issue_fts MATCH %s
+UNION ALL
+SELECT 'comment', comment.uuid, issue.project_id, issue.id, issue.title,
+       snippet(api_comment_fts, 0, '[', ']', '…', 12), bm25(api_comment_fts) AS rank
+FROM api_comment_fts
+JOIN api_comment comment ON comment.rowid = api_comment_fts.rowid
+JOIN api_issue issue ON issue.id = comment.issue_id
+JOIN api_contributor contributor ON contributor.project_id = issue.project_id AND contributor.user_id = %s
+WHERE api_comment_fts MATCH %s
+ORDER BY rank
+LIMIT %s OFFSET %s
+"""
+
+WORD = re.compile(r'\w+')
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def create_index(schema_editor):
+    for statement in SCHEMA:
+        schema_editor.execute(statement)
+    rebuild_index(schema_editor.connection)
+
+
+def drop_index(schema_editor):
+    for statement in DROP_SCHEMA:
+        schema_editor.execute(statement)
+
+
+def rebuild_index(using=connection):
+    """
+    Reconstruit les index depuis api_issue et api_comment, puis les compacte.
+    """
+    with using.cursor() as cursor:
+        for table in FTS_TABLES:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+
+
+def parse_query(text):
+    """
+    Requête FTS5 construite à partir des seuls mots du texte (la syntaxe FTS5 n'est pas exposée) :
+    tous les mots doivent figurer, le dernier peut n'être qu'un préfixe (recherche à la frappe).
+    """
+    words = WORD.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(user, text, limit, offset=0):
+    """
+    Résultats (type, id, project, issue, title, snippet, rank) du texte `text` dans les projets dont
+    `user` est contributeur, en une seule requête SQL.
+    """
+    query = parse_query(text)
+    if query is None:
+        return []
+    if not is_supported():
+        return fallback_search(user, text, limit, offset)
+    with connection.cursor() as cursor:
+        cursor.execute(SEARCH_SQL, [user.pk, query, user.pk, query, limit, offset])
+        rows = cursor.fetchall()
+    return [
+        {
+            'type': kind,
+            # Les UUID sont stockés en hexadécimal par SQLite
+            'id': int(object_id) if kind == 'issue' else str(uuid.UUID(object_id)),
+            'project': project_id,
+            'issue': issue_id,
+            'title': title,
+            'snippet': snippet,
+            'rank': rank,
+        }
+        for kind, object_id, project_id, issue_id, title, snippet, rank in rows
+    ]
+
+
+def fallback_search(user, text, limit, offset):
+    # Bases sans FTS5 : recherche par sous-chaîne, sans classement ni extrait
+    issues = Issue.objects.filter(
+        Q(title__icontains=text) | Q(description__icontains=text),
+        project__contributors__user=user,
+    ).values_list('id', 'project_id', 'title', 'created_time')
+    comments = Comment.objects.filter(
+        description__icontains=text,
+        issue__project__contributors__user=user,
+    ).values_list('uuid', 'issue__project_id', 'issue_id', 'issue__title', 'created_time')
+    results = [
+        ('issue', issue_id, project_id, issue_id, title, created_time)
+        for issue_id, project_id, title, created_time in issues[:offset + limit]
+    ] + [
+        ('comment', str(comment_uuid), project_id, issue_id, title, created_time)
+        for comment_uuid, project_id, issue_id, title, created_time in comments[:offset + limit]
+    ]
+    results.sort(key=lambda result: result[-1], reverse=True)
+    return [
+        {'type': kind, 'id': object_id, 'project': project_id, 'issue': issue_id, 'title': title,
+         'snippet': None, 'rank': None}
+        for kind, object_id, project_id, issue_id, title, _ in results[offset:offset + limit]
+    ]
@@ -1,24 +1,62 @@
-from django.shortcuts import get_object_or_404
+from collections import Counter
+
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 from rest_framework.reverse import reverse
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 
+from .events import publish_issue
+from .hashers import hash_password
+from .instrumentation import timed
 from .models import User, Project, Issue, Comment
+from .statistics import apply_deltas, count_issue, counted_values
+from .permissions import get_project_membership
+from .tokens import RefreshToken
+
+
+class InstrumentedModelSerializer(ModelSerializer):
+    """
+    ModelSerializer dont le temps de représentation est mesuré par InstrumentationMiddleware.
+    """
+    def to_representation(self, instance):
+        with timed('serializer'):
+            return super().to_representation(instance)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Ajoute username et is_active aux claims, lus par api.authentication.StatelessJWTAuthentication.
+    """
+    token_class = RefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['is_active'] = user.is_active
+        return token
 
 
-class UserSerializer(ModelSerializer):
+class KeyRingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Rafraîchissement signé et vérifié avec les clés de api.tokens.
+    """
+    token_class = RefreshToken
+
+
+class UserSerializer(InstrumentedModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'age', 'can_be_contacted', 'can_data_be_shared']
 
 
-class UserSummarySerializer(ModelSerializer):
+class UserSummarySerializer(InstrumentedModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username']
 
 
-class UserCreateSerializer(ModelSerializer):
+class UserCreateSerializer(InstrumentedModelSerializer):
     class Meta:
         model = User
         fields = ['username', 'password', 'age', 'can_be_contacted', 'can_data_be_shared']
@@ -26,19 +64,32 @@ class UserCreateSerializer(ModelSerializer):
     def create(self, validated_data):
         password = validated_data.pop('password')
         user = User(**validated_data)
-        user.set_password(password)
+        user.password = hash_password(password)
         user.save()
         return user
 
 
-class ProjectSerializer(ModelSerializer):
+class ProjectSerializer(InstrumentedModelSerializer):
     class Meta:
         model = Project
         fields = ['id', 'author', 'title', 'description', 'type', 'created_time']
         read_only_fields = ['id', 'author']
 
 
-class ProjectDetailSerializer(ModelSerializer):
+class MyProjectSerializer(ProjectSerializer):
+    """
+    Projet de la liste /api/project/mine/ : rôle de l'utilisateur et compteurs annotés par la requête.
+    """
+    role = serializers.CharField(read_only=True)
+    contributor_count = serializers.IntegerField(read_only=True)
+    issue_count = serializers.IntegerField(read_only=True)
+    comment_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ProjectSerializer.Meta):
+        fields = ProjectSerializer.Meta.fields + ['role', 'contributor_count', 'issue_count', 'comment_count']
+
+
+class ProjectDetailSerializer(InstrumentedModelSerializer):
     issues = serializers.SerializerMethodField()
     contributors = serializers.SerializerMethodField()
 
@@ -52,28 +103,102 @@ class ProjectDetailSerializer(ModelSerializer):
         return serializer.data
 
     def get_contributors(self, instance):
-        users = User.objects.filter(contributions__project=instance)
+        # Utilise les contributeurs préchargés par ProjectViewSet (prefetch_related + select_related)
+        users = [contributor.user for contributor in instance.contributors.all()]
         serializer = UserSummarySerializer(users, many=True)
         return serializer.data
 
 
-class IssueSerializer(ModelSerializer):
+class ContributorListSerializer(serializers.Serializer):
+    users = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+    def validate_users(self, value):
+        # Supprime les doublons en conservant l'ordre
+        return list(dict.fromkeys(value))
+
+
+class IssueSerializer(InstrumentedModelSerializer):
     class Meta:
         model = Issue
         fields = ['id', 'author', 'project', 'title', 'description',
-                  'priority', 'type', 'status', 'created_time']
-        read_only_fields = ['id', 'project']
+                  'priority', 'type', 'status', 'created_time', 'comment_count', 'last_activity_time']
+        read_only_fields = ['id', 'project', 'comment_count', 'last_activity_time']
 
     # Vérifier si l'auteur de l'issue est un contributeur du projet
     def validate_author(self, value):
         project_pk = self.context['view'].kwargs.get('project_pk')
-        project = get_object_or_404(Project, pk=project_pk)
-        if not project.contributors.filter(user=value).exists():
+        membership = get_project_membership(self.context['request'], project_pk, user=value)
+        if not membership.is_contributor:
+            raise serializers.ValidationError("L'auteur de l'issue doit être un contributeur du projet.")
+        return value
+
+
+class IssueBatchListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        issues = Issue.objects.bulk_create([Issue(**attrs) for attrs in validated_data])
+        # bulk_create n'envoie pas de signal post_save
+        Project.objects.filter(pk__in={issue.project_id for issue in issues}).bump_version()
+        deltas = Counter()
+        for issue in issues:
+            count_issue(deltas, issue.project_id, counted_values(issue))
+        apply_deltas(deltas)
+        for issue in issues:
+            publish_issue(issue, 'created')
+        return issues
+
+
+class IssueBatchSerializer(IssueSerializer):
+    """
+    Issue d'une création par lot : l'auteur est validé contre l'ensemble des contributeurs
+    du projet, chargé une seule fois par la vue (context['contributor_ids']).
+    """
+    author = serializers.IntegerField(source='author_id', min_value=1)
+
+    class Meta(IssueSerializer.Meta):
+        list_serializer_class = IssueBatchListSerializer
+
+    @classmethod
+    def get_author_ids(cls, data):
+        """
+        Auteurs d'une liste d'issues brute, convertis comme le champ author ("1" -> 1) ; les valeurs
+        invalides sont ignorées, la validation les refusera.
+        """
+        field = cls._declared_fields['author']
+        author_ids = set()
+        for item in data:
+            if isinstance(item, dict) and 'author' in item:
+                try:
+                    author_ids.add(field.to_internal_value(item['author']))
+                except serializers.ValidationError:
+                    pass
+        return author_ids
+
+    def validate_author(self, value):
+        if value not in self.context['contributor_ids']:
             raise serializers.ValidationError("L'auteur de l'issue doit être un contributeur du projet.")
         return value
 
 
-class IssueDetailSerializer(ModelSerializer):
+class IssueBatchUpdateSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+    status = serializers.ChoiceField(choices=Issue.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Issue.PRIORITY_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if 'status' not in attrs and 'priority' not in attrs:
+            raise serializers.ValidationError("Indiquer au moins un champ à modifier : status ou priority.")
+        return attrs
+
+
+class IssueDetailSerializer(InstrumentedModelSerializer):
     comments = serializers.SerializerMethodField()
 
     class Meta:
@@ -87,7 +212,7 @@ class IssueDetailSerializer(ModelSerializer):
         return serializer.data
 
 
-class CommentSerializer(ModelSerializer):
+class CommentSerializer(InstrumentedModelSerializer):
     issue_url = serializers.SerializerMethodField()
 
     class Meta:
@@ -99,6 +224,6 @@ class CommentSerializer(ModelSerializer):
         return reverse(
             'project-issues-detail',
             kwargs={
-                'project_pk': instance.issue.project.id,
+                'project_pk': instance.issue.project_id,
                 'pk': instance.issue.id},
         )
@@ -0,0 +1,74 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from api.authentication import invalidate_revocation
+from api.cache import invalidate_membership, invalidate_project_memberships
+from api.events import publish_issue, publish_comment, publish_project_deleted
+from api.instrumentation import install_query_recorder
+from api.models import User, Project, Contributor, Issue, Comment
+from api.statistics import issue_created, issue_updated, comments_changed
+
+
+connection_created.connect(install_query_recorder)
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+def invalidate_contributor_membership(sender, instance, **kwargs):
+    invalidate_membership(instance.user_id, instance.project_id)
+    Project.objects.filter(pk=instance.project_id).bump_version()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_project_membership(sender, instance, **kwargs):
+    invalidate_project_memberships(instance.pk)
+
+
+@receiver(post_save, sender=Project)
+def bump_project_version(sender, instance, created, **kwargs):
+    # Un nouveau projet commence à la version 1
+    if not created:
+        Project.objects.filter(pk=instance.pk).bump_version()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_revocation(sender, instance, **kwargs):
+    invalidate_revocation(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def bump_contributed_projects_version(sender, instance, created, update_fields, **kwargs):
+    # Le username des contributeurs figure dans le détail des projets (last_login n'y figure pas)
+    if not created and (update_fields is None or 'username' in update_fields):
+        Project.objects.filter(contributors__user=instance).bump_version()
+
+
+# Les suppressions d'issues et de commentaires sont traitées par les vues (événement, version du projet,
+# compteurs de api.statistics) :
+# un receiver post_delete sur Issue ou Comment empêcherait Django de supprimer en une requête ceux d'un
+# projet supprimé
+@receiver(post_save, sender=Issue)
+def issue_changed(sender, instance, created, **kwargs):
+    Project.objects.filter(pk=instance.project_id).bump_version()
+    if created:
+        issue_created(instance)
+    else:
+        issue_updated(instance)
+    publish_issue(instance, 'created' if created else 'updated')
+
+
+@receiver(post_save, sender=Comment)
+def comment_changed(sender, instance, created, **kwargs):
+    Project.objects.filter(issues=instance.issue_id).bump_version()
+    if created:
+        Issue.objects.filter(pk=instance.issue_id).add_comment_activity(1, instance.created_time)
+        comments_changed(instance.issue.project_id, 1)
+    publish_comment(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Project)
+def publish_project_deletion(sender, instance, **kwargs):
+    publish_project_deleted(instance.pk)
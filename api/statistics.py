@@ -0,0 +1,187 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce
+
+from api.models import Issue, Comment, ProjectStatistic
+
+
+# Compteurs d'un projet : 'issues', 'comments' et '<champ>:<valeur>' pour chaque champ de Issue.COUNTED_FIELDS
+ISSUES = 'issues'
+COMMENTS = 'comments'
+
+
+def counter_name(field, value):
+    return f'{field}:{value}'
+
+
+def counted_values(issue):
+    return {field: getattr(issue, field) for field in Issue.COUNTED_FIELDS}
+
+
+def count_issue(deltas, project_id, values, sign=1):
+    """
+    Ajoute à `deltas` une issue (sign=1) ou son retrait (sign=-1) ; `values` : valeurs des champs comptés.
+    """
+    deltas[project_id, ISSUES] += sign
+    for field in Issue.COUNTED_FIELDS:
+        deltas[project_id, counter_name(field, values[field])] += sign
+
+
+def count_issue_change(deltas, project_id, old_values, new_values):
+    for field in Issue.COUNTED_FIELDS:
+        if field in old_values and old_values[field] != new_values[field]:
+            deltas[project_id, counter_name(field, old_values[field])] -= 1
+            deltas[project_id, counter_name(field, new_values[field])] += 1
+
+
+def apply_deltas(deltas):
+    """
+    Applique `deltas` ({(project_id, nom): incrément}) : un UPDATE par projet avec des expressions F(),
+    les compteurs encore absents sont créés à 0 puis incrémentés. À appeler dans la transaction de
+    l'écriture comptée.
+    """
+    by_project = defaultdict(dict)
+    for (project_id, name), delta in deltas.items():
+        if delta:
+            by_project[project_id][name] = delta
+    for project_id, project_deltas in by_project.items():
+        updated = _increment(project_id, project_deltas)
+        if updated < len(project_deltas):
+            existing = set(
+                ProjectStatistic.objects.filter(project_id=project_id, name__in=project_deltas)
+                .values_list('name', flat=True)
+            )
+            missing = {name: delta for name, delta in project_deltas.items() if name not in existing}
+            ProjectStatistic.objects.bulk_create(
+                [ProjectStatistic(project_id=project_id, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            _increment(project_id, missing)
+
+
+def _increment(project_id, project_deltas):
+    return ProjectStatistic.objects.filter(project_id=project_id, name__in=project_deltas).update(
+        value=F('value') + Case(*[When(name=name, then=delta) for name, delta in project_deltas.items()])
+    )
+
+
+def issue_created(issue):
+    deltas = Counter()
+    count_issue(deltas, issue.project_id, counted_values(issue))
+    apply_deltas(deltas)
+    issue._counted_values = counted_values(issue)
+
+
+def issue_updated(issue):
+    # Les valeurs initiales sont celles lues en base (Issue.from_db) : une issue construite sans lecture
+    # n'est pas comptée, reconcile_stats la rattrape
+    deltas = Counter()
+    count_issue_change(deltas, issue.project_id, getattr(issue, '_counted_values', {}), counted_values(issue))
+    apply_deltas(deltas)
+    issue._counted_values = counted_values(issue)
+
+
+def issue_deleted(issue, comment_count):
+    deltas = Counter({(issue.project_id, COMMENTS): -comment_count})
+    count_issue(deltas, issue.project_id, counted_values(issue), -1)
+    apply_deltas(deltas)
+
+
+def comments_changed(project_id, delta):
+    apply_deltas(Counter({(project_id, COMMENTS): delta}))
+
+
+def count_comments(comments):
+    return comments.values('issue__project_id').annotate(count=Count('uuid')).values_list(
+        'issue__project_id', 'count'
+    )
+
+
+def user_deleted(user_id):
+    """
+    Retire des compteurs les issues et commentaires que la suppression de l'utilisateur supprime en
+    cascade : ses issues (avec tous leurs commentaires) et ses commentaires sur les autres issues.
+    """
+    deltas = Counter()
+    issues = Issue.objects.filter(author_id=user_id)
+    for row in issues.values('project_id', *Issue.COUNTED_FIELDS).annotate(count=Count('id')):
+        count_issue(deltas, row['project_id'], row, -row['count'])
+    comments = Comment.objects.filter(issue__author_id=user_id) | Comment.objects.filter(author_id=user_id)
+    for project_id, count in count_comments(comments):
+        deltas[project_id, COMMENTS] -= count
+    apply_deltas(deltas)
+
+
+def compute(project_ids=None):
+    """
+    Compteurs recalculés depuis les tables api_issue et api_comment : {(project_id, nom): valeur}.
+    """
+    issues = Issue.objects.all()
+    comments = Comment.objects.all()
+    if project_ids is not None:
+        issues = issues.filter(project_id__in=project_ids)
+        comments = comments.filter(issue__project_id__in=project_ids)
+    values = Counter()
+    for row in issues.values('project_id', *Issue.COUNTED_FIELDS).annotate(count=Count('id')):
+        count_issue(values, row['project_id'], row, row['count'])
+    for project_id, count in count_comments(comments):
+        values[project_id, COMMENTS] += count
+    return values
+
+
+@transaction.atomic
+def reconcile(project_ids=None):
+    """
+    Recalcule les compteurs et corrige ceux qui ont dérivé (écritures hors de l'API, restauration...).
+    Retourne les corrections : [(project_id, nom, ancienne valeur, nouvelle valeur)].
+    """
+    expected = compute(project_ids)
+    statistics = ProjectStatistic.objects.select_for_update()
+    if project_ids is not None:
+        statistics = statistics.filter(project_id__in=project_ids)
+    current = {
+        (project_id, name): value
+        for project_id, name, value in statistics.values_list('project_id', 'name', 'value')
+    }
+    corrections = sorted(
+        (project_id, name, current.get((project_id, name), 0), expected[project_id, name])
+        for project_id, name in current.keys() | expected.keys()
+        if current.get((project_id, name), 0) != expected[project_id, name]
+    )
+    ProjectStatistic.objects.bulk_create(
+        [ProjectStatistic(project_id=project_id, name=name, value=value)
+         for project_id, name, _, value in corrections],
+        update_conflicts=True,
+        unique_fields=['project', 'name'],
+        update_fields=['value'],
+    )
+    return corrections
+
+
+def statistic(name):
+    """
+    Expression du compteur `name` du projet de la requête englobante (annotation d'un queryset de Project).
+    """
+    value = ProjectStatistic.objects.filter(project=OuterRef('pk'), name=name).values('value')
+    return Coalesce(Subquery(value), 0)
+
+
+def get_statistics(project_id):
+    """
+    Statistiques d'un projet lues en une requête sur ses compteurs (au plus une ligne par valeur de
+    chaque champ compté), quelle que soit la taille du projet.
+    """
+    values = dict(ProjectStatistic.objects.filter(project_id=project_id).values_list('name', 'value'))
+    issues = values.get(ISSUES, 0)
+    comments = values.get(COMMENTS, 0)
+    statistics = {
+        'issues': issues,
+        'comments': comments,
+        'comments_per_issue': round(comments / issues, 2) if issues else 0.0,
+    }
+    for field in Issue.COUNTED_FIELDS:
+        choices = Issue._meta.get_field(field).choices
+        statistics[field] = {choice: values.get(counter_name(field, choice), 0) for choice, _ in choices}
+    return statistics
@@ -1,12 +1,53 @@
+import asyncio
+import base64
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import skipIf, skipUnless
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from jwt import algorithms
 from rest_framework.test import APITestCase
 from rest_framework.reverse import reverse
-from api.models import User, Project, Issue, Comment
-
-
+from api.generators import skewed_counts
+from api.metrics import registry
+from api.authentication import ClaimsUser, get_revocation_cache
+from api.hashers import FAST_PASSWORD_HASHER, offload_hashing
+from api.bulk import BulkLoader
+from api.render_cache import DjangoCacheBackend, FileBackend, LocMemBackend, RenderCache, get_render_cache
+from api.events import EventBroker, get_broker
+from api.cache import LRUCache, MembershipCache, get_membership_cache
+from api.models import User, Project, Issue, Comment, ProjectStatistic
+from api.permissions import ProjectMembership, get_project_membership
+from api.statistics import get_statistics, reconcile
+from api.tokens import KeyRing, thumbprint
+from api.views import IssueViewSet
+
+
+@override_settings(PASSWORD_HASHERS=[FAST_PASSWORD_HASHER])
 class ApiTest(APITestCase):
     """
     Classe de base pour les tests d'API.
     Contient l'ensemble des données de test, des méthodes de formatage et de gestion des utilisateurs.
+    Les mots de passe sont hachés en MD5 : le hachage ne domine plus la durée des tests.
     """
     @classmethod
     def setUpTestData(cls):
@@ -121,6 +162,8 @@ class ApiTest(APITestCase):
                 'type': issue.type,
                 'status': issue.status,
                 'created_time': self.format_datetime(issue.created_time),
+                'comment_count': issue.comment_count,
+                'last_activity_time': self.format_datetime(issue.last_activity_time),
             } for issue in issues
         ]
 
@@ -507,6 +550,48 @@ class ProjectTests(ApiTest):
         })
         self.assertEqual(response.status_code, 403)
 
+    def test_add_contributors_auth_author(self):
+        self.log_user_in(self.user_1)
+        # Auth, projet, permission, puis savepoint + résolution des users + insertion groupée + version
+        with self.assertNumQueries(8):
+            response = self.client.post(f'{self.url_detail}add_contributors/', data={
+                'users': [self.user_3.id, self.user_2.id, 9999],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [
+            {'user': self.user_3.id, 'status': Project.ADDED},
+            {'user': self.user_2.id, 'status': Project.ALREADY_CONTRIBUTOR},
+            {'user': 9999, 'status': Project.NOT_FOUND},
+        ])
+        self.assertTrue(self.project_1.contributors.filter(user=self.user_3).exists())
+
+    def test_add_contributors_auth_contributor(self):
+        self.log_user_in(self.user_2)
+        response = self.client.post(f'{self.url_detail}add_contributors/', data={
+            'users': [self.user_3.id],
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(self.project_1.contributors.filter(user=self.user_3).exists())
+
+    def test_add_contributors_invalid_payload(self):
+        self.log_user_in(self.user_1)
+        response = self.client.post(f'{self.url_detail}add_contributors/', data={
+            'users': [],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_remove_contributors_auth_author(self):
+        self.log_user_in(self.user_1)
+        response = self.client.post(f'{self.url_detail}remove_contributors/', data={
+            'users': [self.user_2.id, self.user_3.id],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [
+            {'user': self.user_2.id, 'status': Project.REMOVED},
+            {'user': self.user_3.id, 'status': Project.NOT_CONTRIBUTOR},
+        ])
+        self.assertFalse(self.project_1.contributors.filter(user=self.user_2).exists())
+
     def test_remove_contributor_unauth(self):
         response = self.client.post(f'{self.url_detail}remove_contributor/', data={
             'user': self.user_2.id,
@@ -521,6 +606,14 @@ class ProjectTests(ApiTest):
         self.assertEqual(response.status_code, 200)
         self.assertFalse(self.project_1.contributors.filter(user=self.user_2).exists())
 
+    def test_add_contributor_already_contributor(self):
+        self.log_user_in(self.user_1)
+        response = self.client.post(f'{self.url_detail}add_contributor/', data={
+            'user': self.user_2.id,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.project_1.contributors.filter(user=self.user_2).count(), 1)
+
     def test_remove_contributor_auth_contributor(self):
         self.log_user_in(self.user_2)
         response = self.client.post(f'{self.url_detail}remove_contributor/', data={
@@ -536,6 +629,71 @@ class ProjectTests(ApiTest):
         self.assertEqual(response.status_code, 403)
 
 
+class MyProjectsTests(ApiTest):
+    """
+    Tests de la liste des projets de l'utilisateur (/api/project/mine/).
+    """
+    url = '/api/project/mine/'
+
+    def setUp(self):
+        self.project_2 = Project.objects.create(
+            author=self.user_3, title='Project 2', description='Description of project 2', type=Project.IOS,
+        )
+
+    def get_data(self, project, role):
+        return {
+            **self.get_project_list_data([project])[0],
+            'role': role,
+            'contributor_count': project.contributors.count(),
+            'issue_count': project.issues.count(),
+            'comment_count': Comment.objects.filter(issue__project=project).count(),
+        }
+
+    def test_list_unauth(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_roles_and_counts(self):
+        self.log_user_in(self.user_2)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(
+            response.json()['results'], [self.get_data(self.project_1, ProjectMembership.CONTRIBUTOR)]
+        )
+
+        self.project_2.add_contributor(self.user_2)
+        self.log_user_in(self.user_3)
+        expected = [self.get_data(self.project_2, ProjectMembership.AUTHOR)]
+        self.assertEqual(self.client.get(self.url).json()['results'], expected)
+
+    def test_constant_queries(self):
+        self.log_user_in(self.user_1)
+        # Révocation du jeton, COUNT(*) et page
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        for i in range(5):
+            project = Project.objects.create(author=self.user_3, title=f'Project {i}', type=Project.BACKEND)
+            project.add_contributor(self.user_1)
+            Issue.objects.create(
+                author=self.user_1, project=project, title='Issue', priority=Issue.LOW, type=Issue.BUG,
+            )
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['count'], 6)
+        self.assertEqual([project['issue_count'] for project in response.json()['results']], [1] * 6)
+
+    def test_query_plan_uses_contributor_index(self):
+        self.log_user_in(self.user_1)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        sql = context.captured_queries[-1]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('SEARCH api_contributor USING COVERING INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
 class IssueTests(ApiTest):
     """
     Tests pour les endpoints du modèle Issue.
@@ -948,3 +1106,1542 @@ class CommentTests(ApiTest):
         response = self.client.delete(self.url_detail)
         self.assertEqual(response.status_code, 403)
         self.assertEqual(Comment.objects.count(), comment_count)
+
+
+class ProjectMembershipTests(ApiTest):
+    """
+    Tests du résolveur de rôle sur un projet (get_project_membership).
+    """
+    def test_roles(self):
+        request = SimpleNamespace(user=self.user_1)
+        self.assertEqual(get_project_membership(request, self.project_1.id).role, ProjectMembership.AUTHOR)
+        request = SimpleNamespace(user=self.user_2)
+        membership = get_project_membership(request, self.project_1.id)
+        self.assertEqual(membership.role, ProjectMembership.CONTRIBUTOR)
+        request = SimpleNamespace(user=self.user_3)
+        self.assertFalse(get_project_membership(request, self.project_1.id).is_contributor)
+
+    def test_single_query_per_request(self):
+        request = SimpleNamespace(user=self.user_2)
+        with self.assertNumQueries(1):
+            membership = get_project_membership(request, self.project_1.id)
+            self.assertIs(get_project_membership(request, str(self.project_1.id)), membership)
+            self.assertEqual(membership.project, self.project_1)
+
+    def test_other_user_on_same_request(self):
+        request = SimpleNamespace(user=self.user_2)
+        with self.assertNumQueries(2):
+            get_project_membership(request, self.project_1.id)
+            membership = get_project_membership(request, self.project_1.id, user=self.user_3)
+        self.assertIsNone(membership.role)
+
+
+class MembershipCacheTests(ApiTest):
+    """
+    Tests du cache inter-requêtes des rôles et de son invalidation par signaux.
+    """
+    def setUp(self):
+        self.cache = get_membership_cache()
+        self.cache.clear()
+        self.addCleanup(self.cache.clear)
+
+    def test_lru_eviction_and_counters(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 1, 'size': 2, 'max_size': 2})
+        # Compteurs exportés par /metrics : ils ne reculent pas quand le cache est vidé
+        cache.clear()
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 1, 'size': 0, 'max_size': 2})
+
+    def test_cached_role_costs_no_query(self):
+        hits = self.cache.stats()['hits']
+        self.cache.set(self.user_3.pk, self.project_1.pk, ProjectMembership.CONTRIBUTOR)
+        with self.assertNumQueries(0):
+            membership = get_project_membership(SimpleNamespace(user=self.user_3), self.project_1.pk)
+        self.assertTrue(membership.is_contributor)
+        self.assertEqual(self.cache.stats()['hits'], hits + 1)
+
+    def test_cached_absence_of_role(self):
+        self.cache.set(self.user_3.pk, self.project_1.pk, None)
+        self.assertIsNone(self.cache.get(self.user_3.pk, self.project_1.pk))
+
+    def test_add_contributor_invalidates(self):
+        self.cache.set(self.user_3.pk, self.project_1.pk, None)
+        self.project_1.add_contributor(self.user_3)
+        self.assertIs(self.cache.get(self.user_3.pk, self.project_1.pk), MembershipCache.MISSING)
+
+    def test_remove_contributor_invalidates(self):
+        self.cache.set(self.user_2.pk, self.project_1.pk, ProjectMembership.CONTRIBUTOR)
+        self.project_1.remove_contributor(self.user_2)
+        self.assertIs(self.cache.get(self.user_2.pk, self.project_1.pk), MembershipCache.MISSING)
+
+    def test_project_save_invalidates(self):
+        self.cache.set(self.user_1.pk, self.project_1.pk, ProjectMembership.AUTHOR)
+        self.cache.set(self.user_2.pk, self.project_1.pk, ProjectMembership.CONTRIBUTOR)
+        self.project_1.save()
+        self.assertIs(self.cache.get(self.user_1.pk, self.project_1.pk), MembershipCache.MISSING)
+        self.assertIs(self.cache.get(self.user_2.pk, self.project_1.pk), MembershipCache.MISSING)
+
+    def test_local_backend_expires(self):
+        cache = MembershipCache(backend='local', timeout=0)
+        cache.set(self.user_2.pk, self.project_1.pk, ProjectMembership.CONTRIBUTOR)
+        self.assertIs(cache.get(self.user_2.pk, self.project_1.pk), MembershipCache.MISSING)
+        self.assertEqual(get_membership_cache()._local.timeout, MembershipCache.LOCAL_TIMEOUT)
+        self.assertEqual(MembershipCache(backend='django').timeout, MembershipCache.SHARED_TIMEOUT)
+
+    def test_django_backend(self):
+        cache = MembershipCache(backend='django')
+        self.addCleanup(cache.clear)
+        cache.set(self.user_2.pk, self.project_1.pk, ProjectMembership.CONTRIBUTOR)
+        self.assertEqual(cache.get(self.user_2.pk, self.project_1.pk), ProjectMembership.CONTRIBUTOR)
+        cache.invalidate_project(self.project_1.pk)
+        self.assertIs(cache.get(self.user_2.pk, self.project_1.pk), MembershipCache.MISSING)
+
+    def test_django_backend_clear_keeps_other_entries(self):
+        cache = MembershipCache(backend='django')
+        self.addCleanup(cache.clear)
+        caches['default'].set('other-app', 'value')
+        self.addCleanup(caches['default'].delete, 'other-app')
+        cache.set(self.user_2.pk, self.project_1.pk, ProjectMembership.CONTRIBUTOR)
+        cache.clear()
+        self.assertIs(cache.get(self.user_2.pk, self.project_1.pk), MembershipCache.MISSING)
+        self.assertEqual(caches['default'].get('other-app'), 'value')
+
+
+class QueryCountTests(ApiTest):
+    """
+    Vérifie que le nombre de requêtes SQL des endpoints de détail et de liste
+    ne dépend pas du nombre d'issues, de commentaires ou de contributeurs.
+    """
+    def add_issues_and_comments(self, count):
+        for i in range(count):
+            issue = Issue.objects.create(
+                author=self.user_2,
+                project=self.project_1,
+                title=f'Issue {i}',
+                priority=Issue.HIGH,
+                type=Issue.TASK,
+            )
+            for _ in range(count):
+                Comment.objects.create(author=self.user_2, issue=issue, description='Comment')
+                Comment.objects.create(author=self.user_1, issue=self.issue_1, description='Comment')
+        self.project_1.add_contributor(self.user_3)
+
+    def assert_constant_queries(self, url, num):
+        self.log_user_in(self.user_1)
+        with self.assertNumQueries(num):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.add_issues_and_comments(5)
+        with self.assertNumQueries(num):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_project_detail(self):
+        self.assert_constant_queries(f'/api/project/{self.project_1.id}/', 5)
+
+    def test_issue_list(self):
+        self.assert_constant_queries(f'/api/project/{self.project_1.id}/issue/', 4)
+
+    def test_issue_detail(self):
+        self.assert_constant_queries(f'/api/project/{self.project_1.id}/issue/{self.issue_1.id}/', 4)
+
+    def test_comment_list(self):
+        self.assert_constant_queries(f'/api/project/{self.project_1.id}/issue/{self.issue_1.id}/comment/', 4)
+
+
+class CursorPaginationTests(ApiTest):
+    """
+    Tests de la pagination par curseur des issues et des commentaires.
+    """
+    def setUp(self):
+        for i in range(14):
+            Issue.objects.create(
+                author=self.user_2,
+                project=self.project_1,
+                title=f'Issue {i + 2}',
+                priority=Issue.MEDIUM,
+                type=Issue.FEATURE,
+            )
+        self.url = f'/api/project/{self.project_1.id}/issue/'
+        self.log_user_in(self.user_2)
+
+    def test_limit_offset_by_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 15)
+
+    def test_cursor_pages(self):
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+        first_page = response.json()
+        self.assertNotIn('count', first_page)
+        self.assertEqual(len(first_page['results']), 10)
+
+        # Le lien "next" contient un curseur opaque : le mode curseur est conservé
+        response = self.client.get(first_page['next'])
+        second_page = response.json()
+        self.assertIsNone(second_page['next'])
+
+        ids = [issue['id'] for issue in first_page['results'] + second_page['results']]
+        issues = Issue.objects.filter(project=self.project_1).order_by('created_time', 'pk')
+        expected = list(issues.values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_cursor_comments(self):
+        url = f'{self.url}{self.issue_1.id}/comment/'
+        response = self.client.get(url, {'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], self.get_comment_list_data([self.comment_1]))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 404)
+
+
+class IssueFilterTests(ApiTest):
+    """
+    Tests des filtres (?status=, ?priority=, ?type=, ?author=, ?created_after=, ?created_before=)
+    et des tris autorisés (?ordering=) de la liste des issues.
+    """
+    def setUp(self):
+        self.issue_2 = Issue.objects.create(
+            author=self.user_2, project=self.project_1, title='Issue 2',
+            priority=Issue.HIGH, type=Issue.FEATURE, status=Issue.IN_PROGRESS,
+        )
+        self.issue_3 = Issue.objects.create(
+            author=self.user_2, project=self.project_1, title='Issue 3',
+            priority=Issue.HIGH, type=Issue.BUG, status=Issue.FINISHED,
+        )
+        now = timezone.now()
+        for days, issue in ((10, self.issue_1), (5, self.issue_2), (1, self.issue_3)):
+            Issue.objects.filter(pk=issue.pk).update(created_time=now - timedelta(days=days))
+        self.now = now
+        self.url = f'/api/project/{self.project_1.id}/issue/'
+        self.log_user_in(self.user_2)
+
+    def get_ids(self, params, client=None):
+        response = (client or self.client).get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [issue['id'] for issue in response.json()['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.get_ids({'status': Issue.TODO}), [self.issue_1.id])
+        self.assertEqual(
+            self.get_ids({'status': f'{Issue.TODO},{Issue.FINISHED}'}), [self.issue_1.id, self.issue_3.id]
+        )
+        self.assertEqual(self.get_ids({'priority': Issue.HIGH, 'type': Issue.BUG}), [self.issue_3.id])
+        self.assertEqual(self.get_ids({'author': self.user_2.id}), [self.issue_2.id, self.issue_3.id])
+        after = (self.now - timedelta(days=6)).isoformat()
+        before = (self.now - timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.get_ids({'created_after': after}), [self.issue_2.id, self.issue_3.id])
+        self.assertEqual(self.get_ids({'created_after': after, 'created_before': before}), [self.issue_2.id])
+
+    def test_invalid_filters(self):
+        response = self.client.get(self.url, {'status': 'DONE', 'author': 'me', 'created_after': 'hier'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'status', 'author', 'created_after'})
+
+    def test_ordering(self):
+        self.assertEqual(self.get_ids({}), [self.issue_1.id, self.issue_2.id, self.issue_3.id])
+        self.assertEqual(
+            self.get_ids({'ordering': '-created_time'}), [self.issue_3.id, self.issue_2.id, self.issue_1.id]
+        )
+        self.assertEqual(
+            self.get_ids({'ordering': '-status'}), [self.issue_1.id, self.issue_2.id, self.issue_3.id]
+        )
+        self.assertEqual(
+            self.get_ids({'ordering': 'priority'}), [self.issue_2.id, self.issue_3.id, self.issue_1.id]
+        )
+        response = self.client.get(self.url, {'ordering': 'title'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
+
+    def test_cursor_orderings(self):
+        # Plus de 1000 issues de même status : un curseur sur ?ordering=status ne progresserait plus
+        Issue.objects.bulk_create([
+            Issue(author=self.user_2, project=self.project_1, title=f'Issue {i}', priority=Issue.LOW,
+                  type=Issue.TASK, status=Issue.TODO)
+            for i in range(1100)
+        ])
+        for ordering in ('status', 'priority', 'type', 'author', 'comment_count', '-last_activity_time'):
+            response = self.client.get(self.url, {'ordering': ordering, 'pagination': 'cursor'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('ordering', response.json())
+
+        ids = []
+        url = f'{self.url}?pagination=cursor&ordering=-created_time&status={Issue.TODO}'
+        while url:
+            data = self.client.get(url).json()
+            ids += [issue['id'] for issue in data['results']]
+            url = data['next']
+        self.assertEqual(len(ids), 1101)
+        self.assertEqual(len(set(ids)), 1101)
+
+    def test_async_list(self):
+        with override_settings(ROOT_URLCONF='api.async_urls'):
+            self.assertEqual(
+                self.get_ids({'type': Issue.BUG, 'ordering': '-created_time'}),
+                [self.issue_3.id, self.issue_1.id],
+            )
+            self.assertEqual(self.client.get(self.url, {'ordering': 'title'}).status_code, 400)
+
+    def test_query_plans_use_indexes(self):
+        # Chaque tri autorisé, avec ou sans filtre, est lu dans un index sans tri supplémentaire
+        cases = [{'ordering': ordering} for ordering in IssueViewSet.orderings] + [
+            {'status': Issue.TODO},
+            {'priority': Issue.HIGH, 'ordering': '-created_time'},
+            {'author': self.user_2.id, 'ordering': 'author'},
+            {'type': Issue.BUG, 'created_after': (self.now - timedelta(days=6)).date().isoformat()},
+        ]
+        for params in cases:
+            with self.subTest(params=params), CaptureQueriesContext(connection) as context:
+                self.get_ids(params)
+                sql = next(
+                    query['sql'] for query in context.captured_queries
+                    if query['sql'].startswith('SELECT "api_issue"."id"')
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                    plan = ' '.join(row[-1] for row in cursor.fetchall())
+                self.assertIn('USING INDEX issue_project_', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+
+class IssueActivityTests(ApiTest):
+    """
+    Tests de Issue.comment_count et Issue.last_activity_time.
+    """
+    def setUp(self):
+        self.issue_2 = Issue.objects.create(
+            author=self.user_2, project=self.project_1, title='Issue 2', priority=Issue.LOW, type=Issue.TASK,
+        )
+        self.url = f'/api/project/{self.project_1.id}/issue/'
+
+    def assert_fresh(self):
+        # Les compteurs maintenus sont ceux que recalcule refresh_comment_activity
+        before = list(Issue.objects.order_by('id').values_list('id', 'comment_count'))
+        Issue.objects.refresh_comment_activity()
+        self.assertEqual(before, list(Issue.objects.order_by('id').values_list('id', 'comment_count')))
+
+    def test_comment_writes(self):
+        self.log_user_in(self.user_2)
+        response = self.client.post(f'{self.url}{self.issue_2.id}/comment/', {'description': 'First'})
+        self.assertEqual(response.status_code, 201)
+        self.issue_2.refresh_from_db()
+        self.assertEqual(self.issue_2.comment_count, 1)
+        self.assertEqual(
+            self.issue_2.last_activity_time, Comment.objects.get(uuid=response.json()['uuid']).created_time
+        )
+        self.assert_fresh()
+
+        response = self.client.delete(f"{self.url}{self.issue_2.id}/comment/{response.json()['uuid']}/")
+        self.assertEqual(response.status_code, 204)
+        self.issue_2.refresh_from_db()
+        self.assertEqual(self.issue_2.comment_count, 0)
+        self.assertGreater(self.issue_2.last_activity_time, self.issue_2.created_time)
+
+    def test_list_and_ordering(self):
+        Comment.objects.create(author=self.user_2, issue=self.issue_1, description='Second')
+        self.log_user_in(self.user_2)
+        results = self.client.get(self.url, {'ordering': '-comment_count'}).json()['results']
+        self.assertEqual([(issue['id'], issue['comment_count']) for issue in results], [
+            (self.issue_1.id, 2), (self.issue_2.id, 0),
+        ])
+        self.assertEqual(results, self.get_issue_list_data(Issue.objects.order_by('-comment_count')))
+        results = self.client.get(self.url, {'ordering': '-last_activity_time'}).json()['results']
+        self.assertEqual([issue['id'] for issue in results], [self.issue_1.id, self.issue_2.id])
+
+    def test_read_only(self):
+        self.log_user_in(self.user_2)
+        self.client.patch(f'{self.url}{self.issue_2.id}/', {'comment_count': 10})
+        self.issue_2.refresh_from_db()
+        self.assertEqual(self.issue_2.comment_count, 0)
+
+    def test_bulk_loader_and_user_deletion(self):
+        loader = BulkLoader(batch_size=2)
+        for _ in range(3):
+            loader.add('comment', {'author': self.user_2.id, 'issue': self.issue_1.id, 'description': 'Bulk'})
+        loader.finish()
+        issue = Issue.objects.get(pk=self.issue_1.pk)
+        self.assertEqual(issue.comment_count, 4)
+        self.assertEqual(issue.last_activity_time, Comment.objects.latest('created_time').created_time)
+        self.assert_fresh()
+
+        self.log_user_in(self.user_2)
+        self.assertEqual(self.client.delete(f'/api/user/{self.user_2.id}/').status_code, 204)
+        self.assertEqual(Issue.objects.get(pk=self.issue_1.pk).comment_count, 1)
+        self.assert_fresh()
+
+
+class IssueBatchTests(ApiTest):
+    """
+    Tests de la création et de la mise à jour des issues par lot.
+    """
+    def setUp(self):
+        self.url = f'/api/project/{self.project_1.id}/issue/batch/'
+
+    def get_payload(self, authors):
+        return [
+            {
+                'author': author.id,
+                'title': f'Batch issue {i}',
+                'description': 'Imported',
+                'priority': Issue.HIGH,
+                'type': Issue.TASK,
+            } for i, author in enumerate(authors)
+        ]
+
+    def test_create_auth_contributor(self):
+        self.log_user_in(self.user_2)
+        issue_count = Issue.objects.count()
+        payload = self.get_payload([self.user_1, self.user_2] * 10)
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Issue.objects.count(), issue_count + 20)
+        issues = Issue.objects.filter(title__startswith='Batch issue').order_by('id')
+        self.assertEqual(response.json(), self.get_issue_list_data(issues))
+
+    def test_create_author_not_contributor(self):
+        self.log_user_in(self.user_1)
+        issue_count = Issue.objects.count()
+        response = self.client.post(self.url, self.get_payload([self.user_1, self.user_3]), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Issue.objects.count(), issue_count)
+
+    def test_create_author_as_string(self):
+        self.log_user_in(self.user_1)
+        payload = self.get_payload([self.user_1, self.user_2])
+        for item in payload:
+            item['author'] = str(item['author'])
+        payload.append({**payload[0], 'author': 'not an id'})
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()[:2], [{}, {}])
+        self.assertIn('author', response.json()[2])
+
+        response = self.client.post(self.url, payload[:2], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([issue['author'] for issue in response.json()], [self.user_1.id, self.user_2.id])
+
+    def test_create_too_many(self):
+        self.log_user_in(self.user_1)
+        payload = self.get_payload([self.user_1] * 1001)
+        # Authentification et rôle : refusé avant la lecture des contributeurs cités
+        with self.assertNumQueries(2):
+            response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_auth_other(self):
+        self.log_user_in(self.user_3)
+        response = self.client.post(self.url, self.get_payload([self.user_3]), format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_create_not_a_list(self):
+        self.log_user_in(self.user_1)
+        response = self.client.post(self.url, self.get_payload([self.user_1])[0], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_update(self):
+        issue_2 = Issue.objects.create(
+            author=self.user_2,
+            project=self.project_1,
+            title='Issue 2',
+            priority=Issue.LOW,
+            type=Issue.BUG,
+        )
+        self.log_user_in(self.user_1)
+        response = self.client.patch(self.url, {
+            'ids': [self.issue_1.id, issue_2.id, 9999],
+            'status': Issue.FINISHED,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [
+            {'id': self.issue_1.id, 'status': Issue.UPDATED},
+            {'id': issue_2.id, 'status': Issue.FORBIDDEN},
+            {'id': 9999, 'status': Issue.NOT_FOUND},
+        ])
+        self.issue_1.refresh_from_db()
+        issue_2.refresh_from_db()
+        self.assertEqual(self.issue_1.status, Issue.FINISHED)
+        self.assertEqual(issue_2.status, Issue.TODO)
+
+    def test_update_without_fields(self):
+        self.log_user_in(self.user_1)
+        response = self.client.patch(self.url, {'ids': [self.issue_1.id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(ApiTest):
+    """
+    Tests de l'export en flux des issues et commentaires d'un projet.
+    """
+    def setUp(self):
+        self.url = f'/api/project/{self.project_1.id}/export/'
+        self.comment_2 = Comment.objects.create(
+            author=self.user_2,
+            issue=self.issue_1,
+            description='Comment, with "quotes"\nand a new line',
+        )
+
+    def get_content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        self.log_user_in(self.user_2)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.get_content(response).splitlines()]
+        self.assertEqual([row['kind'] for row in rows], ['issue', 'comment', 'comment'])
+        self.assertEqual(rows[0]['id'], self.issue_1.id)
+        self.assertEqual(rows[0]['author'], self.user_1.id)
+        self.assertEqual(rows[2]['uuid'], str(self.comment_2.uuid))
+        self.assertEqual(rows[2]['description'], self.comment_2.description)
+
+    def test_export_csv(self):
+        self.log_user_in(self.user_1)
+        response = self.client.get(self.url, {'output': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(self.get_content(response).splitlines(keepends=True)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['title'], self.issue_1.title)
+        self.assertEqual(rows[2]['id'], str(self.comment_2.uuid))
+        self.assertEqual(rows[2]['description'], self.comment_2.description)
+
+    def test_export_unknown_format(self):
+        self.log_user_in(self.user_1)
+        response = self.client.get(self.url, {'output': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_auth_other(self):
+        self.log_user_in(self.user_3)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+
+class ImportCommandTests(ApiTest):
+    """
+    Tests de la commande import_ndjson.
+    """
+    def call_import(self, rows, batch_size=2):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', encoding='utf-8') as file:
+            file.write('\n'.join(json.dumps(row) for row in rows))
+            file.flush()
+            call_command('import_ndjson', file.name, batch_size=batch_size, stdout=StringIO())
+
+    def test_import(self):
+        self.call_import([
+            {'kind': 'user', 'id': 100, 'username': 'imported_1', 'password': 'password', 'age': 30},
+            {'kind': 'user', 'id': 101, 'username': 'imported_2', 'password': 'password', 'age': 40},
+            {'kind': 'project', 'id': 100, 'author': 100, 'title': 'Imported', 'type': Project.IOS},
+            {'kind': 'contributor', 'user': 101, 'project': 100},
+            {'kind': 'issue', 'id': 100, 'author': 101, 'project': 100, 'title': 'Imported issue',
+             'priority': Issue.LOW, 'type': Issue.BUG},
+            {'kind': 'comment', 'author': 100, 'issue': 100, 'description': 'First'},
+            {'kind': 'comment', 'author': 101, 'issue': 100, 'description': 'Second',
+             'uuid': '8a1f6a4e-3c38-4a8e-9f6b-1d8e2f7a9b10'},
+        ])
+        project = Project.objects.get(pk=100)
+        self.assertEqual(
+            set(project.contributors.values_list('user_id', flat=True)), {100, 101}
+        )
+        self.assertEqual(Comment.objects.filter(issue_id=100).count(), 2)
+        self.assertTrue(Comment.objects.filter(uuid='8a1f6a4e-3c38-4a8e-9f6b-1d8e2f7a9b10').exists())
+        self.assertTrue(User.objects.get(pk=101).check_password('password'))
+
+    def test_unknown_kind(self):
+        with self.assertRaises(CommandError):
+            self.call_import([{'kind': 'unknown'}])
+
+
+class GenerateDataCommandTests(ApiTest):
+    """
+    Tests de la commande generate_data.
+    """
+    def generate(self, **options):
+        call_command(
+            'generate_data', users=6, projects=3, contributors_per_project=3,
+            issues_per_project=4, comments_per_issue=2, stdout=StringIO(), **options
+        )
+
+    def test_volumes(self):
+        issue_count, comment_count = Issue.objects.count(), Comment.objects.count()
+        self.generate(skew=1.0)
+        self.assertEqual(User.objects.count(), 3 + 6)
+        self.assertEqual(Project.objects.count(), 1 + 3)
+        self.assertEqual(Issue.objects.count(), issue_count + 12)
+        self.assertEqual(Comment.objects.count(), comment_count + 24)
+        for project in Project.objects.exclude(pk=self.project_1.pk):
+            self.assertEqual(project.contributors.count(), 3)
+            self.assertTrue(project.contributors.filter(user=project.author).exists())
+
+    def test_requires_contributors(self):
+        with self.assertRaises(CommandError):
+            call_command('generate_data', users=6, contributors_per_project=0, stdout=StringIO())
+
+    def test_deterministic(self):
+        snapshots = []
+        for _ in range(2):
+            # Repart du même état : les identifiants attribués sont identiques
+            Project.objects.all().delete()
+            User.objects.exclude(pk__in=[self.user_1.pk, self.user_2.pk, self.user_3.pk]).delete()
+            self.generate(seed=42)
+            comments = Comment.objects.order_by('uuid').values_list('uuid', 'issue', 'description')
+            snapshots.append(list(comments))
+        self.assertEqual(snapshots[0], snapshots[1])
+
+    def test_skewed_counts(self):
+        counts = skewed_counts(100, 10, 1.0, random.Random(0))
+        self.assertEqual(sum(counts), 100)
+        self.assertGreater(max(counts), 3 * min(counts))
+        self.assertEqual(skewed_counts(100, 10, 0.0, random.Random(0)), [10] * 10)
+
+
+@override_settings(SOFTDESK_INSTRUMENTATION={'SAMPLE_RATE': 1.0, 'SERVER_TIMING': True, 'LOG': True})
+class InstrumentationTests(ApiTest):
+    """
+    Tests du middleware de mesure (en-tête Server-Timing et log structuré).
+    """
+    def test_server_timing_and_log(self):
+        url = f'/api/project/{self.project_1.id}/'
+        # La connexion est journalisée elle aussi : dans le bloc pour ne rien écrire sur la sortie
+        with self.assertLogs('api.instrumentation', level='INFO') as logs:
+            self.log_user_in(self.user_1)
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="5 queries"', timing)
+        for phase in ('serializer', 'permission', 'authentication', 'total'):
+            self.assertIn(f'{phase};dur=', timing)
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'project-detail')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], 5)
+
+    @override_settings(SOFTDESK_INSTRUMENTATION={'SAMPLE_RATE': 0.0})
+    def test_sampling_off(self):
+        self.log_user_in(self.user_1)
+        response = self.client.get('/api/project/')
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(SOFTDESK_METRICS={'ENABLED': True, 'DIRECTORY': None, 'ALLOWED_IPS': ['127.0.0.1']})
+class MetricsTests(ApiTest):
+    """
+    Tests de l'endpoint /metrics et de l'agrégation entre processus.
+    """
+    def setUp(self):
+        registry._reset()
+        get_membership_cache().clear()
+
+    def test_requests_are_recorded(self):
+        self.log_user_in(self.user_1)
+        self.client.get('/api/project/')
+        self.client.get(f'/api/project/{self.project_1.id}/')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('softdesk_http_requests_total{method="GET",status="200",view="project-list"} 1', body)
+        bucket = 'softdesk_http_request_duration_seconds_bucket{method="GET",view="project-detail",le="+Inf"}'
+        self.assertIn(f'{bucket} 1', body)
+        self.assertIn('softdesk_viewset_db_queries_count{viewset="ProjectViewSet"} 2', body)
+        self.assertIn('softdesk_token_authentication_seconds_count 2', body)
+        self.assertIn('softdesk_membership_cache_hit_ratio', body)
+
+    def test_forbidden_address(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(SOFTDESK_METRICS={'ENABLED': True, 'DIRECTORY': None})
+    def test_closed_by_default(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    @override_settings(SOFTDESK_METRICS={'ENABLED': True, 'DIRECTORY': None, 'TOKEN': 'scraper-secret'})
+    def test_token(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scraper-secret')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer other')
+        self.assertEqual(response.status_code, 403)
+
+    def test_aggregates_worker_snapshots(self):
+        with tempfile.TemporaryDirectory() as directory:
+            other_worker = {
+                'counters': [['softdesk_http_requests_total',
+                              {'method': 'GET', 'status': '200', 'view': 'project-list'}, 4]],
+                'histograms': [],
+            }
+            # Le processus parent est vivant ; le second processus est terminé : son instantané est supprimé
+            with open(f'{directory}/metrics-{os.getppid()}.json', 'w') as file:
+                json.dump(other_worker, file)
+            exited = subprocess.Popen([sys.executable, '-c', ''])
+            exited.wait()
+            dead_worker_path = f'{directory}/metrics-{exited.pid}.json'
+            with open(dead_worker_path, 'w') as file:
+                json.dump(other_worker, file)
+
+            options = {'ENABLED': True, 'DIRECTORY': directory, 'ALLOWED_IPS': ['127.0.0.1']}
+            with override_settings(SOFTDESK_METRICS=options):
+                self.log_user_in(self.user_1)
+                self.client.get('/api/project/')
+                response = self.client.get('/metrics')
+            self.assertFalse(os.path.exists(dead_worker_path))
+        body = response.content.decode()
+        self.assertIn('softdesk_http_requests_total{method="GET",status="200",view="project-list"} 5', body)
+
+
+class StatelessAuthenticationTests(ApiTest):
+    """
+    Tests de l'authentification JWT sans chargement de l'utilisateur.
+    """
+    def setUp(self):
+        self.cache = get_revocation_cache()
+        self.cache.clear()
+        self.addCleanup(self.cache.clear)
+
+    def test_token_claims(self):
+        self.log_user_in(self.user_1)
+        claims = json.loads(base64.urlsafe_b64decode(self.access_token.split('.')[1] + '=='))
+        self.assertEqual(claims['username'], 'user_1')
+        self.assertTrue(claims['is_active'])
+
+    def test_cached_revocation_check_saves_a_query(self):
+        self.log_user_in(self.user_1)
+        with CaptureQueriesContext(connection) as uncached:
+            self.client.get('/api/project/')
+        self.cache.set(self.user_1.pk, True)
+        with CaptureQueriesContext(connection) as cached:
+            response = self.client.get('/api/project/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(cached), len(uncached) - 1)
+
+    def test_inactive_user_is_rejected(self):
+        self.log_user_in(self.user_2)
+        User.objects.filter(pk=self.user_2.pk).update(is_active=False)
+        response = self.client.get('/api/project/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.log_user_in(self.user_3)
+        self.user_3.delete()
+        response = self.client.get('/api/project/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_saving_user_invalidates_cache(self):
+        self.cache.set(self.user_2.pk, True)
+        self.user_2.is_active = False
+        self.user_2.save()
+        self.assertIsNone(self.cache.get(self.user_2.pk))
+
+    def test_claims_user_loads_full_user_lazily(self):
+        user = ClaimsUser(self.user_1.pk, {'username': 'user_1', 'is_active': True})
+        with self.assertNumQueries(0):
+            self.assertEqual(user.username, 'user_1')
+            self.assertEqual(user, self.user_1)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.age, 30)
+            self.assertTrue(user.can_be_contacted)
+
+    def test_ttl_expiration(self):
+        cache = LRUCache(max_size=2, timeout=0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+
+class KeyRingTests(ApiTest):
+    """
+    Tests de la signature des jetons par des clés lues sur disque, avec rotation par kid.
+    Les clés HMAC (oct) permettent de tester le mécanisme sans le paquet cryptography.
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.private_key_path = os.path.join(directory.name, 'private.key')
+        self.jwks_path = os.path.join(directory.name, 'jwks.json')
+        self.write_key('first-secret', mtime=1)
+        with open(self.jwks_path, 'w') as file:
+            json.dump({'keys': []}, file)
+
+        options = {
+            'ALGORITHM': 'HS256',
+            'PRIVATE_KEY_PATH': self.private_key_path,
+            'JWKS_PATH': self.jwks_path,
+            'RELOAD_INTERVAL': 0,
+        }
+        override = override_settings(SOFTDESK_JWT=options)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write_key(self, secret, mtime):
+        with open(self.private_key_path, 'w') as file:
+            file.write(secret)
+        os.utime(self.private_key_path, (mtime, mtime))
+
+    def kid_of(self, secret):
+        k = base64.urlsafe_b64encode(secret.encode()).rstrip(b'=').decode()
+        return thumbprint({'kty': 'oct', 'k': k})
+
+    def token_header(self):
+        return json.loads(base64.urlsafe_b64decode(self.access_token.split('.')[0] + '=='))
+
+    def test_token_carries_kid(self):
+        self.log_user_in(self.user_1)
+        self.assertEqual(self.token_header()['kid'], self.kid_of('first-secret'))
+        self.assertEqual(self.client.get('/api/project/').status_code, 200)
+
+    def test_rotation_keeps_published_keys(self):
+        self.log_user_in(self.user_1)
+        with open(self.jwks_path, 'w') as file:
+            old_key = {'kty': 'oct', 'k': 'Zmlyc3Qtc2VjcmV0', 'kid': self.kid_of('first-secret')}
+            json.dump({'keys': [old_key]}, file)
+        self.write_key('second-secret', mtime=2)
+        self.assertEqual(self.client.get('/api/project/').status_code, 200)
+
+        with open(self.jwks_path, 'w') as file:
+            json.dump({'keys': []}, file)
+        self.assertEqual(self.client.get('/api/project/').status_code, 401)
+
+        self.log_user_in(self.user_1)
+        self.assertEqual(self.token_header()['kid'], self.kid_of('second-secret'))
+
+    def test_keys_are_prepared_once(self):
+        keyring = KeyRing('HS256', self.private_key_path, self.jwks_path, reload_interval=0)
+        kid, key = keyring.get_signing_key()
+        keyring.refresh(force=True)
+        self.assertIs(keyring.get_verifying_key(kid), key)
+        self.assertIsNone(keyring.get_verifying_key('unknown'))
+
+    def test_unknown_kid_reload_is_rate_limited(self):
+        keyring = KeyRing('HS256', self.private_key_path, self.jwks_path, reload_interval=60)
+        keyring.get_signing_key()
+        loads = []
+        load = keyring._load
+        keyring._load = lambda path, parse: loads.append(path) or load(path, parse)
+        for _ in range(10):
+            self.assertIsNone(keyring.get_verifying_key('forged'))
+        # Une seule relecture forcée : clé privée et JWKS
+        self.assertEqual(loads, [self.private_key_path, self.jwks_path])
+
+    def test_jwks_never_publishes_symmetric_keys(self):
+        response = self.client.get('/.well-known/jwks.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'keys': []})
+
+    @override_settings(SOFTDESK_JWT={'ALGORITHM': None})
+    def test_jwks_without_keyring(self):
+        self.assertEqual(self.client.get('/.well-known/jwks.json').status_code, 404)
+
+    @skipIf(algorithms.has_crypto, "cryptography est installé")
+    def test_asymmetric_algorithm_requires_cryptography(self):
+        with self.assertRaises(ImproperlyConfigured):
+            KeyRing('RS256', self.private_key_path)
+        with self.assertRaises(CommandError):
+            call_command(
+                'rotate_jwt_key', algorithm='EdDSA', private_key=self.private_key_path, jwks=self.jwks_path
+            )
+
+    @skipUnless(algorithms.has_crypto, "nécessite cryptography")
+    def test_rotate_command(self):
+        options = {
+            'ALGORITHM': 'EdDSA', 'PRIVATE_KEY_PATH': self.private_key_path, 'JWKS_PATH': self.jwks_path,
+            'RELOAD_INTERVAL': 0,
+        }
+        with override_settings(SOFTDESK_JWT=options):
+            call_command('rotate_jwt_key', stdout=StringIO())
+            self.log_user_in(self.user_1)
+            call_command('rotate_jwt_key', stdout=StringIO())
+            self.assertEqual(len(self.client.get('/.well-known/jwks.json').json()['keys']), 2)
+            self.assertEqual(self.client.get('/api/project/').status_code, 200)
+
+
+SCRYPT_HASHERS = ['api.hashers.TunedScryptPasswordHasher', FAST_PASSWORD_HASHER]
+ARGON2_HASHERS = ['api.hashers.TunedArgon2PasswordHasher', FAST_PASSWORD_HASHER]
+
+
+class PasswordHashingTests(ApiTest):
+    """
+    Tests des hashers configurables, du re-hachage à la connexion et du hachage délégué à un pool de threads.
+    """
+    def password_of(self, user):
+        user.refresh_from_db()
+        return user.password
+
+    def test_fast_hashing_in_tests(self):
+        self.assertTrue(self.password_of(self.user_1).startswith('md5$'))
+
+    @override_settings(
+        PASSWORD_HASHERS=SCRYPT_HASHERS,
+        SOFTDESK_PASSWORD_HASHING={'SCRYPT': {'WORK_FACTOR': 2 ** 10}},
+    )
+    def test_rehash_on_login(self):
+        self.log_user_in(self.user_1)
+        self.assertTrue(self.password_of(self.user_1).startswith('scrypt$1024$'))
+
+        with override_settings(SOFTDESK_PASSWORD_HASHING={'SCRYPT': {'WORK_FACTOR': 2 ** 11}}):
+            self.log_user_in(self.user_1)
+        self.assertTrue(self.password_of(self.user_1).startswith('scrypt$2048$'))
+
+    @override_settings(
+        PASSWORD_HASHERS=ARGON2_HASHERS,
+        SOFTDESK_PASSWORD_HASHING={'ARGON2': {'TIME_COST': 1, 'MEMORY_COST': 1024}},
+    )
+    def test_argon2_rehash_on_login(self):
+        self.log_user_in(self.user_1)
+        self.assertTrue(self.password_of(self.user_1).startswith('argon2$argon2id$v=19$m=1024,t=1,p=1$'))
+
+        with override_settings(SOFTDESK_PASSWORD_HASHING={'ARGON2': {'TIME_COST': 2, 'MEMORY_COST': 1024}}):
+            self.log_user_in(self.user_1)
+        self.assertTrue(self.password_of(self.user_1).startswith('argon2$argon2id$v=19$m=1024,t=2,p=1$'))
+
+    @override_settings(PASSWORD_HASHERS=SCRYPT_HASHERS)
+    def test_user_create_fast_mode(self):
+        data = {'username': 'fast', 'password': 'password', 'age': 30}
+        with override_settings(SOFTDESK_PASSWORD_HASHING={'FAST': True}):
+            self.client.post('/api/user/', data)
+        self.assertTrue(User.objects.get(username='fast').password.startswith('md5$'))
+
+        data = {'username': 'slow', 'password': 'password', 'age': 30}
+        with override_settings(SOFTDESK_PASSWORD_HASHING={'SCRYPT': {'WORK_FACTOR': 2 ** 10}}):
+            self.client.post('/api/user/', data)
+        self.assertTrue(User.objects.get(username='slow').password.startswith('scrypt$'))
+
+    def test_offload_hashing(self):
+        def view(request):
+            return HttpResponse(threading.current_thread().name)
+
+        self.assertIs(offload_hashing(view), view)
+        with override_settings(SOFTDESK_PASSWORD_HASHING={'POOL_SIZE': 2}):
+            offloaded = offload_hashing(view)
+        self.assertTrue(iscoroutinefunction(offloaded))
+        response = async_to_sync(offloaded)(RequestFactory().post('/api/token/'))
+        self.assertTrue(response.content.decode().startswith('password-hashing'))
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncViewTests(ApiTest):
+    """
+    Tests des lectures async : mêmes réponses que les viewsets synchrones.
+    """
+    def urls(self):
+        issue_url = f'/api/project/{self.project_1.id}/issue/{self.issue_1.id}/'
+        return [
+            '/api/project/',
+            f'/api/project/{self.project_1.id}/',
+            f'/api/project/{self.project_1.id}/issue/',
+            f'/api/project/{self.project_1.id}/issue/?pagination=cursor',
+            issue_url,
+            f'{issue_url}comment/?limit=1&offset=0',
+            f'{issue_url}comment/{self.comment_1.uuid}/',
+            f'{issue_url}comment/not-a-uuid/',
+            '/api/project/9999/',
+            '/api/project/9999/issue/',
+        ]
+
+    def assert_same_responses(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.resolver_match.func.cls.__name__.startswith('Async'))
+                with override_settings(ROOT_URLCONF='SoftDesk.urls'):
+                    expected = self.client.get(url)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_same_responses_as_sync_views(self):
+        self.log_user_in(self.user_2)
+        self.assert_same_responses()
+
+    def test_same_errors_as_sync_views(self):
+        self.log_user_in(self.user_3)
+        self.assert_same_responses()
+
+        self.log_user_out()
+        response = self.client.get('/api/project/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+    def test_writes_use_sync_views(self):
+        self.log_user_in(self.user_1)
+        response = self.client.patch(f'/api/project/{self.project_1.id}/', {'title': 'Async'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Async')
+
+    def test_cached_role_and_revocation_need_no_thread(self):
+        self.log_user_in(self.user_2)
+        get_membership_cache().set(self.user_2.pk, self.project_1.pk, ProjectMembership.CONTRIBUTOR)
+        get_revocation_cache().set(self.user_2.pk, True)
+        self.addCleanup(get_membership_cache().clear)
+        self.addCleanup(get_revocation_cache().clear)
+        # Version du projet (ETag), COUNT et page d'issues uniquement
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/project/{self.project_1.id}/issue/')
+        self.assertEqual(response.status_code, 200)
+
+
+class ConditionalGetTests(ApiTest):
+    """
+    Tests des GET conditionnels (ETag / Last-Modified dérivés de Project.version).
+    """
+    def setUp(self):
+        self.project_url = f'/api/project/{self.project_1.id}/'
+        self.issue_url = f'{self.project_url}issue/{self.issue_1.id}/'
+
+    def get_etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified_skips_serialization(self):
+        self.log_user_in(self.user_2)
+        response = self.client.get(self.project_url)
+        self.assertIn('Last-Modified', response)
+        # Authentification et rôle (qui charge le projet) : ni issues ni contributeurs
+        with self.assertNumQueries(2):
+            response = self.client.get(self.project_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        for url in (f'{self.project_url}issue/', self.issue_url, f'{self.issue_url}comment/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_format(self):
+        self.log_user_in(self.user_2)
+        self.assertNotEqual(self.get_etag(self.project_url), self.get_etag(f'{self.project_url}?format=api'))
+
+    def test_permissions_checked_before_not_modified(self):
+        self.log_user_in(self.user_2)
+        etag = self.get_etag(self.project_url)
+        issue_etag = self.get_etag(self.issue_url)
+        self.log_user_in(self.user_3)
+        response = self.client.get(self.project_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(self.issue_url, HTTP_IF_NONE_MATCH=issue_etag)
+        self.assertEqual(response.status_code, 403)
+
+    def test_changes_bump_version(self):
+        comment_url = f'{self.issue_url}comment/'
+        changes = [
+            ('post', f'{self.project_url}issue/', {
+                'author': self.user_1.id, 'title': 'Issue 2', 'description': '',
+                'priority': Issue.LOW, 'type': Issue.BUG, 'status': Issue.TODO,
+            }),
+            ('post', f'{self.project_url}issue/batch/', [{
+                'author': self.user_1.id, 'title': 'Issue 3', 'description': '',
+                'priority': Issue.LOW, 'type': Issue.BUG, 'status': Issue.TODO,
+            }]),
+            ('patch', f'{self.project_url}issue/batch/', {
+                'ids': [self.issue_1.id], 'status': Issue.FINISHED,
+            }),
+            ('patch', self.issue_url, {'title': 'Renamed'}),
+            ('post', comment_url, {'description': 'New comment'}),
+            ('patch', f'{comment_url}{self.comment_1.uuid}/', {'description': 'Edited'}),
+            ('delete', f'{comment_url}{self.comment_1.uuid}/', None),
+            ('post', f'{self.project_url}add_contributors/', {'users': [self.user_3.id]}),
+            ('post', f'{self.project_url}remove_contributor/', {'user': self.user_3.id}),
+            ('patch', self.project_url, {'title': 'Renamed'}),
+            ('patch', f'/api/user/{self.user_1.id}/', {'username': 'renamed'}),
+        ]
+        self.log_user_in(self.user_1)
+        etags = {self.get_etag(self.project_url)}
+        issue_etags = {self.get_etag(self.issue_url)}
+        for method, url, data in changes:
+            with self.subTest(method=method, url=url):
+                response = getattr(self.client, method)(url, data, format='json')
+                self.assertLess(response.status_code, 300)
+                etag = self.get_etag(self.project_url)
+                self.assertNotIn(etag, etags)
+                etags.add(etag)
+                # Le détail d'une issue inclut ses commentaires : même version que le projet
+                issue_etag = self.get_etag(self.issue_url)
+                self.assertNotIn(issue_etag, issue_etags)
+                issue_etags.add(issue_etag)
+
+        response = self.client.delete(self.issue_url)
+        self.assertEqual(response.status_code, 204)
+        self.assertNotIn(self.get_etag(self.project_url), etags)
+
+    def test_user_deletion_bumps_version(self):
+        # user_3 n'est pas contributeur : seules ses issues et ses commentaires touchent le projet
+        issue = Issue.objects.create(
+            author=self.user_3, project=self.project_1, title='Issue 2', priority=Issue.LOW,
+            type=Issue.BUG, status=Issue.TODO,
+        )
+        Comment.objects.create(author=self.user_3, issue=self.issue_1, description='Comment of user_3')
+        self.log_user_in(self.user_2)
+        etag = self.get_etag(self.project_url)
+        issue_etag = self.get_etag(self.issue_url)
+
+        self.log_user_in(self.user_3)
+        response = self.client.delete(f'/api/user/{self.user_3.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Issue.objects.filter(pk=issue.pk).exists())
+
+        self.log_user_in(self.user_2)
+        response = self.client.get(self.project_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.issue_url, HTTP_IF_NONE_MATCH=issue_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['comments']), 1)
+
+    def test_last_login_does_not_bump_version(self):
+        version = Project.objects.get(pk=self.project_1.pk).version
+        self.user_2.save(update_fields=['last_login'])
+        self.assertEqual(Project.objects.get(pk=self.project_1.pk).version, version)
+
+    def test_bulk_import_bumps_version(self):
+        version = Project.objects.get(pk=self.project_1.pk).version
+        loader = BulkLoader()
+        loader.add('issue', {
+            'id': 9000, 'author': self.user_1.id, 'project': self.project_1.id,
+            'title': 'Imported', 'priority': Issue.LOW, 'type': Issue.BUG,
+        })
+        loader.finish()
+        self.assertEqual(Project.objects.get(pk=self.project_1.pk).version, version + 1)
+
+    @override_settings(ROOT_URLCONF='api.async_urls')
+    def test_async_views(self):
+        self.log_user_in(self.user_2)
+        for url in (self.project_url, f'{self.project_url}issue/', self.issue_url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                with override_settings(ROOT_URLCONF='SoftDesk.urls'):
+                    expected = self.client.get(url)
+                self.assertEqual(response['ETag'], expected['ETag'])
+                self.assertEqual(response['Last-Modified'], expected['Last-Modified'])
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+
+class SearchTests(ApiTest):
+    """
+    Tests de la recherche plein texte (index FTS5 tenu à jour par des triggers SQLite).
+    """
+    url = '/api/search/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.project_2 = Project.objects.create(
+            author=cls.user_3, title='Project 2', description='', type=Project.FRONTEND,
+        )
+        cls.issue_2 = Issue.objects.create(
+            author=cls.user_1, project=cls.project_1, title='Crash au démarrage',
+            description='Le serveur plante', priority=Issue.HIGH, type=Issue.BUG,
+        )
+        cls.comment_2 = Comment.objects.create(
+            author=cls.user_2, issue=cls.issue_1, description='Même crash sur le serveur de recette',
+        )
+        cls.issue_3 = Issue.objects.create(
+            author=cls.user_3, project=cls.project_2, title='Crash serveur',
+            description='', priority=Issue.LOW, type=Issue.BUG,
+        )
+
+    def get_results(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def get_ids(self, query, **params):
+        return [(result['type'], result['id']) for result in self.get_results(query, **params)['results']]
+
+    def test_ranked_results_of_contributed_projects(self):
+        self.log_user_in(self.user_2)
+        with self.assertNumQueries(2):
+            data = self.get_results('crash serveur')
+        # Le titre pèse plus que la description ; project_2 n'est pas visible par user_2
+        self.assertEqual(
+            [(result['type'], result['id']) for result in data['results']],
+            [('issue', self.issue_2.id), ('comment', str(self.comment_2.uuid))],
+        )
+        self.assertEqual(data['results'][0]['snippet'], '[Crash] au démarrage')
+        self.assertTrue(data['results'][1]['url'].endswith(
+            f'/api/project/{self.project_1.id}/issue/{self.issue_1.id}/comment/{self.comment_2.uuid}/'
+        ))
+        self.assertIsNone(data['next'])
+
+        self.log_user_in(self.user_3)
+        self.assertEqual(self.get_ids('crash serveur'), [('issue', self.issue_3.id)])
+
+    def test_prefix_accents_and_syntax(self):
+        self.log_user_in(self.user_1)
+        self.assertEqual(self.get_ids('demarr'), [('issue', self.issue_2.id)])
+        self.assertEqual(self.get_ids('recette" (*'), [('comment', str(self.comment_2.uuid))])
+        self.assertEqual(self.get_ids('introuvable'), [])
+        self.assertEqual(self.client.get(self.url, {'q': ' '}).status_code, 400)
+        self.log_user_out()
+        self.assertEqual(self.client.get(self.url, {'q': 'crash'}).status_code, 401)
+
+    def test_pagination(self):
+        self.log_user_in(self.user_2)
+        data = self.get_results('crash', limit=1)
+        self.assertEqual(len(data['results']), 1)
+        self.assertIn('offset=1', data['next'])
+        self.assertEqual(self.get_ids('crash', limit=1, offset=1), [('comment', str(self.comment_2.uuid))])
+
+    def test_index_follows_writes(self):
+        self.log_user_in(self.user_1)
+        Issue.objects.filter(pk=self.issue_2.pk).update(title='Lenteur')
+        self.assertEqual(self.get_ids('lenteur'), [('issue', self.issue_2.id)])
+        Issue.objects.bulk_create([Issue(
+            author=self.user_1, project=self.project_1, title='Lenteur bis', description='',
+            priority=Issue.LOW, type=Issue.BUG,
+        )])
+        self.assertEqual(len(self.get_ids('lenteur')), 2)
+        self.comment_2.description = 'Corrigé'
+        self.comment_2.save()
+        self.assertEqual(self.get_ids('recette'), [])
+        self.assertEqual(self.get_ids('corrige'), [('comment', str(self.comment_2.uuid))])
+        # Suppression en cascade des commentaires
+        self.issue_1.delete()
+        self.assertEqual(self.get_ids('corrige'), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO api_issue_fts(api_issue_fts) VALUES ('delete-all')")
+        self.log_user_in(self.user_2)
+        self.assertEqual(self.get_ids('demarrage'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('reconstruit', out.getvalue())
+        self.assertEqual(self.get_ids('demarrage'), [('issue', self.issue_2.id)])
+
+
+class ProjectStatisticsTests(ApiTest):
+    """
+    Tests de l'action stats des projets et des compteurs de api.statistics.
+    Après chaque écriture, reconcile() ne doit trouver aucun compteur à corriger.
+    """
+    def setUp(self):
+        self.url = f'/api/project/{self.project_1.id}/stats/'
+        self.issues_url = f'/api/project/{self.project_1.id}/issue/'
+
+    def assert_consistent(self):
+        self.assertEqual(reconcile(), [])
+
+    def test_stats(self):
+        self.log_user_in(self.user_2)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'project': self.project_1.id,
+            'issues': 1,
+            'comments': 1,
+            'comments_per_issue': 1.0,
+            'status': {Issue.TODO: 1, Issue.IN_PROGRESS: 0, Issue.FINISHED: 0},
+            'priority': {Issue.LOW: 1, Issue.MEDIUM: 0, Issue.HIGH: 0},
+            'type': {Issue.BUG: 1, Issue.FEATURE: 0, Issue.TASK: 0},
+        })
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.log_user_in(self.user_3)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_counters_follow_api_writes(self):
+        self.log_user_in(self.user_1)
+        response = self.client.post(self.issues_url, {
+            'author': self.user_1.id, 'title': 'New Issue', 'priority': Issue.HIGH, 'type': Issue.TASK,
+            'status': Issue.TODO,
+        })
+        issue_id = response.json()['id']
+        self.client.patch(f'{self.issues_url}{issue_id}/', {'status': Issue.IN_PROGRESS})
+        self.client.post(f'{self.issues_url}{issue_id}/comment/', {'description': 'Comment'})
+        self.client.post(f'{self.issues_url}batch/', [
+            {'author': self.user_2.id, 'title': 'Batch', 'priority': Issue.MEDIUM, 'type': Issue.FEATURE},
+        ], format='json')
+        self.client.patch(f'{self.issues_url}batch/', {
+            'ids': [self.issue_1.id, issue_id], 'status': Issue.FINISHED,
+        }, format='json')
+        self.assert_consistent()
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['issues'], 3)
+        self.assertEqual(data['comments'], 2)
+        self.assertEqual(data['status'], {Issue.TODO: 1, Issue.IN_PROGRESS: 0, Issue.FINISHED: 2})
+
+        comment = Comment.objects.get(issue_id=issue_id)
+        self.client.delete(f'{self.issues_url}{issue_id}/comment/{comment.uuid}/')
+        self.client.delete(f'{self.issues_url}{self.issue_1.id}/')
+        self.assert_consistent()
+        self.assertEqual(self.client.get(self.url).json()['issues'], 2)
+
+    def test_user_deletion(self):
+        Comment.objects.create(author=self.user_2, issue=self.issue_1, description='Comment')
+        Issue.objects.create(
+            author=self.user_2, project=self.project_1, title='Issue 2', priority=Issue.LOW, type=Issue.TASK,
+        )
+        self.log_user_in(self.user_2)
+        self.assertEqual(self.client.delete(f'/api/user/{self.user_2.id}/').status_code, 204)
+        self.assert_consistent()
+        self.assertEqual(get_statistics(self.project_1.id)['comments'], 1)
+
+    def test_bulk_loader(self):
+        loader = BulkLoader(batch_size=2)
+        loader.add('issue', {
+            'id': 100, 'author': self.user_2.id, 'project': self.project_1.id, 'title': 'Imported',
+            'priority': Issue.HIGH, 'type': Issue.TASK,
+        })
+        for _ in range(3):
+            loader.add('comment', {'author': self.user_1.id, 'issue': 100, 'description': 'Imported'})
+        loader.add('comment', {'author': self.user_1.id, 'issue': self.issue_1.id, 'description': 'Imported'})
+        loader.finish()
+        self.assert_consistent()
+        self.assertEqual(get_statistics(self.project_1.id)['comments'], 5)
+
+    def test_reconcile_command(self):
+        ProjectStatistic.objects.filter(project=self.project_1, name='issues').update(value=42)
+        ProjectStatistic.objects.filter(project=self.project_1, name='status:TODO').delete()
+        out = StringIO()
+        call_command('reconcile_stats', project=[self.project_1.id], stdout=out)
+        self.assertIn(f'Projet {self.project_1.id} : issues 42 -> 1', out.getvalue())
+        self.assertIn('2 compteur(s) corrigé(s).', out.getvalue())
+        self.assert_consistent()
+
+
+@override_settings(SOFTDESK_RENDER_CACHE={'BACKEND': 'locmem', 'MAX_BYTES': 1024 * 1024})
+class RenderCacheTests(ApiTest):
+    """
+    Tests du cache des rendus du détail des projets.
+    """
+    def setUp(self):
+        self.url = f'/api/project/{self.project_1.id}/'
+        get_render_cache().clear()
+
+    def test_cached_detail(self):
+        self.log_user_in(self.user_2)
+        with override_settings(SOFTDESK_RENDER_CACHE={'BACKEND': None}):
+            expected = self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(response.json(), expected.json())
+        # Authentification et rôle (qui charge le projet et sa version) : ni issues ni contributeurs
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(get_render_cache().stats()['hits'], 1)
+
+        response = self.client.get(f'{self.url}?format=api')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Project 1')
+
+    def test_writes_change_version(self):
+        self.log_user_in(self.user_1)
+        self.client.get(self.url)
+        self.client.post(f'{self.url}issue/', {
+            'author': self.user_2.id, 'title': 'Issue 2', 'description': '',
+            'priority': Issue.LOW, 'type': Issue.BUG, 'status': Issue.TODO,
+        })
+        self.client.post(f'{self.url}add_contributor/', {'user': self.user_3.id})
+        data = self.client.get(self.url).json()
+        self.assertEqual([issue['title'] for issue in data['issues']], ['Issue 1', 'Issue 2'])
+        self.assertIn(self.user_3.id, [user['id'] for user in data['contributors']])
+
+    def test_permissions_checked_before_cache(self):
+        self.log_user_in(self.user_2)
+        self.client.get(self.url)
+        self.log_user_in(self.user_3)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_locmem_backend_is_bounded_in_bytes(self):
+        backend = LocMemBackend(max_bytes=10)
+        backend.set(1, 1, b'1111')
+        backend.set(2, 1, b'2222')
+        backend.set(1, 2, b'111')
+        self.assertIsNone(backend.get(1, 1))
+        self.assertEqual(backend.get(1, 2), b'111')
+        # Le projet 2, le moins récemment utilisé, est évincé
+        backend.set(3, 1, b'3333')
+        self.assertIsNone(backend.get(2, 1))
+        self.assertEqual(backend.size, 7)
+        backend.set(4, 1, b'x' * 11)
+        self.assertIsNone(backend.get(4, 1))
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = FileBackend(directory, max_bytes=15)
+            backend.set(1, 3, b'{"id":1}')
+            self.assertEqual(backend.get(1, 3), b'{"id":1}')
+            self.assertIsNone(backend.get(1, 4))
+            self.assertIsNone(backend.get(2, 1))
+            os.utime(os.path.join(directory, 'project-1.json'), (0, 0))
+            backend.set(2, 1, b'{"id":2}')
+            self.assertIsNone(backend.get(1, 3))
+            self.assertEqual(backend.get(2, 1), b'{"id":2}')
+
+    def test_django_cache_backend(self):
+        backend = DjangoCacheBackend('default', timeout=60)
+        self.addCleanup(backend.clear)
+        backend.set(1, 2, b'{}')
+        self.assertEqual(backend.get(1, 2), b'{}')
+        self.assertIsNone(backend.get(1, 3))
+
+    def test_single_flight(self):
+        cache = RenderCache(LocMemBackend(max_bytes=1024))
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def render():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return b'{}'
+
+        def get():
+            results.append(cache.get_or_render(1, 1, render))
+
+        threads = [threading.Thread(target=get) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [b'{}'] * 5)
+
+
+@override_settings(
+    ROOT_URLCONF='api.async_urls',
+    SOFTDESK_EVENTS={'HEARTBEAT': 0.05, 'QUEUE_SIZE': 10, 'REPLAY_SIZE': 2},
+)
+class EventStreamTests(ApiTest):
+    """
+    Tests du flux Server-Sent Events des changements d'issues et de commentaires.
+    """
+    def setUp(self):
+        self.url = f'/api/project/{self.project_1.id}/events/'
+        self.addCleanup(get_membership_cache().clear)
+
+    async def open_stream(self, user, url=None, **headers):
+        await sync_to_async(self.log_user_in)(user)
+        response = await self.async_client.get(
+            url or self.url, headers={'Authorization': f'Bearer {self.access_token}', **headers}
+        )
+        if response.status_code == 200:
+            response.stream = aiter(response.streaming_content)
+            self.assertEqual(await self.read(response), 'retry: 3000\n\n')
+        return response
+
+    async def read(self, response):
+        return (await asyncio.wait_for(anext(response.stream), 5)).decode()
+
+    async def read_event(self, response):
+        async with asyncio.timeout(5):
+            chunk = await self.read(response)
+            while chunk == ': heartbeat\n\n':
+                chunk = await self.read(response)
+        return chunk
+
+    async def disconnect(self, response):
+        # Comme ASGIHandler quand le client se déconnecte : la lecture en cours est annulée
+        reading = asyncio.ensure_future(anext(response.stream))
+        await asyncio.sleep(0)
+        reading.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reading
+        self.assertFalse(get_broker().has_subscribers(self.project_1.id))
+
+    def parse(self, chunk):
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+        return fields['event'], json.loads(fields['data'])
+
+    def change(self, method, url, data=None):
+        # Exécuté dans le thread des tests : les callbacks on_commit publient les événements
+        self.log_user_in(self.user_1)
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data, format='json')
+
+    def test_broker_replay(self):
+        broker = EventBroker(replay_size=2)
+        first, second, third, fourth = [broker.publish(1, 'issue.updated', {'id': n}) for n in range(4)]
+        broker.publish(2, 'issue.updated', {})
+        self.assertEqual(broker.replay(1, f'{broker.epoch}-{second.id}'), [third, fourth])
+        self.assertEqual(broker.replay(1, f'{broker.epoch}-{fourth.id}'), [])
+        # Événement sorti de l'historique, autre processus, identifiant invalide
+        self.assertIsNone(broker.replay(1, f'{broker.epoch}-{first.id}'))
+        self.assertIsNone(broker.replay(1, f'other-{fourth.id}'))
+        self.assertIsNone(broker.replay(1, 'invalid'))
+        # Changement non publié faute d'abonné
+        broker.skip(1)
+        self.assertIsNone(broker.replay(1, f'{broker.epoch}-{fourth.id}'))
+
+    async def test_contributor_receives_changes(self):
+        response = await self.open_stream(self.user_2)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        issue_url = f'/api/project/{self.project_1.id}/issue/'
+        created = await sync_to_async(self.change)('post', issue_url, {
+            'author': self.user_1.id, 'title': 'Issue 2', 'description': 'Description',
+            'priority': Issue.HIGH, 'type': Issue.TASK, 'status': Issue.TODO,
+        })
+        event, data = self.parse(await self.read_event(response))
+        self.assertEqual(event, 'issue.created')
+        self.assertEqual(data['issue'], created.json())
+
+        await sync_to_async(self.change)('patch', f'{issue_url}batch/', {
+            'ids': [self.issue_1.id], 'status': Issue.FINISHED,
+        })
+        self.assertEqual(
+            self.parse(await self.read_event(response)),
+            ('issue.updated', {'issue': {'id': self.issue_1.id, 'status': Issue.FINISHED}}),
+        )
+
+        comment_url = f'{issue_url}{self.issue_1.id}/comment/{self.comment_1.uuid}/'
+        await sync_to_async(self.change)('delete', comment_url)
+        self.assertEqual(
+            self.parse(await self.read_event(response)),
+            ('comment.deleted', {'comment': {'uuid': str(self.comment_1.uuid), 'issue': self.issue_1.id}}),
+        )
+        await self.disconnect(response)
+
+    async def test_only_contributors_subscribe(self):
+        response = await self.open_stream(self.user_3)
+        self.assertEqual(response.status_code, 403)
+        response = await self.open_stream(self.user_3, url='/api/project/9999/events/')
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(get_broker().has_subscribers(self.project_1.id))
+
+    async def test_stream_ends_when_contributor_is_removed(self):
+        response = await self.open_stream(self.user_2)
+        self.assertEqual(await self.read(response), ': heartbeat\n\n')
+        await sync_to_async(self.change)('post', f'/api/project/{self.project_1.id}/remove_contributor/', {
+            'user': self.user_2.id,
+        })
+        # Le heartbeat suivant re-vérifie les droits et termine le flux
+        with self.assertRaises(StopAsyncIteration):
+            await self.read_event(response)
+        self.assertFalse(get_broker().has_subscribers(self.project_1.id))
+
+    async def test_reconnection(self):
+        response = await self.open_stream(self.user_2)
+        first = get_broker().publish(self.project_1.id, 'issue.deleted', {'issue': {'id': 1}})
+        self.assertEqual(await self.read_event(response), first.encode())
+        await self.disconnect(response)
+
+        # Publié pendant la déconnexion, puis rejoué
+        second = get_broker().publish(self.project_1.id, 'issue.deleted', {'issue': {'id': 2}})
+        last_event_id = f'{first.epoch}-{first.id}'
+        response = await self.open_stream(self.user_2, **{'Last-Event-ID': last_event_id})
+        self.assertEqual(await self.read_event(response), second.encode())
+        await self.disconnect(response)
+
+        # Changement fait sans abonné : le client doit recharger le projet
+        issue_url = f'/api/project/{self.project_1.id}/issue/{self.issue_1.id}/'
+        await sync_to_async(self.change)('patch', issue_url, {'title': 'Renamed'})
+        response = await self.open_stream(self.user_2, **{'Last-Event-ID': f'{second.epoch}-{second.id}'})
+        self.assertEqual(await self.read(response), 'event: reset\ndata: {}\n\n')
+        await self.disconnect(response)
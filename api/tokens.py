@@ -0,0 +1,239 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+
+import jwt
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+from jwt import algorithms
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+
+# Membres nécessaires au calcul de l'empreinte d'une clé (RFC 7638), utilisée comme kid
+THUMBPRINT_MEMBERS = {
+    'RSA': ('e', 'kty', 'n'),
+    'EC': ('crv', 'kty', 'x', 'y'),
+    'OKP': ('crv', 'kty', 'x'),
+    'oct': ('k', 'kty'),
+}
+
+
+def get_options():
+    return getattr(settings, 'SOFTDESK_JWT', {})
+
+
+def get_algorithm(name):
+    if name in algorithms.requires_cryptography and not algorithms.has_crypto:
+        raise ImproperlyConfigured(
+            f"L'algorithme {name} nécessite le paquet cryptography (pip install cryptography)"
+        )
+    try:
+        return algorithms.get_default_algorithms()[name]
+    except KeyError:
+        raise ImproperlyConfigured(f"Algorithme JWT inconnu : {name}")
+
+
+def thumbprint(jwk):
+    members = {member: jwk[member] for member in THUMBPRINT_MEMBERS[jwk['kty']]}
+    digest = hashlib.sha256(json.dumps(members, separators=(',', ':'), sort_keys=True).encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def public_key_of(key):
+    # Les clés HMAC sont symétriques : la clé de vérification est la clé de signature
+    return key.public_key() if hasattr(key, 'public_key') else key
+
+
+class KeyRing:
+    """
+    Clés de signature et de vérification lues sur disque et préparées une seule fois par processus.
+    - PRIVATE_KEY_PATH : clé privée courante (PEM, ou secret brut pour HS*) ;
+      son kid est son empreinte RFC 7638
+    - JWKS_PATH : clés publiques acceptées en vérification (anciennes clés conservées pendant une rotation)
+    Les fichiers ne sont relus que si leur date de modification change, au plus toutes les RELOAD_INTERVAL
+    secondes ; un kid inconnu force une relecture immédiate, au plus une fois par FORCED_RELOAD_INTERVAL
+    secondes (des jetons forgés ne peuvent pas provoquer une relecture à chaque requête).
+    """
+    FORCED_RELOAD_INTERVAL = 1
+
+    def __init__(self, algorithm, private_key_path, jwks_path=None, reload_interval=5):
+        self.algorithm = algorithm
+        self.private_key_path = private_key_path
+        self.jwks_path = jwks_path
+        self.reload_interval = reload_interval
+        self._algorithm = get_algorithm(algorithm)
+        self._files = {}
+        self._checked = None
+        self._forced = None
+        self._lock = threading.Lock()
+        # (kid, clé) remplacés ensemble : un lecteur hors verrou n'associe jamais un kid à une autre clé
+        self.signing = (None, None)
+        self.verifying_keys = {}
+        self.public_jwks = {'keys': []}
+
+    def _load(self, path, parse):
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._files.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = self._files[path] = (mtime, parse(path))
+        return cached[1]
+
+    def _read_private_key(self, path):
+        with open(path, 'rb') as file:
+            key = self._algorithm.prepare_key(file.read().strip())
+        jwk = self._algorithm.to_jwk(public_key_of(key), as_dict=True)
+        kid = thumbprint(jwk)
+        return kid, key, dict(jwk, kid=kid, alg=self.algorithm, use='sig')
+
+    def _read_jwks(self, path):
+        with open(path) as file:
+            jwks = json.load(file)
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            kid = jwk.get('kid') or thumbprint(jwk)
+            keys[kid] = (jwt.PyJWK(jwk, algorithm=jwk.get('alg', self.algorithm)).key, jwk)
+        return keys
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self._checked is not None and now - self._checked < self.reload_interval:
+            return
+        with self._lock:
+            self._checked = now
+            kid, key, signing_jwk = self._load(self.private_key_path, self._read_private_key)
+            keys = self._load(self.jwks_path, self._read_jwks) if self.jwks_path else {}
+            verifying_keys = {kid: prepared for kid, (prepared, _) in keys.items()}
+            # La clé courante vérifie toujours ses propres jetons, même absente du JWKS
+            verifying_keys[kid] = public_key_of(key)
+            published = [jwk for _, jwk in keys.values()]
+            if kid not in keys:
+                published.append(signing_jwk)
+
+            self.signing = (kid, key)
+            self.verifying_keys = verifying_keys
+            # Les clés symétriques ne sont jamais publiées
+            self.public_jwks = {'keys': [jwk for jwk in published if jwk['kty'] != 'oct']}
+
+    def get_signing_key(self):
+        self.refresh()
+        return self.signing
+
+    def get_verifying_key(self, kid):
+        self.refresh()
+        key = self.verifying_keys.get(kid)
+        if key is None and self._may_force_reload():
+            self.refresh(force=True)
+            key = self.verifying_keys.get(kid)
+        return key
+
+    def _may_force_reload(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._forced is not None and now - self._forced < self.FORCED_RELOAD_INTERVAL:
+                return False
+            self._forced = now
+            return True
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    TokenBackend de simplejwt dont les clés viennent d'un KeyRing : le kid de la clé de signature est
+    ajouté à l'en-tête des jetons, et la vérification choisit la clé par son kid.
+    """
+    def __init__(self, keyring, **kwargs):
+        super().__init__(keyring.algorithm, **kwargs)
+        self.keyring = keyring
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        kid, key = self.keyring.get_signing_key()
+        return jwt.encode(
+            jwt_payload, key, algorithm=self.algorithm, headers={'kid': kid}, json_encoder=self.json_encoder,
+        )
+
+    def get_verifying_key(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError("Jeton invalide") from ex
+        key = self.keyring.get_verifying_key(kid)
+        if key is None:
+            raise TokenBackendError("Clé de signature inconnue")
+        return key
+
+
+_token_backend = None
+
+
+def get_token_backend():
+    """
+    Sans SOFTDESK_JWT['ALGORITHM'], les jetons restent signés par simplejwt avec SECRET_KEY (HS256).
+    """
+    global _token_backend
+    if _token_backend is None:
+        options = get_options()
+        if not options.get('ALGORITHM'):
+            from rest_framework_simplejwt.state import token_backend
+            _token_backend = token_backend
+        else:
+            keyring = KeyRing(
+                options['ALGORITHM'],
+                options['PRIVATE_KEY_PATH'],
+                options.get('JWKS_PATH'),
+                options.get('RELOAD_INTERVAL', 5),
+            )
+            _token_backend = KeyRingTokenBackend(
+                keyring,
+                audience=api_settings.AUDIENCE,
+                issuer=api_settings.ISSUER,
+                leeway=api_settings.LEEWAY,
+                json_encoder=api_settings.JSON_ENCODER,
+            )
+    return _token_backend
+
+
+@receiver(setting_changed)
+def reset_token_backend(setting, **kwargs):
+    global _token_backend
+    if setting in ('SOFTDESK_JWT', 'SIMPLE_JWT'):
+        _token_backend = None
+
+
+class KeyRingTokenMixin:
+    def get_token_backend(self):
+        return get_token_backend()
+
+
+class AccessToken(KeyRingTokenMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(KeyRingTokenMixin, tokens.RefreshToken):
+    access_token_class = AccessToken
+
+
+def jwks_view(request):
+    """
+    Clés publiques de vérification (JWKS), pour valider les jetons SoftDesk sans appeler l'API.
+    """
+    backend = get_token_backend()
+    if not isinstance(backend, KeyRingTokenBackend):
+        raise Http404
+    backend.keyring.refresh()
+    response = HttpResponse(json.dumps(backend.keyring.public_jwks), content_type='application/json')
+    response['Cache-Control'] = f'public, max-age={backend.keyring.reload_interval}'
+    return response
@@ -1,18 +1,138 @@
+import json
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, OuterRef, Prefetch, Q, Subquery, Value, When
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework.decorators import action
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.renderers import JSONRenderer
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.viewsets import ModelViewSet, ViewSet
 from rest_framework.response import Response
 
-from .models import User, Project, Issue, Comment
+from .models import User, Project, Issue, Comment, Contributor
 from api.serializers import (
     UserSerializer, UserSummarySerializer, UserCreateSerializer,
-    ProjectSerializer, ProjectDetailSerializer,
-    IssueSerializer, IssueDetailSerializer,
-    CommentSerializer,
+    ProjectSerializer, ProjectDetailSerializer, MyProjectSerializer,
+    IssueSerializer, IssueDetailSerializer, IssueBatchSerializer, IssueBatchUpdateSerializer,
+    CommentSerializer, ContributorListSerializer,
 )
 
 from rest_framework.permissions import IsAuthenticated
-from api.permissions import ProjectPermission, UserPermission, IssueAndCommentPermission
+from api.events import publish_issues_updated, publish_issue_deleted, publish_comment_deleted
+from api.filters import IssueFilter, WhitelistOrderingFilter
+from api.exports import iter_project_rows, ndjson_lines, csv_lines
+from api.instrumentation import timed
+from api.pagination import SwitchablePagination
+from api.render_cache import get_render_cache
+from api.search import search
+from api.statistics import (
+    COMMENTS, ISSUES, apply_deltas, comments_changed, count_issue_change, get_statistics, issue_deleted,
+    statistic, user_deleted,
+)
+from api.permissions import (
+    ProjectMembership, ProjectPermission, UserPermission, IssueAndCommentPermission,
+    get_project_membership, remember_roles,
+)
+
+
+class InstrumentedViewMixin:
+    """
+    Chronomètre l'authentification et les permissions pour InstrumentationMiddleware.
+    """
+    def perform_authentication(self, request):
+        with timed('authentication'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with timed('permission'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with timed('permission'):
+            super().check_object_permissions(request, obj)
+
+
+class ConditionalGetMixin:
+    """
+    ETag et Last-Modified dérivés de la version du projet (Project.version) pour list et retrieve :
+    une requête If-None-Match / If-Modified-Since sur une ressource inchangée reçoit une 304 après
+    les permissions, sans charger les objets ni exécuter les serializers.
+    """
+    project_url_kwarg = 'project_pk'
+    conditional_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def check_conditional_permissions(self, request):
+        """
+        Permissions objet à vérifier avant de répondre 304 (has_permission l'a déjà été).
+        """
+
+    def get_project_version(self, request):
+        # Projet déjà chargé par la résolution du rôle (hors cache) : pas de requête supplémentaire
+        membership = get_project_membership(request, self.kwargs[self.project_url_kwarg])
+        project = membership.loaded_project
+        if project is not None:
+            return membership.project_pk, project.version, project.updated_time
+        version, updated_time = get_object_or_404(
+            Project.objects.values_list('version', 'updated_time'), pk=membership.project_pk
+        )
+        return membership.project_pk, version, updated_time
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+        self.check_conditional_permissions(request)
+        # Version lue avant les données : une réponse ne porte jamais une version plus récente qu'elle
+        project_pk, version, updated_time = self.get_project_version(request)
+        self.project_version = version
+        etag, last_modified = self.get_validators(
+            project_pk, version, updated_time, request.accepted_renderer.format
+        )
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    @staticmethod
+    def get_validators(project_pk, version, updated_time, format):
+        # Le format fait partie de l'ETag : JSON et API navigable sont deux représentations différentes
+        return f'"{project_pk}-{version}-{format}"', int(updated_time.timestamp())
+
+
+class RenderCacheMixin:
+    """
+    retrieve servi depuis le cache de rendus (api.render_cache), indexé par la version du projet lue
+    par ConditionalGetMixin, qui doit le précéder : les permissions sont donc vérifiées avant la lecture
+    du cache. Le rendu JSON en cache est renvoyé tel quel, sans repasser par le renderer.
+    """
+    def retrieve(self, request, *args, **kwargs):
+        cache = get_render_cache()
+        if cache is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        content = cache.get_or_render(int(self.kwargs['pk']), self.project_version, self.render_object)
+        renderer = request.accepted_renderer
+        if renderer.format == 'json' and renderer.get_indent(request.accepted_media_type, {}) is None:
+            return HttpResponse(content, content_type=renderer.media_type)
+        return Response(json.loads(content))
+
+    def render_object(self):
+        serializer = self.get_serializer(self.get_object())
+        return JSONRenderer().render(serializer.data)
 
 
 class MultipleSerializerMixin:
@@ -25,7 +145,7 @@ class MultipleSerializerMixin:
         return super().get_serializer_class()
 
 
-class UserViewSet(ModelViewSet):
+class UserViewSet(InstrumentedViewMixin, ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSummarySerializer
     detail_serializer_class = UserSerializer
@@ -38,16 +158,71 @@ class UserViewSet(ModelViewSet):
             return UserCreateSerializer
         return super().get_serializer_class()
 
+    def perform_destroy(self, instance):
+        # Issues et commentaires supprimés en cascade : retirés des compteurs des projets et des
+        # comment_count des issues des autres utilisateurs, version des projets touchés incrémentée
+        with transaction.atomic():
+            user_deleted(instance.pk)
+            commented_issues = list(
+                Comment.objects.filter(author=instance).exclude(issue__author=instance)
+                .values_list('issue_id', flat=True).distinct()
+            )
+            project_ids = set(
+                Issue.objects.filter(Q(author=instance) | Q(pk__in=commented_issues))
+                .values_list('project_id', flat=True)
+            )
+            instance.delete()
+            Issue.objects.filter(pk__in=commented_issues).refresh_comment_activity()
+            Project.objects.filter(pk__in=project_ids).bump_version()
 
-class ProjectViewSet(MultipleSerializerMixin, ModelViewSet):
+
+class ProjectViewSet(
+    InstrumentedViewMixin, ConditionalGetMixin, RenderCacheMixin, MultipleSerializerMixin, ModelViewSet
+):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     detail_serializer_class = ProjectDetailSerializer
     permission_classes = [IsAuthenticated, ProjectPermission]
+    project_url_kwarg = 'pk'
+    # La liste couvre plusieurs projets : pas de version unique
+    conditional_actions = ('retrieve', 'stats')
+
+    def check_conditional_permissions(self, request):
+        # ProjectPermission sans charger le projet s'il ne l'a pas été par la résolution du rôle :
+        # la règle ne lit que sa clé primaire
+        membership = get_project_membership(request, self.kwargs['pk'])
+        self.check_object_permissions(request, membership.loaded_project or Project(pk=membership.project_pk))
+
+    def get_queryset(self):
+        if self.action == 'retrieve':
+            # Charge les issues et les contributeurs (avec leur user) en deux requêtes au total
+            return self.queryset.prefetch_related(
+                'issues',
+                Prefetch('contributors', queryset=Contributor.objects.select_related('user')),
+            )
+        if self.action == 'mine':
+            # Jointure sur Contributor lue dans l'index unique_contributor (user, project), déjà trié par
+            # projet ; les compteurs sont des sous-requêtes sur des index (une ligne par projet)
+            user_pk = self.request.user.pk
+            contributors = Contributor.objects.filter(project=OuterRef('pk')).order_by().values('project')
+            return self.queryset.filter(contributors__user_id=user_pk).annotate(
+                role=Case(
+                    When(author_id=user_pk, then=Value(ProjectMembership.AUTHOR)),
+                    default=Value(ProjectMembership.CONTRIBUTOR),
+                ),
+                contributor_count=Subquery(contributors.annotate(count=Count('pk')).values('count')),
+                issue_count=statistic(ISSUES),
+                comment_count=statistic(COMMENTS),
+            ).order_by('contributors__project_id')
+        return self.queryset
+
+    def get_serializer_class(self):
+        if self.action == 'mine':
+            return MyProjectSerializer
+        return super().get_serializer_class()
 
     def perform_create(self, serializer):
-        author = self.request.user
-        serializer.save(author=author)
+        serializer.save(author_id=self.request.user.pk)
 
     @action(detail=True, methods=['post'])
     def add_contributor(self, request, pk):
@@ -65,32 +240,260 @@ class ProjectViewSet(MultipleSerializerMixin, ModelViewSet):
             return Response({'status': 'Utilisateur retiré des contributeurs'}, status=200)
         return Response({'status': 'Utilisateur n\'est pas contributeur'}, status=400)
 
+    @action(detail=False, methods=['get'])
+    def mine(self, request):
+        """
+        Projets dont l'utilisateur est auteur ou contributeur, avec son rôle, le nombre de contributeurs,
+        d'issues et de commentaires, en une requête par page. Les rôles lus alimentent le cache des rôles :
+        le détail d'un de ces projets ne recharge pas le rôle de l'utilisateur.
+        """
+        page = self.paginate_queryset(self.get_queryset())
+        projects = page if page is not None else list(self.get_queryset())
+        remember_roles(request.user.pk, {project.pk: project.role for project in projects})
+        serializer = self.get_serializer(projects, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk):
+        """
+        Nombre d'issues (au total et par status, priority et type) et de commentaires du projet, lus dans
+        ses compteurs (api.statistics) : le coût ne dépend pas de la taille du projet.
+        """
+        return self.conditional_response(self.render_stats, request, pk)
+
+    def render_stats(self, request, pk):
+        return Response({'project': int(pk), **get_statistics(pk)})
+
+    export_chunk_size = 2000
+    export_formats = {
+        'ndjson': (ndjson_lines, 'application/x-ndjson'),
+        'csv': (csv_lines, 'text/csv'),
+    }
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk):
+        """
+        Exporte en flux toutes les issues puis tous les commentaires du projet (?output=ndjson ou csv).
+        """
+        project = self.get_object()
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.export_formats:
+            return Response({'detail': 'Format d\'export inconnu (ndjson ou csv).'}, status=400)
+
+        lines, content_type = self.export_formats[output]
+        response = StreamingHttpResponse(
+            lines(iter_project_rows(project, self.export_chunk_size)),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="project-{project.pk}.{output}"'
+        return response
+
+    def _bulk_contributors(self, request, method):
+        project = self.get_object()
+        serializer = ContributorListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = getattr(project, method)(serializer.validated_data['users'])
+        return Response({
+            'results': [{'user': user_id, 'status': status} for user_id, status in results.items()]
+        }, status=200)
 
-class IssueViewSet(MultipleSerializerMixin, ModelViewSet):
+    @action(detail=True, methods=['post'])
+    def add_contributors(self, request, pk):
+        return self._bulk_contributors(request, 'add_contributors')
+
+    @action(detail=True, methods=['post'])
+    def remove_contributors(self, request, pk):
+        return self._bulk_contributors(request, 'remove_contributors')
+
+
+class IssueViewSet(InstrumentedViewMixin, ConditionalGetMixin, MultipleSerializerMixin, ModelViewSet):
     queryset = Issue.objects.all()
     serializer_class = IssueSerializer
     detail_serializer_class = IssueDetailSerializer
     permission_classes = [IsAuthenticated, IssueAndCommentPermission]
+    # Nombre maximal d'issues créées par POST batch/
+    batch_max_length = 1000
+    pagination_class = SwitchablePagination
+    # 'limit_offset' (par défaut) ou 'cursor' ; le client peut choisir avec ?pagination=
+    pagination_mode = SwitchablePagination.LIMIT_OFFSET
+    filter_backends = [IssueFilter, WhitelistOrderingFilter]
+    # Tris autorisés (?ordering=), chacun lu dans l'ordre d'un index (project, [champ,] created_time, id)
+    # ou (project, last_activity_time, id)
+    ordering = ('created_time', 'id')
+    orderings = {
+        'created_time': ('created_time', 'id'),
+        '-created_time': ('-created_time', '-id'),
+        'last_activity_time': ('last_activity_time', 'id'),
+        '-last_activity_time': ('-last_activity_time', '-id'),
+        **{
+            prefix + field: (prefix + column, prefix + 'created_time', prefix + 'id')
+            for field, column in (
+                ('status', 'status'), ('priority', 'priority'), ('type', 'type'), ('author', 'author_id'),
+                ('comment_count', 'comment_count'),
+            )
+            for prefix in ('', '-')
+        },
+    }
+    # Seuls tris admis avec ?pagination=cursor : le curseur ne retient que la valeur du premier champ, qui
+    # doit départager les issues et ne jamais changer (last_activity_time avance à chaque commentaire)
+    cursor_orderings = ('created_time', '-created_time')
 
     def get_queryset(self):
         project_pk = self.kwargs.get('project_pk')
-        return self.queryset.filter(project__id=project_pk)
+        queryset = self.queryset.filter(project_id=project_pk)
+        if self.action == 'retrieve':
+            # Les commentaires préchargés reçoivent leur issue : get_issue_url ne refait pas de requête
+            queryset = queryset.prefetch_related('comments')
+        return queryset
 
     def perform_create(self, serializer):
-        project = get_object_or_404(Project, id=self.kwargs.get('project_pk'))
-        serializer.save(project=project)
+        membership = get_project_membership(self.request, self.kwargs.get('project_pk'))
+        # Compteurs du projet (api.statistics) modifiés dans la transaction de l'écriture
+        with transaction.atomic():
+            serializer.save(project=membership.project)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
 
+    def perform_destroy(self, instance):
+        # Événement publié après le commit de la suppression
+        with transaction.atomic():
+            publish_issue_deleted(instance)
+            issue_deleted(instance, instance.comments.count())
+            instance.delete()
+            Project.objects.filter(pk=instance.project_id).bump_version()
 
-class CommentViewSet(MultipleSerializerMixin, ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def batch(self, request, project_pk):
+        """
+        Crée une liste d'issues en une seule transaction et une seule insertion.
+        """
+        if not isinstance(request.data, list):
+            return Response({'detail': 'Une liste d\'issues est attendue.'}, status=400)
+        # Taille vérifiée avant la lecture des contributeurs : la clause IN reste bornée
+        if len(request.data) > self.batch_max_length:
+            return Response({'detail': f'Au plus {self.batch_max_length} issues par lot.'}, status=400)
+
+        contributor_ids = set(
+            Contributor.objects.filter(
+                project_id=project_pk, user_id__in=IssueBatchSerializer.get_author_ids(request.data),
+            ).values_list('user_id', flat=True)
+        )
+        serializer = IssueBatchSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=self.batch_max_length,
+            context={**self.get_serializer_context(), 'contributor_ids': contributor_ids},
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save(project_id=int(project_pk))
+        return Response(serializer.data, status=201)
+
+    @batch.mapping.patch
+    def batch_update(self, request, project_pk):
+        """
+        Modifie le status et/ou la priority d'une liste d'issues en un seul UPDATE.
+        Seules les issues dont l'utilisateur est l'auteur sont modifiées.
+        """
+        serializer = IssueBatchUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.pop('ids')
+
+        with transaction.atomic():
+            issues = {
+                issue['id']: issue for issue in Issue.objects.select_for_update()
+                .filter(project_id=project_pk, id__in=ids)
+                .values('id', 'author_id', *Issue.COUNTED_FIELDS)
+            }
+            authors = {issue_id: issue['author_id'] for issue_id, issue in issues.items()}
+            updatable = [issue_id for issue_id, author_id in authors.items() if author_id == request.user.pk]
+            Issue.objects.filter(id__in=updatable).update(
+                updated_time=timezone.now(), **serializer.validated_data
+            )
+            if updatable:
+                Project.objects.filter(pk=project_pk).bump_version()
+            deltas = Counter()
+            for issue_id in updatable:
+                old_values = issues[issue_id]
+                new_values = {**old_values, **serializer.validated_data}
+                count_issue_change(deltas, int(project_pk), old_values, new_values)
+            apply_deltas(deltas)
+            publish_issues_updated(int(project_pk), updatable, serializer.validated_data)
+
+        results = []
+        for issue_id in dict.fromkeys(ids):
+            if issue_id not in authors:
+                status = Issue.NOT_FOUND
+            elif authors[issue_id] == request.user.pk:
+                status = Issue.UPDATED
+            else:
+                status = Issue.FORBIDDEN
+            results.append({'id': issue_id, 'status': status})
+        return Response({'results': results}, status=200)
+
+
+class CommentViewSet(InstrumentedViewMixin, ConditionalGetMixin, MultipleSerializerMixin, ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated, IssueAndCommentPermission]
+    pagination_class = SwitchablePagination
+    # 'limit_offset' (par défaut) ou 'cursor' ; le client peut choisir avec ?pagination=
+    pagination_mode = SwitchablePagination.LIMIT_OFFSET
 
     def get_queryset(self):
         issue_pk = self.kwargs.get('issue_pk')
-        return self.queryset.filter(issue__id=issue_pk)
+        return self.queryset.filter(issue_id=issue_pk).select_related('issue')
 
     def perform_create(self, serializer):
         issue = get_object_or_404(Issue, id=self.kwargs.get('issue_pk'))
-        author = self.request.user
-        serializer.save(issue=issue, author=author)
+        # Compteurs du projet (api.statistics) modifiés dans la transaction de l'écriture
+        with transaction.atomic():
+            serializer.save(issue=issue, author_id=self.request.user.pk)
+
+    def perform_destroy(self, instance):
+        # Événement publié après le commit de la suppression
+        with transaction.atomic():
+            publish_comment_deleted(instance)
+            comments_changed(instance.issue.project_id, -1)
+            instance.delete()
+            Issue.objects.filter(pk=instance.issue_id).add_comment_activity(-1, timezone.now())
+            Project.objects.filter(pk=instance.issue.project_id).bump_version()
+
+
+class SearchViewSet(InstrumentedViewMixin, ViewSet):
+    """
+    Recherche plein texte (api.search) dans les titres et descriptions des issues et les commentaires
+    des projets dont l'utilisateur est contributeur : GET /api/search/?q=...&limit=...&offset=...
+    Les résultats sont classés par pertinence ; sans COUNT(*), `next` vaut None sur la dernière page.
+    """
+    permission_classes = [IsAuthenticated]
+    max_limit = 100
+
+    def list(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'detail': 'Le paramètre q est requis.'}, status=400)
+
+        paginator = LimitOffsetPagination()
+        limit = min(paginator.get_limit(request), self.max_limit)
+        offset = paginator.get_offset(request)
+        # Un résultat de plus que la page : indique s'il existe une page suivante
+        results = search(request.user, text, limit + 1, offset)
+        next_url = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_url = replace_query_param(request.build_absolute_uri(), 'offset', offset + limit)
+
+        for result in results:
+            if result['type'] == 'issue':
+                kwargs = {'project_pk': result['project'], 'pk': result['issue']}
+                result['url'] = reverse('project-issues-detail', kwargs=kwargs, request=request)
+            else:
+                kwargs = {'project_pk': result['project'], 'issue_pk': result['issue'], 'pk': result['id']}
+                result['url'] = reverse('issue-comments-detail', kwargs=kwargs, request=request)
+        return Response({'next': next_url, 'results': results})
@@ -7,6 +7,8 @@ from django.core.management import call_command
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SoftDesk.settings')
 django.setup()
 
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from api import statistics  # noqa: E402
 from api.models import User, Contributor, Project, Issue, Comment  # noqa: E402
 
 fake = Faker('fr_FR')
@@ -23,16 +25,18 @@ def run():
         can_data_be_shared=True,
     )
 
-    users = []
-    for _ in range(5):
-        user = User.objects.create_user(
-            username=fake.user_name(),
-            password='password',
+    # Tous les faux utilisateurs partagent le même mot de passe : il n'est haché qu'une fois, avec le
+    # hasher par défaut (un hash MD5 du mode FAST ne serait pas vérifiable par un serveur lancé normalement)
+    password = make_password('password')
+    users = User.objects.bulk_create([
+        User(
+            username=fake.unique.user_name(),
+            password=password,
             age=random.randint(18, 60),
             can_be_contacted=fake.boolean(),
             can_data_be_shared=fake.boolean(),
-        )
-        users.append(user)
+        ) for _ in range(5)
+    ])
 
     project_titles = [
         "Application de gestion",
@@ -40,27 +44,27 @@ def run():
         "Outil de planification",
     ]
 
-    projects = []
-    for i in range(3):
-        author = users[i]
-        project = Project.objects.create(
-            author=author,
+    projects = Project.objects.bulk_create([
+        Project(
+            author=users[i],
             title=project_titles[i],
             description=fake.paragraph(nb_sentences=3),
             type=random.choice(['BACKEND', 'FRONTEND', 'IOS', 'ANDROID']),
-        )
-        projects.append(project)
+        ) for i in range(3)
+    ])
 
-    contributors = []
+    # Contributeurs de chaque projet gardés en mémoire : pas de requête dans les boucles suivantes
+    project_contributors = {}
     for project in projects:
         potential_contributors = [user for user in users if user != project.author]
-        for _ in range(random.randint(1, 3)):
-            contributor = Contributor.objects.create(
-                user=random.choice(potential_contributors),
-                project=project
-            )
-            potential_contributors.remove(contributor.user)
-            contributors.append(contributor)
+        chosen = random.sample(potential_contributors, random.randint(1, 3))
+        project_contributors[project.pk] = [project.author] + chosen
+
+    Contributor.objects.bulk_create([
+        Contributor(user=user, project=project)
+        for project in projects
+        for user in project_contributors[project.pk]
+    ])
 
     issue_titles = [
         "Problème de performance",
@@ -70,29 +74,34 @@ def run():
         "Mise à jour de la documentation",
     ]
 
-    issues = []
-    for project in projects:
-        for i in range(random.randint(3, 5)):
-            author = random.choice(project.contributors.all()).user
-            issue = Issue.objects.create(
-                project=project,
-                author=author,
-                title=issue_titles[i],
-                description=fake.paragraph(nb_sentences=2),
-                priority=random.choice(['LOW', 'MEDIUM', 'HIGH']),
-                type=random.choice(['BUG', 'FEATURE', 'TASK']),
-                status=random.choice(['TODO', 'IN_PROGRESS', 'FINISHED']),
-            )
-            issues.append(issue)
-
-    for issue in issues:
-        for _ in range(random.randint(3, 10)):
-            author = random.choice(issue.project.contributors.all()).user
-            Comment.objects.create(
-                issue=issue,
-                author=author,
-                description=fake.text(max_nb_chars=200),
-            )
+    issues = Issue.objects.bulk_create([
+        Issue(
+            project=project,
+            author=random.choice(project_contributors[project.pk]),
+            title=issue_titles[i],
+            description=fake.paragraph(nb_sentences=2),
+            priority=random.choice(['LOW', 'MEDIUM', 'HIGH']),
+            type=random.choice(['BUG', 'FEATURE', 'TASK']),
+            status=random.choice(['TODO', 'IN_PROGRESS', 'FINISHED']),
+        )
+        for project in projects
+        for i in range(random.randint(3, 5))
+    ])
+
+    Comment.objects.bulk_create([
+        Comment(
+            issue=issue,
+            author=random.choice(project_contributors[issue.project_id]),
+            description=fake.text(max_nb_chars=200),
+        )
+        for issue in issues
+        for _ in range(random.randint(3, 10))
+    ])
+
+    # bulk_create n'envoie pas de signaux : comment_count et last_activity_time des issues, puis compteurs
+    # des projets (/stats, /mine), calculés en fin d'insertion
+    Issue.objects.filter(pk__in=[issue.pk for issue in issues]).refresh_comment_activity()
+    statistics.reconcile()
 
 
 if __name__ == '__main__':